@@ -1,13 +1,29 @@
 from requela.builders import QueryBuilder, get_builder_for_model
-from requela.dataclasses import Operator
-from requela.exceptions import RequelaError
+from requela.dataclasses import (
+    BuildResult,
+    CostModel,
+    IndexPolicy,
+    Operator,
+    Page,
+    QueryCost,
+    QueryLimits,
+)
+from requela.exceptions import InvalidCursorError, QueryCostError, RequelaError
 from requela.rules import FieldRule, ModelRQLRules, RelationshipRule
 
 __all__ = [
+    "BuildResult",
+    "CostModel",
     "FieldRule",
+    "IndexPolicy",
+    "InvalidCursorError",
     "ModelRQLRules",
     "Operator",
+    "Page",
     "QueryBuilder",
+    "QueryCost",
+    "QueryCostError",
+    "QueryLimits",
     "get_builder_for_model",
     "RelationshipRule",
     "RequelaError",
@@ -1,7 +1,9 @@
-from collections.abc import Callable
+from collections.abc import Callable, Iterable
 from typing import Any
 
 from requela.builders.base import QueryBuilder
+from requela.cache import ParseCache, TTLCache
+from requela.dataclasses import DEFAULT_COST_MODEL, DEFAULT_QUERY_LIMITS, CostModel, QueryLimits
 
 
 def get_builder_for_model(
@@ -9,8 +11,23 @@ def get_builder_for_model(
     resolve_alias_callback: Callable | None = None,
     validate_operator_and_field_callback: Callable | None = None,
     validate_ordering_callback: Callable | None = None,
+    validate_index_usage_callback: Callable | None = None,
+    validate_include_callback: Callable | None = None,
+    limits: QueryLimits = DEFAULT_QUERY_LIMITS,
+    async_threshold: int = 4096,
+    templates: ParseCache | None = None,
+    cost_model: CostModel = DEFAULT_COST_MODEL,
+    deferred_fields: Iterable[str] = (),
+    totals: TTLCache | None = None,
+    approximate_count_threshold: int = 10_000,
+    eager_joins: bool = False,
+    sargable_rewrites: bool = False,
+    optimize_filters: bool = False,
 ):
-    """Returns appropriate builder based on model type"""
+    """Returns appropriate builder based on model type.
+
+    `eager_joins` only applies to SQLAlchemy models, see `SQLAlchemyQueryBuilder`.
+    """
 
     # SQLAlchemy model
     if hasattr(model, "__table__"):
@@ -21,6 +38,18 @@ def get_builder_for_model(
             resolve_alias_callback=resolve_alias_callback,
             validate_operator_and_field_callback=validate_operator_and_field_callback,
             validate_ordering_callback=validate_ordering_callback,
+            validate_index_usage_callback=validate_index_usage_callback,
+            validate_include_callback=validate_include_callback,
+            limits=limits,
+            async_threshold=async_threshold,
+            templates=templates,
+            cost_model=cost_model,
+            deferred_fields=deferred_fields,
+            totals=totals,
+            approximate_count_threshold=approximate_count_threshold,
+            eager_joins=eager_joins,
+            sargable_rewrites=sargable_rewrites,
+            optimize_filters=optimize_filters,
         )
     # Django model
     elif hasattr(model, "_meta"):  # pragma: no branch
@@ -31,6 +60,17 @@ def get_builder_for_model(
             resolve_alias_callback=resolve_alias_callback,
             validate_operator_and_field_callback=validate_operator_and_field_callback,
             validate_ordering_callback=validate_ordering_callback,
+            validate_index_usage_callback=validate_index_usage_callback,
+            validate_include_callback=validate_include_callback,
+            limits=limits,
+            async_threshold=async_threshold,
+            templates=templates,
+            cost_model=cost_model,
+            deferred_fields=deferred_fields,
+            totals=totals,
+            approximate_count_threshold=approximate_count_threshold,
+            sargable_rewrites=sargable_rewrites,
+            optimize_filters=optimize_filters,
         )
     else:  # pragma: no cover
         raise ValueError(f"Unsupported model type: {type(model)}")
@@ -1,49 +1,129 @@
+import json
 import logging
 from abc import ABC, abstractmethod
-from collections.abc import Callable, Sequence
+from collections.abc import Callable, Hashable, Iterable, Sequence
+from contextvars import ContextVar
 from datetime import date, datetime
-from functools import partial
-from typing import Any
+from itertools import repeat
+from typing import TYPE_CHECKING, Any
 
-from lark.exceptions import VisitError
+from requela import ir
+from requela.cache import ParseCache, TTLCache
+from requela.cost import estimate_cost
+from requela.dataclasses import (
+    DEFAULT_COST_MODEL,
+    DEFAULT_QUERY_LIMITS,
+    Binding,
+    BuildContext,
+    BuildResult,
+    CostModel,
+    FilterExpression,
+    LogicalOperator,
+    Operator,
+    OrderByExpression,
+    OrderField,
+    Page,
+    PageQuery,
+    Projection,
+    QueryCost,
+    QueryLimits,
+    QueryTemplate,
+    SortKey,
+)
+from requela.exceptions import QueryCostError
+from requela.optimizer import is_empty, optimize
+from requela.pagination import decode_cursor, encode_cursor, get_keyset
+from requela.parser import QueryLimitError, parse, parse_many
+from requela.rewrites import (
+    BINARY_COLLATIONS,
+    DAY_RANGES,
+    get_day_end,
+    get_day_start,
+    get_prefix,
+    get_prefix_end,
+    is_prefix_pattern,
+)
 
-from requela.dataclasses import FilterExpression, Operator, OperatorFunctions, OrderByExpression
-from requela.parser import parse
-from requela.transformer import RQLTransformer
+if TYPE_CHECKING:  # pragma: no cover
+    from concurrent.futures import Executor
 
 logger = logging.getLogger(__name__)
 
 
+FILTER_STEP = "filter"
+ORDER_BY_STEP = "order_by"
+PROJECTION_STEP = "projection"
+
+# Tags the cache keys of the templates of pages, which are cached along the others
+PAGE_TEMPLATE = "page"
+# Tags the cache keys of the templates of the rows counted by count queries
+COUNT_TEMPLATE = "count"
+
+# The context of the template being compiled, local to each thread and asyncio task
+_BUILD_CONTEXT: ContextVar[BuildContext] = ContextVar("requela_build_context")
+
+
 class QueryBuilder(ABC):
+    """Builds ORM queries out of RQL queries.
+
+    Queries are compiled into templates holding placeholders in place of their literals,
+    which are cached by the shape of the query: queries that only differ in their literals
+    share the template and building them only binds the literals to its placeholders.
+    Builders create the placeholders with `add_binding` while compiling comparisons and
+    bind them in `bind_condition`.
+
+    Builders don't change once created: the state of the template being compiled is kept
+    in a `BuildContext`, see `context`, and the cached templates are immutable, so a
+    builder can build queries in several threads and asyncio tasks at once.
+    """
+
     def __init__(
         self,
         model_class: Any,
         resolve_alias_callback: Callable | None = None,
         validate_operator_and_field_callback: Callable | None = None,
         validate_ordering_callback: Callable | None = None,
+        validate_index_usage_callback: Callable | None = None,
+        validate_include_callback: Callable | None = None,
+        limits: QueryLimits = DEFAULT_QUERY_LIMITS,
+        template_cache_size: int = 256,
+        async_threshold: int = 4096,
+        templates: ParseCache | None = None,
+        cost_model: CostModel = DEFAULT_COST_MODEL,
+        deferred_fields: Iterable[str] = (),
+        totals: TTLCache | None = None,
+        approximate_count_threshold: int = 10_000,
+        sargable_rewrites: bool = False,
+        optimize_filters: bool = False,
     ):
         self.model_class = model_class
+        self.limits = limits
+        self.cost_model = cost_model
+        self.deferred_fields = tuple(deferred_fields)
+        self.totals = totals
+        self.approximate_count_threshold = approximate_count_threshold
+        # Whether comparisons are compiled into the ranges an index can serve, see
+        # `requela.rewrites`
+        self.sargable_rewrites = sargable_rewrites
+        # Whether the filters of queries are simplified before they are built, see
+        # `requela.optimizer`
+        self.optimize_filters = optimize_filters
+        self.async_threshold = async_threshold
+        self.templates = (
+            templates
+            if templates is not None
+            else ParseCache(maxsize=template_cache_size, negative_maxsize=0)
+        )
         self.resolve_alias_callback = resolve_alias_callback
         self.validate_operator_and_field_callback = validate_operator_and_field_callback
         self.validate_ordering_callback = validate_ordering_callback
-        self.transformer = RQLTransformer(
-            OperatorFunctions(
-                and_op=self.apply_and,
-                or_op=self.apply_or,
-                not_op=self.apply_not,
-                eq_op=partial(self.apply_operator, Operator.EQ),
-                ne_op=partial(self.apply_operator, Operator.NE),
-                gt_op=partial(self.apply_operator, Operator.GT),
-                lt_op=partial(self.apply_operator, Operator.LT),
-                gte_op=partial(self.apply_operator, Operator.GTE),
-                lte_op=partial(self.apply_operator, Operator.LTE),
-                in_op=partial(self.apply_operator, Operator.IN),
-                out_op=partial(self.apply_operator, Operator.OUT),
-                like_op=partial(self.apply_operator, Operator.LIKE),
-                ilike_op=partial(self.apply_operator, Operator.ILIKE),
-                any_op=self.apply_any,
-            )
-        )
+        self.validate_index_usage_callback = validate_index_usage_callback
+        self.validate_include_callback = validate_include_callback
+        self.logical_operators = {
+            LogicalOperator.AND: self.apply_and,
+            LogicalOperator.OR: self.apply_or,
+            LogicalOperator.NOT: self.apply_not,
+        }
 
     @abstractmethod
     def get_initial_query(self):
@@ -53,6 +133,10 @@ class QueryBuilder(ABC):
     def get_field_type(self, field: str) -> type:
         pass
 
+    @abstractmethod
+    def is_field_indexed(self, field: str) -> bool:
+        pass
+
     @abstractmethod
     def apply_and(self, *conditions):
         pass
@@ -65,6 +149,11 @@ class QueryBuilder(ABC):
     def apply_not(self, condition):
         pass
 
+    @abstractmethod
+    def apply_false(self):
+        """Returns the condition no row satisfies, see `ir.Empty`"""
+        pass
+
     @abstractmethod
     def apply_eq(self, prop: str, value: str | date | datetime | int | float | None):
         pass
@@ -97,6 +186,22 @@ class QueryBuilder(ABC):
     def apply_out(self, prop: str, value: Sequence[str] | Sequence[float] | Sequence[int]):
         pass
 
+    @abstractmethod
+    def apply_range(self, prop: str, operator: Operator, convert: Callable[[Any], Any]):
+        """Compares the property, with `gt`, `gte`, `lt` or `lte`, to the literal of the
+        comparison being compiled converted by `convert`"""
+        pass
+
+    @abstractmethod
+    def get_property_type(self, prop: str) -> type:
+        """Returns the Python type of the values of the property, `object` if it has none"""
+        pass
+
+    @abstractmethod
+    def get_property_collation(self, prop: str) -> str | None:
+        """Returns the collation the column of the property declares, None if it declares none"""
+        pass
+
     @abstractmethod
     def apply_like(self, prop: str, value: str):
         pass
@@ -110,43 +215,800 @@ class QueryBuilder(ABC):
         pass
 
     @abstractmethod
-    def apply_joins(self, query):
+    def enter_any(self, relationship: str) -> None:
+        """Called as the compilation of the condition of an `any()` starts, before its
+        comparisons are compiled and passed to `apply_any`"""
         pass
 
     @abstractmethod
-    def apply_order_by(self, query: Any, order_by_expression: OrderByExpression) -> Any:
+    def apply_joins(self, query, joins: tuple[Any, ...]):
+        pass
+
+    @abstractmethod
+    def compile_order_by(self, order_by_expression: OrderByExpression) -> Any:
+        pass
+
+    @abstractmethod
+    def apply_ordering(self, query: Any, ordering: Any) -> Any:
+        pass
+
+    @abstractmethod
+    def is_relationship(self, path: str) -> bool:
+        pass
+
+    @abstractmethod
+    def compile_projection(self, projection: Projection) -> Any:
+        """Compiles the fields to load into the loader options of the ORM.
+
+        Raises `ValueError` for relationships that cannot be loaded along with the rows.
+        """
+        pass
+
+    @abstractmethod
+    def apply_projection(self, query: Any, projection: Any) -> Any:
         pass
 
     @abstractmethod
     def apply_filter(self, query, filter_expression: FilterExpression) -> Any:
         pass
 
+    @abstractmethod
+    def bind_condition(self, condition: Any, values: dict[Hashable, Any]) -> Any:
+        pass
+
+    @abstractmethod
+    def get_primary_key(self) -> tuple[str, ...]:
+        """Returns the names of the fields of the primary key of the model"""
+        pass
+
+    @abstractmethod
+    def compile_key(self, order_field: OrderField) -> SortKey:
+        """Compiles a field of the keyset of a paginated query, given by attribute path"""
+        pass
+
+    @abstractmethod
+    def compile_keyset_ordering(self, keys: tuple[SortKey, ...]) -> Any:
+        """Compiles the ordering of a paginated query by its sort keys, nulls last"""
+        pass
+
+    @abstractmethod
+    def bind_key(self, key: SortKey) -> Any:
+        """Returns a placeholder standing for the value of the sort key in a cursor"""
+        pass
+
+    @abstractmethod
+    def apply_key_comparison(self, key: SortKey, operator: Operator, value: Any) -> Any:
+        """Compares the sort key with a placeholder of `bind_key`, or with null if None.
+
+        `operator` is `Operator.EQ`, `Operator.GT` or `Operator.LT`.
+        """
+        pass
+
+    @abstractmethod
+    def apply_keys(self, query: Any, keys: tuple[SortKey, ...]) -> Any:
+        """Selects the sort keys along the rows of the query"""
+        pass
+
+    @abstractmethod
+    def apply_limit(self, query: Any, limit: int, offset: int = 0) -> Any:
+        pass
+
+    @abstractmethod
+    def apply_count(self, query: Any) -> Any:
+        """Turns a query into the query of the number of rows it selects"""
+        pass
+
+    @abstractmethod
+    def count_rows(self, count_query: Any, session: Any = None) -> int:
+        pass
+
+    @abstractmethod
+    async def acount_rows(self, count_query: Any, session: Any = None) -> int:
+        pass
+
+    @abstractmethod
+    def estimate_rows(self, query: Any, session: Any = None) -> int | None:
+        """Returns the number of rows the query selects as estimated by the planner of the
+        database, without running it, or None if the database cannot estimate it"""
+        pass
+
+    @abstractmethod
+    async def aestimate_rows(self, query: Any, session: Any = None) -> int | None:
+        pass
+
+    @abstractmethod
+    def split_row(self, row: Any, key_count: int) -> tuple[Any, tuple[Any, ...]]:
+        """Splits a row of a page query into the object and the values of its sort keys"""
+        pass
+
+    @abstractmethod
+    def fetch_rows(self, query: Any, session: Any = None) -> list[Any]:
+        pass
+
+    @abstractmethod
+    async def afetch_rows(self, query: Any, session: Any = None) -> list[Any]:
+        pass
+
+    def apply_order_by(self, query: Any, order_by_expression: OrderByExpression) -> Any:
+        return self.apply_ordering(query, self.compile_order_by(order_by_expression))
+
+    @property
+    def context(self) -> BuildContext:
+        """The context of the template being compiled by the current thread or task.
+
+        Raises `LookupError` outside of `build_template`.
+        """
+        return _BUILD_CONTEXT.get()
+
+    def add_binding(self, key: Hashable, convert: Callable[[Any], Any]) -> None:
+        """Registers a placeholder created for the literal of the comparison being compiled.
+
+        `key` identifies the placeholder in `bind_condition` and `convert` turns a literal
+        into the value of the placeholder.
+        """
+        context = self.context
+        context.bindings.append(Binding(key=key, slot=context.slot, convert=convert))
+
     def apply_operator(self, operator: Operator, prop: str, value: Any):
         self.validate_operator_and_field(prop, operator)
+        self.validate_index_usage(prop, operator, value)
+        if self.sargable_rewrites:
+            condition = self.rewrite_comparison(operator, prop, value)
+            if condition is not None:
+                return condition
         return getattr(self, f"apply_{operator.value}")(prop, value)
 
+    def rewrite_comparison(self, operator: Operator, prop: str, value: Any) -> Any:
+        """Compiles a comparison into its index-friendly form, see `requela.rewrites`.
+
+        Returns None for the comparisons that have none. Whether a comparison has one only
+        depends on the kind of its literal, see `ir.literal_kind`, so it holds for all the
+        queries sharing its template.
+        """
+        if operator == Operator.LIKE and is_prefix_pattern(value):
+            if not issubclass(self.get_property_type(prop), str):
+                return None
+            if self.get_property_collation(prop) not in BINARY_COLLATIONS:
+                return None
+            return self.apply_and(
+                self.apply_range(prop, Operator.GTE, get_prefix),
+                self.apply_range(prop, Operator.LT, get_prefix_end),
+                self.apply_like(prop, value),
+            )
+        if operator in DAY_RANGES and type(value) is date:
+            if not issubclass(self.get_property_type(prop), datetime):
+                return None
+            conditions = [
+                self.apply_range(prop, bound, get_day_end if is_end else get_day_start)
+                for bound, is_end in DAY_RANGES[operator]
+            ]
+            if len(conditions) == 1:
+                return conditions[0]
+            if operator == Operator.NE:
+                return self.apply_or(*conditions)
+            return self.apply_and(*conditions)
+        return None
+
     def validate_operator_and_field(self, field: str, operator: Operator) -> None:
         if self.validate_operator_and_field_callback:
             return self.validate_operator_and_field_callback(field, operator)
 
+    def validate_index_usage(self, field: str, operator: Operator, value: Any) -> None:
+        if self.validate_index_usage_callback:
+            return self.validate_index_usage_callback(field, operator, value)
+
     def resolve_alias(self, alias: str) -> str:
         if self.resolve_alias_callback:
             return self.resolve_alias_callback(alias)
         return alias
 
-    def build_query(self, rql_query: str, initial_query: Any = None) -> Any:
-        query = initial_query if initial_query is not None else self.get_initial_query()
-        ast = parse(rql_query)
+    def compile_condition(self, node: ir.Node) -> Any:
+        """Compiles an IR filter node into a condition of the underlying ORM.
+
+        The literals of the comparisons are compiled into placeholders, see `build_template`.
+        The comparisons are compiled in the order they appear in the query and the tree is
+        walked iteratively, so deeply nested queries don't hit the recursion limit.
+        """
+        context = self.context
+        conditions: list[Any] = []
+        for current, leaving in ir.walk(node):
+            if not leaving:
+                if isinstance(current, ir.Any):
+                    self.enter_any(current.relationship)
+                continue
+            if isinstance(current, ir.Comparison):
+                conditions.append(
+                    self.apply_operator(current.operator, current.field, current.value)
+                )
+                context.slot += 1
+            elif isinstance(current, ir.Logical):
+                arguments = conditions[-len(current.arguments) :]
+                del conditions[-len(current.arguments) :]
+                conditions.append(self.logical_operators[current.operator](*arguments))
+            elif isinstance(current, ir.Empty):
+                conditions.append(self.apply_false())
+            else:
+                conditions.append(self.apply_any(current.relationship, conditions.pop()))
+        return conditions[0]
+
+    def compile_seek(self, keys: tuple[SortKey, ...], null_keys: tuple[bool, ...]) -> Any:
+        """Compiles the condition selecting the rows sorted after the sort keys of a cursor.
+
+        The keys of the cursor are bound to the literals following those of the query, and
+        `null_keys` tells which of them are null. The condition is expanded into
+        `or(gt(k1,v1),and(eq(k1,v1),gt(k2,v2)),...)`, with `lt` for the keys sorted in
+        descending order. Nulls sort last: no value sorts after a null one and the nulls of
+        a nullable key sort after any other value.
+        """
+        context = self.context
+        equalities: list[Any] = []
+        alternatives: list[Any] = []
+        for key, is_null in zip(keys, null_keys, strict=True):
+            if is_null:
+                equalities.append(self.apply_key_comparison(key, Operator.EQ, None))
+            else:
+                value = self.bind_key(key)
+                operator = Operator.LT if key.descending else Operator.GT
+                after = self.apply_key_comparison(key, operator, value)
+                if key.nullable:
+                    after = self.apply_or(after, self.apply_key_comparison(key, Operator.EQ, None))
+                alternatives.append(self.apply_and(*equalities, after))
+                equalities.append(self.apply_key_comparison(key, Operator.EQ, value))
+            context.slot += 1
+        return self.apply_or(*alternatives)
+
+    def get_projection(self, query: ir.Query) -> Projection | None:
+        """Returns the fields to load of the rows of the query, None to load all of them.
+
+        The rows are loaded without the fields its `select()` excludes and the deferred
+        fields of the builder it does not include. Including a relationship loads the
+        related rows along with the rows, and including fields of a relationship loads the
+        related rows with only those fields and their primary key. The relationships of its
+        `include()` are loaded whole, whether they lead to a single row or to many.
+        """
+        included: dict[str, str] = {}
+        excluded: dict[str, str] = {}
+        includes: dict[str, None] = {}
+        for expression in query:
+            if isinstance(expression, ir.Include):
+                for alias in expression.relationships:
+                    if self.validate_include_callback:
+                        self.validate_include_callback(alias)
+                    path = self.resolve_alias(alias)
+                    if not self.is_relationship(path):
+                        raise ValueError(f"Only relationships can be included, not '{alias}'.")
+                    includes[path] = None
+            elif isinstance(expression, ir.Select):
+                for select_field in expression.fields:
+                    path = self.resolve_alias(select_field.field_path)
+                    selection = excluded if select_field.direction == "-" else included
+                    selection[path] = select_field.field_path
+        for path, alias in excluded.items():
+            if path in included:
+                raise ValueError(f"Field '{alias}' cannot be both included and excluded.")
+            if self.is_relationship(path):
+                raise ValueError(f"Relationship '{alias}' cannot be excluded, only its fields.")
+
+        relationships: dict[str, list[str] | None] = {}
+        for path in included:
+            is_relationship = self.is_relationship(path)
+            relationship_path, _, name = path.rpartition(".")
+            if is_relationship:
+                relationship_path = path
+            parts = relationship_path.split(".")
+            for end in range(1, len(parts)):
+                relationships.setdefault(".".join(parts[:end]), [])
+            if is_relationship:
+                relationships[path] = None
+            elif relationship_path:
+                names = relationships.setdefault(relationship_path, [])
+                if names is not None:
+                    names.append(name)
+        deferred = list(excluded)
+        deferred.extend(
+            path for path in self.deferred_fields if path not in included and path not in excluded
+        )
+        if not relationships and not deferred and not includes:
+            return None
+        return Projection(
+            relationships={
+                path: None if names is None else tuple(names)
+                for path, names in relationships.items()
+            },
+            deferred=tuple(deferred),
+            includes=tuple(includes),
+        )
+
+    def build_template(
+        self,
+        query: ir.Query,
+        keyset: tuple[OrderField, ...] | None = None,
+        null_keys: tuple[bool, ...] | None = None,
+        count: bool = False,
+    ) -> QueryTemplate:
+        """Compiles a parsed query into a template.
+
+        The template holds placeholders in place of the literals of the query, so it can be
+        used for any query of the same shape, see `ir.split_literals`. With a keyset, it is
+        the template of the pages of the query: sorted by the keyset instead of the
+        `order_by()` of the query and, with the `null_keys` of a cursor, filtered by the
+        condition of `compile_seek`. With `count`, it is the template of the rows to count
+        of the query, which are not loaded, so it has no projection.
+        """
+        context = BuildContext()
+        token = _BUILD_CONTEXT.set(context)
+        keys: tuple[SortKey, ...] = ()
         try:
-            expressions = self.transformer.transform(ast)
-        except VisitError as e:
-            raise e.orig_exc
-        for expression in expressions:
-            if isinstance(expression, FilterExpression):
-                query = self.apply_filter(query, expression)
-            if isinstance(expression, OrderByExpression):
-                if self.validate_ordering_callback:
-                    for field in expression.fields:
-                        self.validate_ordering_callback(field.field_path)
-                query = self.apply_order_by(query, expression)
-        return self.apply_joins(query)
+            steps: list[tuple[str, Any]] = []
+            for expression in query:
+                if isinstance(expression, ir.Select | ir.Include | ir.Limit):
+                    continue
+                if isinstance(expression, ir.OrderBy):
+                    if self.validate_ordering_callback:
+                        for field in expression.fields:
+                            self.validate_ordering_callback(field.field_path)
+                    if keyset is None:
+                        ordering = self.compile_order_by(
+                            OrderByExpression(fields=list(expression.fields))
+                        )
+                        steps.append((ORDER_BY_STEP, ordering))
+                else:
+                    steps.append((FILTER_STEP, self.compile_condition(expression)))
+            if keyset is not None:
+                keys = tuple(self.compile_key(order_field) for order_field in keyset)
+                steps.append((ORDER_BY_STEP, self.compile_keyset_ordering(keys)))
+                if null_keys is not None:
+                    steps.append((FILTER_STEP, self.compile_seek(keys, null_keys)))
+            projection = None if count else self.get_projection(query)
+            if projection is not None:
+                steps.append((PROJECTION_STEP, self.compile_projection(projection)))
+        finally:
+            _BUILD_CONTEXT.reset(token)
+        return QueryTemplate(
+            steps=tuple(steps),
+            bindings=tuple(context.bindings),
+            joins=tuple(context.joins.values()),
+            cost=estimate_cost(
+                query,
+                self.resolve_alias,
+                limited=keyset is not None
+                or self.limits.default_limit is not None
+                or self.limits.max_limit is not None,
+            ),
+            keys=keys,
+        )
+
+    def apply_template(self, query: Any, template: QueryTemplate, literals: Sequence[Any]) -> Any:
+        """Applies a template to the query, binding its placeholders to the literals"""
+        values = {
+            binding.key: binding.convert(literals[binding.slot]) for binding in template.bindings
+        }
+        for kind, step in template.steps:
+            if kind == ORDER_BY_STEP:
+                query = self.apply_ordering(query, step)
+            elif kind == PROJECTION_STEP:
+                query = self.apply_projection(query, step)
+            else:
+                condition = self.bind_condition(step, values)
+                query = self.apply_filter(query, FilterExpression(condition=condition))
+        query = self.apply_joins(query, template.joins)
+        if template.keys:
+            query = self.apply_keys(query, template.keys)
+        return query
+
+    def parse_query(self, rql_query: str) -> ir.Query:
+        """Parses the RQL query, checking it against the limits, and optimizes it, see
+        `optimize`"""
+        return self.optimize(parse(rql_query, self.limits))
+
+    def optimize(self, parsed_query: ir.Query) -> ir.Query:
+        """Returns the parsed query with its filters optimized, see `requela.optimizer`,
+        unless the builder doesn't optimize them.
+
+        The comparisons of a field are only folded into an `in()` if the field allows it.
+        """
+        if not self.optimize_filters:
+            return parsed_query
+        return optimize(parsed_query, can_fold=self.can_fold)
+
+    def can_fold(self, comparison: ir.Comparison) -> bool:
+        """Whether a comparison can be folded into an `in()`.
+
+        With `sargable_rewrites`, `eq()` comparisons to dates are kept, as they select the
+        whole day on datetime fields, see `rewrite_comparison`, which `in()` doesn't.
+        """
+        is_day = comparison.operator == Operator.EQ and type(comparison.value) is date
+        if self.sargable_rewrites and is_day:
+            return False
+        try:
+            self.validate_operator_and_field(comparison.field, Operator.IN)
+        except ValueError:
+            return False
+        return True
+
+    def build_query(
+        self, rql_query: str, initial_query: Any = None, max_cost: int | None = None
+    ) -> Any:
+        return self.build_parsed_query(
+            self.parse_query(rql_query), initial_query=initial_query, max_cost=max_cost
+        )
+
+    def estimate_cost(self, rql_query: str) -> QueryCost:
+        """Returns the static cost of the query, see `cost.estimate_cost`"""
+        template, literals = self.get_template(self.parse_query(rql_query))
+        return template.cost.with_large_ins(literals, self.cost_model)
+
+    def check_cost(
+        self, cost: QueryCost, literals: tuple[Any, ...], max_cost: int | None = None
+    ) -> None:
+        """Raises `QueryCostError` if the score of the cost of a query exceeds the budget.
+
+        The budget is `max_cost`, or the `max_cost` of the limits if None. `cost` is the cost
+        of the template of the query, its large tuples are counted out of its literals.
+        """
+        if max_cost is None:
+            max_cost = self.limits.max_cost
+        if max_cost is None:
+            return
+        cost = cost.with_large_ins(literals, self.cost_model)
+        score = cost.score(self.cost_model)
+        if score > max_cost:
+            raise QueryCostError(cost, score, max_cost)
+
+    async def abuild_query(
+        self,
+        rql_query: str,
+        initial_query: Any = None,
+        executor: "Executor | None" = None,
+        max_cost: int | None = None,
+    ) -> Any:
+        """Builds the query without blocking the event loop with large queries.
+
+        Queries longer than `async_threshold` characters are parsed and built in the
+        executor, a thread pool as builders are shared with its threads, the default
+        executor of the loop if None. Shorter ones are built inline as handing them to a
+        thread would cost more than building them.
+        """
+        if len(rql_query) > self.async_threshold:
+            import asyncio
+
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                executor, self.build_query, rql_query, initial_query, max_cost
+            )
+        return self.build_query(rql_query, initial_query=initial_query, max_cost=max_cost)
+
+    @abstractmethod
+    async def aexecute(self, query: Any, session: Any = None, stream: bool = False) -> Any:
+        pass
+
+    def get_limit(self, parsed_query: ir.Query) -> ir.Limit | None:
+        """Returns the limit of the rows the query selects.
+
+        It is the `limit()` of the query, the parser rejects those over the `max_limit` of
+        the limits, and for queries without one the `default_limit` of the limits, capped
+        to their `max_limit`, or None if neither is set.
+        """
+        for expression in parsed_query:
+            if isinstance(expression, ir.Limit):
+                return expression
+        limit, max_limit = self.limits.default_limit, self.limits.max_limit
+        if max_limit is not None and (limit is None or limit > max_limit):
+            limit = max_limit
+        return None if limit is None else ir.Limit(limit=limit)
+
+    def get_template(self, parsed_query: ir.Query) -> tuple[QueryTemplate, tuple[Any, ...]]:
+        """Returns the template of the shape of the query, compiling it if not cached,
+        and the literals to bind to it"""
+        shape, literals = ir.split_literals(parsed_query)
+        template = self.templates.get(shape)
+        if template is None:
+            template = self.build_template(parsed_query)
+            self.templates.put(shape, template)
+        return template, literals
+
+    def build_parsed_query(
+        self, parsed_query: ir.Query, initial_query: Any = None, max_cost: int | None = None
+    ) -> Any:
+        """Builds the query out of an already parsed RQL query, limited by `get_limit`.
+
+        Raises `QueryCostError` if its cost exceeds the budget, see `check_cost`.
+        """
+        query = initial_query if initial_query is not None else self.get_initial_query()
+        template, literals = self.get_template(parsed_query)
+        self.check_cost(template.cost, literals, max_cost)
+        query = self.apply_template(query, template, literals)
+        limit = self.get_limit(parsed_query)
+        if limit is not None:
+            query = self.apply_limit(query, limit.limit, limit.offset)
+        return query
+
+    def get_count_template(self, parsed_query: ir.Query) -> tuple[QueryTemplate, tuple[Any, ...]]:
+        """Returns the template of the rows to count of the query, compiling it if not
+        cached, and the literals to bind to it.
+
+        It is compiled out of the filters of the query alone, see `ir.filters`, so it has no
+        ordering, only the joins its filters need, and queries that only differ in their
+        `order_by()`, `select()` or `limit()` share it.
+        """
+        filters = ir.filters(parsed_query)
+        shape, literals = ir.split_literals(filters)
+        cache_key = (COUNT_TEMPLATE, shape)
+        template = self.templates.get(cache_key)
+        if template is None:
+            template = self.build_template(filters, count=True)
+            self.templates.put(cache_key, template)
+        return template, literals
+
+    def build_rows_to_count(
+        self, parsed_query: ir.Query, initial_query: Any = None, max_cost: int | None = None
+    ) -> Any:
+        """Builds the query of the rows to count of an already parsed RQL query: the rows
+        its filters select, unsorted and without its `limit()`, see `get_count_template`.
+
+        Raises `QueryCostError` if its cost exceeds the budget, see `check_cost`.
+        """
+        query = initial_query if initial_query is not None else self.get_initial_query()
+        template, literals = self.get_count_template(parsed_query)
+        self.check_cost(template.cost, literals, max_cost)
+        return self.apply_template(query, template, literals)
+
+    def build_count_query(
+        self, rql_query: str, initial_query: Any = None, max_cost: int | None = None
+    ) -> Any:
+        """Builds the query of the number of rows the RQL query selects, regardless of
+        its `limit()`, see `build_rows_to_count`"""
+        parsed_query = self.parse_query(rql_query)
+        return self.apply_count(
+            self.build_rows_to_count(parsed_query, initial_query=initial_query, max_cost=max_cost)
+        )
+
+    def build_query_and_count(
+        self, rql_query: str, initial_query: Any = None, max_cost: int | None = None
+    ) -> tuple[Any, Any]:
+        """Builds the query and the query of the number of rows it selects out of a single
+        parse of the RQL query, see `build_count_query`"""
+        parsed_query = self.parse_query(rql_query)
+        query = self.build_parsed_query(
+            parsed_query, initial_query=initial_query, max_cost=max_cost
+        )
+        count_query = self.apply_count(
+            self.build_rows_to_count(parsed_query, initial_query=initial_query, max_cost=max_cost)
+        )
+        return query, count_query
+
+    def get_total_key(
+        self, parsed_query: ir.Query, approximate: bool, initial_query: Any, scope: Hashable
+    ) -> Hashable | None:
+        """Returns the key of the number of rows of the query in `totals`, None if it is
+        not cached.
+
+        The key is the scope and the filters of the query, with their literals as written,
+        so the queries that only differ in their `order_by()`, `select()` or `limit()`
+        share it. As the rows of an initial query cannot be told apart, the totals of
+        queries with one are only cached with a scope identifying its rows, e.g. the id of
+        the tenant it is restricted to.
+        """
+        if self.totals is None or (initial_query is not None and scope is None):
+            return None
+        return scope, approximate, ir.split_literals(ir.filters(parsed_query))
+
+    def count(
+        self,
+        rql_query: str,
+        session: Any = None,
+        initial_query: Any = None,
+        max_cost: int | None = None,
+        approximate: bool = False,
+        scope: Hashable = None,
+    ) -> int:
+        """Returns the number of rows the RQL query selects, regardless of its `limit()`.
+
+        With `approximate`, it is the number estimated by the planner of the database when
+        it is at least `approximate_count_threshold`, so large tables are not scanned to
+        count their rows, and the exact number for smaller ones or when the database
+        cannot estimate it, see `estimate_rows`. Numbers are cached in `totals` if the
+        builder has a cache, for as long as its time to live, see `get_total_key`. Queries
+        whose filters cannot select any row count none without running any query, see
+        `requela.optimizer`.
+        """
+        parsed_query = self.parse_query(rql_query)
+        if is_empty(parsed_query):
+            return 0
+        key = self.get_total_key(parsed_query, approximate, initial_query, scope)
+        if key is not None and self.totals is not None:
+            total = self.totals.get(key)
+            if total is not None:
+                return total
+        query = self.build_rows_to_count(
+            parsed_query, initial_query=initial_query, max_cost=max_cost
+        )
+        total = self.estimate_rows(query, session=session) if approximate else None
+        if total is None or total < self.approximate_count_threshold:
+            total = self.count_rows(self.apply_count(query), session=session)
+        if key is not None and self.totals is not None:
+            self.totals.put(key, total)
+        return total
+
+    async def acount(
+        self,
+        rql_query: str,
+        session: Any = None,
+        initial_query: Any = None,
+        max_cost: int | None = None,
+        approximate: bool = False,
+        scope: Hashable = None,
+    ) -> int:
+        """Returns the number of rows the RQL query selects, running its queries
+        asynchronously, see `count`"""
+        parsed_query = self.parse_query(rql_query)
+        if is_empty(parsed_query):
+            return 0
+        key = self.get_total_key(parsed_query, approximate, initial_query, scope)
+        if key is not None and self.totals is not None:
+            total = self.totals.get(key)
+            if total is not None:
+                return total
+        query = self.build_rows_to_count(
+            parsed_query, initial_query=initial_query, max_cost=max_cost
+        )
+        total = await self.aestimate_rows(query, session=session) if approximate else None
+        if total is None or total < self.approximate_count_threshold:
+            total = await self.acount_rows(self.apply_count(query), session=session)
+        if key is not None and self.totals is not None:
+            self.totals.put(key, total)
+        return total
+
+    def get_page_template(
+        self, parsed_query: ir.Query, keyset: tuple[OrderField, ...], cursor_keys: tuple[Any, ...]
+    ) -> tuple[QueryTemplate, tuple[Any, ...]]:
+        """Returns the template of the pages of the query after a cursor, the first page
+        without keys, compiling it if not cached, and the literals to bind to it"""
+        shape, literals = ir.split_literals(parsed_query)
+        null_keys = tuple(key is None for key in cursor_keys) if cursor_keys else None
+        cache_key = (PAGE_TEMPLATE, shape, null_keys)
+        template = self.templates.get(cache_key)
+        if template is None:
+            template = self.build_template(parsed_query, keyset, null_keys)
+            self.templates.put(cache_key, template)
+        return template, literals
+
+    def build_page_query(
+        self,
+        rql_query: str,
+        page_size: int,
+        cursor: str | None = None,
+        initial_query: Any = None,
+        max_cost: int | None = None,
+    ) -> PageQuery:
+        """Builds the query of a page of the rows the RQL query selects, see `pagination`.
+
+        The rows are sorted by the fields of its `order_by()` and the primary key, and the
+        page holds the first rows sorted after the page the cursor comes from, the first
+        rows without a cursor. Raises `InvalidCursorError` if the cursor does not come from
+        a page of a query sorted the same way, `QueryCostError` if its cost exceeds the
+        budget, see `check_cost`, and `QueryLimitError` if the page size exceeds the
+        `max_limit` of the limits.
+        """
+        if page_size < 1:
+            raise ValueError("The page size must be greater than zero.")
+        if self.limits.max_limit is not None and page_size > self.limits.max_limit:
+            raise QueryLimitError(
+                f"The page size exceeds the maximum limit of {self.limits.max_limit}."
+            )
+        parsed_query = self.parse_query(rql_query)
+        if any(isinstance(expression, ir.Limit) for expression in parsed_query):
+            raise ValueError("Paginated queries cannot have a limit(), pages have a size.")
+        keyset = get_keyset(parsed_query, self.get_primary_key(), self.resolve_alias)
+        cursor_keys = () if cursor is None else decode_cursor(cursor, keyset)
+        template, literals = self.get_page_template(parsed_query, keyset, cursor_keys)
+        self.check_cost(template.cost, literals, max_cost)
+        query = initial_query if initial_query is not None else self.get_initial_query()
+        query = self.apply_template(query, template, literals + cursor_keys)
+        return PageQuery(
+            query=self.apply_limit(query, page_size + 1),
+            page_size=page_size,
+            keyset=keyset,
+            empty=is_empty(parsed_query),
+        )
+
+    def get_page(self, page_query: PageQuery, rows: list[Any]) -> Page:
+        """Returns the page out of the rows selected by its query"""
+        items = []
+        keys: tuple[Any, ...] = ()
+        for row in rows[: page_query.page_size]:
+            item, keys = self.split_row(row, len(page_query.keyset))
+            items.append(item)
+        if len(rows) <= page_query.page_size:
+            return Page(items=items)
+        return Page(items=items, next_cursor=encode_cursor(page_query.keyset, keys))
+
+    def paginate(
+        self,
+        rql_query: str,
+        page_size: int,
+        cursor: str | None = None,
+        session: Any = None,
+        initial_query: Any = None,
+        max_cost: int | None = None,
+    ) -> Page:
+        """Returns the page of the rows the RQL query selects after the cursor, the first
+        page without a cursor, see `build_page_query`"""
+        page_query = self.build_page_query(
+            rql_query, page_size, cursor=cursor, initial_query=initial_query, max_cost=max_cost
+        )
+        if page_query.empty:
+            return Page(items=[])
+        return self.get_page(page_query, self.fetch_rows(page_query.query, session=session))
+
+    async def apaginate(
+        self,
+        rql_query: str,
+        page_size: int,
+        cursor: str | None = None,
+        session: Any = None,
+        initial_query: Any = None,
+        max_cost: int | None = None,
+    ) -> Page:
+        """Returns the page of the rows the RQL query selects after the cursor, running its
+        query asynchronously, see `paginate`"""
+        page_query = self.build_page_query(
+            rql_query, page_size, cursor=cursor, initial_query=initial_query, max_cost=max_cost
+        )
+        if page_query.empty:
+            return Page(items=[])
+        rows = await self.afetch_rows(page_query.query, session=session)
+        return self.get_page(page_query, rows)
+
+    def build_many(
+        self,
+        rql_queries: Iterable[str],
+        initial_query: Any = None,
+        executor: "Executor | None" = None,
+        chunksize: int = 256,
+    ) -> list[BuildResult]:
+        """Builds a batch of queries, returning a result per query in the same order.
+
+        Identical queries are built once and share their result. A query that cannot be
+        built gets a result holding the error, the other queries of the batch are built
+        anyway. With an executor, e.g. a `ProcessPoolExecutor`, queries are parsed and
+        checked against the limits by its workers in chunks of `chunksize` queries, then
+        built out of their IR here.
+        """
+        rql_queries = list(rql_queries)
+        unique_queries = list(dict.fromkeys(rql_queries))
+        if executor is None:
+            parsed_queries = parse_many(unique_queries, self.limits)
+        else:
+            chunks = [
+                unique_queries[start : start + chunksize]
+                for start in range(0, len(unique_queries), chunksize)
+            ]
+            parsed_queries = [
+                parsed_query
+                for parsed_chunk in executor.map(parse_many, chunks, repeat(self.limits))
+                for parsed_query in parsed_chunk
+            ]
+
+        results = {}
+        for rql_query, parsed_query in zip(unique_queries, parsed_queries, strict=True):
+            if isinstance(parsed_query, Exception):
+                results[rql_query] = BuildResult(rql_query=rql_query, error=parsed_query)
+                continue
+            try:
+                query = self.build_parsed_query(
+                    self.optimize(parsed_query), initial_query=initial_query
+                )
+            except (ValueError, TypeError, AttributeError) as e:
+                results[rql_query] = BuildResult(rql_query=rql_query, error=e)
+            else:
+                results[rql_query] = BuildResult(rql_query=rql_query, query=query)
+        return [results[rql_query] for rql_query in rql_queries]
+
+
+def get_plan_rows(plan: Any) -> int:
+    """Returns the number of rows estimated by a PostgreSQL plan in JSON format, as text or
+    already decoded"""
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
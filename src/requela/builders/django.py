@@ -1,13 +1,50 @@
-from collections.abc import Sequence
+from collections.abc import Callable, Hashable, Sequence
 from dataclasses import dataclass
 from datetime import date, datetime
+from typing import Any
 
+from django.conf import settings
 from django.core.exceptions import FieldDoesNotExist
-from django.db.models import Q
+from django.db import connections
+from django.db.models import (
+    CharField,
+    DateField,
+    DateTimeField,
+    F,
+    Q,
+    TextField,
+    UniqueConstraint,
+)
 from django.db.models.query import QuerySet
+from django.utils import timezone
 
-from requela.builders.base import QueryBuilder
-from requela.dataclasses import FilterExpression, OrderByExpression
+from requela.builders.base import QueryBuilder, get_plan_rows
+from requela.dataclasses import (
+    FilterExpression,
+    Operator,
+    OrderByExpression,
+    OrderField,
+    Projection,
+    SortKey,
+)
+
+# Prefix of the annotations selecting the sort keys of the rows of pages
+KEY_ANNOTATION = "_requela_key_"
+
+KEY_LOOKUPS = {Operator.EQ: "exact", Operator.GT: "gt", Operator.LT: "lt"}
+
+# The Python type of the values of the fields, by their class, subclasses first
+FIELD_TYPES = ((DateTimeField, datetime), (DateField, date), (CharField, str), (TextField, str))
+
+
+@dataclass(frozen=True)
+class DjangoProjection:
+    """The relationships to load along with the rows with `select_related`, the lookups
+    of the fields to `defer` and the relationships to load with `prefetch_related`"""
+
+    related: tuple[str, ...]
+    deferred: tuple[str, ...]
+    prefetched: tuple[str, ...] = ()
 
 
 @dataclass
@@ -16,6 +53,12 @@ class PrefetchExpression:
     condition: Q
 
 
+class Placeholder:
+    """Stands for a literal in the lookups of a compiled `Q`"""
+
+    __slots__ = ()
+
+
 class DjangoQueryBuilder(QueryBuilder):
     def get_initial_query(self):
         return self.model_class.objects.all()
@@ -42,6 +85,20 @@ class DjangoQueryBuilder(QueryBuilder):
                 f"Field '{field}' not found in model '{self.model_class.__name__}'."
             )
 
+    def is_field_indexed(self, field: str) -> bool:
+        django_field = self.model_class._meta.get_field(field)
+        if django_field.db_index or django_field.primary_key or django_field.unique:
+            return True
+        meta = self.model_class._meta
+        leading_fields = [index.fields[0] for index in meta.indexes if index.fields]
+        leading_fields.extend(
+            constraint.fields[0]
+            for constraint in meta.constraints
+            if isinstance(constraint, UniqueConstraint) and constraint.fields
+        )
+        leading_fields.extend(fields[0] for fields in meta.unique_together)
+        return any(name.removeprefix("-") == field for name in leading_fields)
+
     def apply_and(self, *conditions: Q) -> Q:
         query = Q()
         for condition in conditions:
@@ -57,58 +114,89 @@ class DjangoQueryBuilder(QueryBuilder):
     def apply_not(self, condition: Q) -> Q:
         return ~condition
 
+    def apply_false(self) -> Q:
+        # Django selects no row out of an empty `in` without running the query
+        return Q(pk__in=[])
+
     def apply_eq(self, prop: str, value: str | bool | date | datetime | int | float | None) -> Q:
         if value is None:
             return Q(**{f"{self.resolve_property(prop)}__isnull": True})
-        return Q(**{self.resolve_property(prop): value})
+        return Q(**{self.resolve_property(prop): self.bind_literal()})
 
     def apply_ne(self, prop: str, value: str | bool | date | datetime | int | float | None) -> Q:
         if value is None:
             return Q(**{f"{self.resolve_property(prop)}__isnull": False})
-        return ~Q(**{self.resolve_property(prop): value})
+        return ~Q(**{self.resolve_property(prop): self.bind_literal()})
 
     def apply_gt(self, prop: str, value: date | datetime | int | float) -> Q:
-        return Q(**{f"{self.resolve_property(prop)}__gt": value})
+        return Q(**{f"{self.resolve_property(prop)}__gt": self.bind_literal()})
 
     def apply_lt(self, prop: str, value: date | datetime | int | float) -> Q:
-        return Q(**{f"{self.resolve_property(prop)}__lt": value})
+        return Q(**{f"{self.resolve_property(prop)}__lt": self.bind_literal()})
 
     def apply_gte(self, prop: str, value: date | datetime | int | float) -> Q:
-        return Q(**{f"{self.resolve_property(prop)}__gte": value})
+        return Q(**{f"{self.resolve_property(prop)}__gte": self.bind_literal()})
 
     def apply_lte(self, prop: str, value: date | datetime | int | float) -> Q:
-        return Q(**{f"{self.resolve_property(prop)}__lte": value})
+        return Q(**{f"{self.resolve_property(prop)}__lte": self.bind_literal()})
 
     def apply_in(self, prop: str, value: Sequence[str] | Sequence[float] | Sequence[int]) -> Q:
-        return Q(**{f"{self.resolve_property(prop)}__in": value})
+        return Q(**{f"{self.resolve_property(prop)}__in": self.bind_literal()})
 
     def apply_out(self, prop: str, value: Sequence[str] | Sequence[float] | Sequence[int]) -> Q:
-        return ~Q(**{f"{self.resolve_property(prop)}__in": value})
+        return ~Q(**{f"{self.resolve_property(prop)}__in": self.bind_literal()})
+
+    def apply_range(self, prop: str, operator: Operator, convert: Callable[[Any], Any]) -> Q:
+        lookup = f"{self.resolve_property(prop)}__{operator.value}"
+        return Q(**{lookup: self.bind_literal(lambda value: _make_aware(convert(value)))})
+
+    def get_model_field(self, prop: str) -> Any:
+        """Returns the field of the property, following its relationships"""
+        meta = self.model_class._meta
+        *relationships, name = self.resolve_alias(prop).split(".")
+        for relationship in relationships:
+            meta = meta.get_field(relationship).related_model._meta
+        return meta.get_field(name)
+
+    def get_property_type(self, prop: str) -> type:
+        django_field = self.get_model_field(prop)
+        for field_class, python_type in FIELD_TYPES:
+            if isinstance(django_field, field_class):
+                return python_type
+        return object
+
+    def get_property_collation(self, prop: str) -> str | None:
+        return getattr(self.get_model_field(prop), "db_collation", None)
 
     def apply_like(self, prop: str, value: str) -> Q:
         if value.startswith("*") and value.endswith("*"):
-            return Q(**{f"{self.resolve_property(prop)}__contains": value[1:-1]})
+            lookup, literal = "contains", self.bind_literal(lambda value: value[1:-1])
         elif value.startswith("*") and not value.endswith("*"):
-            return Q(**{f"{self.resolve_property(prop)}__endswith": value[1:]})
+            lookup, literal = "endswith", self.bind_literal(lambda value: value[1:])
         elif not value.startswith("*") and value.endswith("*"):
-            return Q(**{f"{self.resolve_property(prop)}__startswith": value[:-1]})
+            lookup, literal = "startswith", self.bind_literal(lambda value: value[:-1])
         else:
-            return Q(**{f"{self.resolve_property(prop)}__contains": value})
+            lookup, literal = "contains", self.bind_literal()
+        return Q(**{f"{self.resolve_property(prop)}__{lookup}": literal})
 
     def apply_ilike(self, prop: str, value: str) -> Q:
         if value.startswith("*") and value.endswith("*"):
-            return Q(**{f"{self.resolve_property(prop)}__icontains": value[1:-1]})
+            lookup, literal = "icontains", self.bind_literal(lambda value: value[1:-1])
         elif value.startswith("*") and not value.endswith("*"):
-            return Q(**{f"{self.resolve_property(prop)}__iendswith": value[1:]})
+            lookup, literal = "iendswith", self.bind_literal(lambda value: value[1:])
         elif not value.startswith("*") and value.endswith("*"):
-            return Q(**{f"{self.resolve_property(prop)}__istartswith": value[:-1]})
+            lookup, literal = "istartswith", self.bind_literal(lambda value: value[:-1])
         else:
-            return Q(**{f"{self.resolve_property(prop)}__icontains": value})
+            lookup, literal = "icontains", self.bind_literal()
+        return Q(**{f"{self.resolve_property(prop)}__{lookup}": literal})
 
     def resolve_property(self, prop_path: str) -> str:
         prop = self.resolve_alias(prop_path)
         return prop.replace(".", "__")
 
+    def enter_any(self, relationship: str) -> None:
+        pass
+
     def apply_any(self, relationship_name, condition: Q) -> PrefetchExpression:
         return PrefetchExpression(relationship_name, condition)
 
@@ -118,14 +206,214 @@ class DjangoQueryBuilder(QueryBuilder):
             return query.filter(filter_expression.condition.condition)
         return query.filter(filter_expression.condition)
 
-    def apply_joins(self, query: QuerySet):
+    def apply_joins(self, query: QuerySet, joins: tuple[Any, ...]) -> QuerySet:
+        return query
+
+    def is_relationship(self, path: str) -> bool:
+        meta = self.model_class._meta
+        for part in path.split("."):
+            django_field = meta.get_field(part)
+            if not django_field.is_relation:
+                return False
+            meta = django_field.related_model._meta
+        return True
+
+    def compile_projection(self, projection: Projection) -> DjangoProjection:
+        """Compiles the fields to load: the related rows are selected along with the rows,
+        without the fields they are not loaded with, the deferred fields are deferred and
+        the included relationships are selected along with the rows, or prefetched for
+        those leading to many rows after selecting the relationships to a single row they
+        go through"""
+        related: list[str] = []
+        deferred: list[str] = []
+        prefetched: list[str] = []
+        for path, names in projection.relationships.items():
+            lookup = path.replace(".", "__")
+            related.append(lookup)
+            if names is not None:
+                deferred.extend(
+                    f"{lookup}__{django_field.name}"
+                    for django_field in self._get_related_meta(path).concrete_fields
+                    if not django_field.primary_key
+                    and not django_field.is_relation
+                    and django_field.name not in names
+                )
+        for path in projection.deferred:
+            relationship_path = path.rpartition(".")[0]
+            if relationship_path:
+                self._get_related_meta(relationship_path)
+            deferred.append(path.replace(".", "__"))
+        for path in projection.includes:
+            single_path = self._get_single_row_path(path)
+            if single_path and single_path.replace(".", "__") not in related:
+                related.append(single_path.replace(".", "__"))
+            if single_path != path:
+                prefetched.append(path.replace(".", "__"))
+        return DjangoProjection(
+            related=tuple(related), deferred=tuple(deferred), prefetched=tuple(prefetched)
+        )
+
+    def _get_single_row_path(self, path: str) -> str:
+        # The relationships the path starts with up to the first leading to many rows
+        meta = self.model_class._meta
+        parts = path.split(".")
+        for end, part in enumerate(parts):
+            django_field = meta.get_field(part)
+            if not (django_field.many_to_one or django_field.one_to_one):
+                return ".".join(parts[:end])
+            meta = django_field.related_model._meta
+        return path
+
+    def _get_related_meta(self, path: str) -> Any:
+        meta = self.model_class._meta
+        parts = path.split(".")
+        for end, part in enumerate(parts, start=1):
+            django_field = meta.get_field(part)
+            if not (django_field.many_to_one or django_field.one_to_one):
+                raise ValueError(
+                    f"Relationship '{'.'.join(parts[:end])}' has many rows, "
+                    "it cannot be loaded along with the rows."
+                )
+            meta = django_field.related_model._meta
+        return meta
+
+    def apply_projection(self, query: QuerySet, projection: DjangoProjection) -> QuerySet:
+        if projection.related:
+            query = query.select_related(*projection.related)
+        if projection.deferred:
+            query = query.defer(*projection.deferred)
+        if projection.prefetched:
+            query = query.prefetch_related(*projection.prefetched)
         return query
 
-    def apply_order_by(self, query: QuerySet, order_by_expression: OrderByExpression) -> QuerySet:
+    async def aexecute(self, query: QuerySet, session: Any = None, stream: bool = False) -> Any:
+        """Runs the queryset with the async interface of Django, `session` is not used.
+
+        Returns the list of the objects it selects or, with `stream`, an async iterator
+        over them.
+        """
+        if stream:
+            return query.aiterator()
+        return [obj async for obj in query]
+
+    def compile_order_by(self, order_by_expression: OrderByExpression) -> list[str]:
         fields = []
         for order_field in order_by_expression.fields:
             prop = self.resolve_property(order_field.field_path)
             if order_field.direction == "-":
                 prop = f"-{prop}"
             fields.append(prop)
-        return query.order_by(*fields)
+        return fields
+
+    def apply_ordering(self, query: QuerySet, ordering: list[str]) -> QuerySet:
+        return query.order_by(*ordering)
+
+    def get_primary_key(self) -> tuple[str, ...]:
+        return (self.model_class._meta.pk.name,)
+
+    def compile_key(self, order_field: OrderField) -> SortKey:
+        """Returns the lookup of the sort key, which can be null if its field or a foreign
+        key along its path is nullable"""
+        meta = self.model_class._meta
+        nullable = False
+        for part in order_field.field_path.split("."):
+            django_field = meta.get_field(part)
+            nullable = nullable or django_field.null
+            if django_field.is_relation:
+                meta = django_field.related_model._meta
+        return SortKey(
+            expression=order_field.field_path.replace(".", "__"),
+            descending=order_field.direction == "-",
+            nullable=nullable,
+        )
+
+    def compile_keyset_ordering(self, keys: tuple[SortKey, ...]) -> list[Any]:
+        ordering: list[Any] = []
+        for key in keys:
+            if key.nullable:
+                field = F(key.expression)
+                ordering.append(
+                    field.desc(nulls_last=True) if key.descending else field.asc(nulls_last=True)
+                )
+            else:
+                ordering.append(f"-{key.expression}" if key.descending else key.expression)
+        return ordering
+
+    def bind_key(self, key: SortKey) -> Placeholder:
+        return self.bind_literal()
+
+    def apply_key_comparison(self, key: SortKey, operator: Operator, value: Any) -> Q:
+        if value is None:
+            return Q(**{f"{key.expression}__isnull": True})
+        return Q(**{f"{key.expression}__{KEY_LOOKUPS[operator]}": value})
+
+    def apply_keys(self, query: QuerySet, keys: tuple[SortKey, ...]) -> QuerySet:
+        return query.annotate(
+            **{f"{KEY_ANNOTATION}{index}": F(key.expression) for index, key in enumerate(keys)}
+        )
+
+    def apply_limit(self, query: QuerySet, limit: int, offset: int = 0) -> QuerySet:
+        return query[offset : offset + limit]
+
+    def apply_count(self, query: QuerySet) -> QuerySet:
+        """Clears the ordering of the queryset, its number of rows is counted with `count()`"""
+        return query.order_by()
+
+    def count_rows(self, count_query: QuerySet, session: Any = None) -> int:
+        return count_query.count()
+
+    async def acount_rows(self, count_query: QuerySet, session: Any = None) -> int:
+        return await count_query.acount()
+
+    def estimate_rows(self, query: QuerySet, session: Any = None) -> int | None:
+        """Returns the number of rows in the plan of the queryset, on PostgreSQL only"""
+        if connections[query.db].vendor != "postgresql":
+            return None
+        return get_plan_rows(query.explain(format="json"))  # pragma: no cover
+
+    async def aestimate_rows(self, query: QuerySet, session: Any = None) -> int | None:
+        if connections[query.db].vendor != "postgresql":
+            return None
+        return get_plan_rows(await query.aexplain(format="json"))  # pragma: no cover
+
+    def split_row(self, row: Any, key_count: int) -> tuple[Any, tuple[Any, ...]]:
+        return row, tuple(getattr(row, f"{KEY_ANNOTATION}{index}") for index in range(key_count))
+
+    def fetch_rows(self, query: QuerySet, session: Any = None) -> list[Any]:
+        return list(query)
+
+    async def afetch_rows(self, query: QuerySet, session: Any = None) -> list[Any]:
+        return [obj async for obj in query]
+
+    def bind_literal(self, convert: Callable[[Any], Any] | None = None) -> Placeholder:
+        """Returns a placeholder standing for the literal of the comparison being compiled,
+        which is bound to the literal converted by `convert`"""
+        placeholder = Placeholder()
+        self.add_binding(placeholder, convert or _identity)
+        return placeholder
+
+    def bind_condition(self, condition: Any, values: dict[Hashable, Any]) -> Any:
+        if isinstance(condition, PrefetchExpression):
+            return PrefetchExpression(
+                condition.relationship_name, self.bind_condition(condition.condition, values)
+            )
+        children = []
+        for child in condition.children:
+            if isinstance(child, Q):
+                child = self.bind_condition(child, values)
+            elif isinstance(child[1], Placeholder):
+                child = (child[0], values[child[1]])
+            children.append(child)
+        return Q(*children, _connector=condition.connector, _negated=condition.negated)
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _make_aware(value: Any) -> Any:
+    # With time zone support, naive datetimes are taken in the current time zone, the one
+    # Django takes the dates of datetime fields in
+    if isinstance(value, datetime) and settings.USE_TZ and timezone.is_naive(value):
+        return timezone.make_aware(value)
+    return value
@@ -1,24 +1,73 @@
-from collections.abc import Callable, Sequence
+import operator
+from collections.abc import Callable, Hashable, Iterable, Sequence
+from dataclasses import dataclass, field
 from datetime import date, datetime
-from decimal import Decimal
-from enum import Enum
 from typing import Any
 
 from sqlalchemy import (
-    BooleanClauseList,
+    Boolean,
     ColumnElement,
     ColumnExpressionArgument,
     Exists,
+    PrimaryKeyConstraint,
     UnaryExpression,
+    UniqueConstraint,
+    all_,
     and_,
+    any_,
+    bindparam,
     exists,
+    false,
+    func,
+    inspect,
     or_,
     select,
+    tuple_,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import (
+    DeclarativeBase,
+    Load,
+    Query,
+    RelationshipProperty,
+    Session,
+    aliased,
+)
+from sqlalchemy.orm import join as orm_join
+from sqlalchemy.sql.base import Executable
+from sqlalchemy.sql.elements import BindParameter, ClauseElement
+from sqlalchemy.sql.visitors import InternalTraversal, cloned_traverse
+
+from requela import ir
+from requela.builders.base import QueryBuilder, get_plan_rows
+from requela.cache import ParseCache, TTLCache
+from requela.coercers import get_coercer, get_tuple_coercer
+from requela.dataclasses import (
+    DEFAULT_COST_MODEL,
+    DEFAULT_QUERY_LIMITS,
+    CostModel,
+    FilterExpression,
+    JoinExpression,
+    Operator,
+    OrderByExpression,
+    OrderField,
+    Projection,
+    QueryLimits,
+    SortKey,
 )
-from sqlalchemy.orm import DeclarativeBase, Query, RelationshipProperty, aliased
 
-from requela.builders.base import QueryBuilder
-from requela.dataclasses import FilterExpression, JoinExpression, OrderByExpression
+# Attribute of the bound parameters created for literals holding their binding key. Unlike
+# their own key, it is kept when SQLAlchemy copies them, e.g. when negating `in_`.
+BINDING_KEY_ATTRIBUTE = "_requela_binding_key"
+
+RANGE_OPERATORS = {
+    Operator.GT: operator.gt,
+    Operator.GTE: operator.ge,
+    Operator.LT: operator.lt,
+    Operator.LTE: operator.le,
+}
 
 
 class SQLAlchemyQueryBuilder(QueryBuilder):
@@ -28,14 +77,41 @@ class SQLAlchemyQueryBuilder(QueryBuilder):
         resolve_alias_callback: Callable | None = None,
         validate_operator_and_field_callback: Callable | None = None,
         validate_ordering_callback: Callable | None = None,
+        validate_index_usage_callback: Callable | None = None,
+        validate_include_callback: Callable | None = None,
+        limits: QueryLimits = DEFAULT_QUERY_LIMITS,
+        template_cache_size: int = 256,
+        async_threshold: int = 4096,
+        templates: ParseCache | None = None,
+        cost_model: CostModel = DEFAULT_COST_MODEL,
+        deferred_fields: Iterable[str] = (),
+        totals: TTLCache | None = None,
+        approximate_count_threshold: int = 10_000,
+        eager_joins: bool = False,
+        sargable_rewrites: bool = False,
+        optimize_filters: bool = False,
     ):
         super().__init__(
             model_class,
             resolve_alias_callback=resolve_alias_callback,
             validate_operator_and_field_callback=validate_operator_and_field_callback,
             validate_ordering_callback=validate_ordering_callback,
+            validate_index_usage_callback=validate_index_usage_callback,
+            validate_include_callback=validate_include_callback,
+            limits=limits,
+            template_cache_size=template_cache_size,
+            async_threshold=async_threshold,
+            templates=templates,
+            cost_model=cost_model,
+            deferred_fields=deferred_fields,
+            totals=totals,
+            approximate_count_threshold=approximate_count_threshold,
+            sargable_rewrites=sargable_rewrites,
+            optimize_filters=optimize_filters,
         )
-        self.joins: list[JoinExpression] = []
+        # Whether the relationships joined by the filters and the ordering of the queries
+        # are loaded out of their joins, instead of lazily once per row
+        self.eager_joins = eager_joins
 
     def get_initial_query(self):
         return select(self.model_class)
@@ -44,6 +120,19 @@ class SQLAlchemyQueryBuilder(QueryBuilder):
         field_type = getattr(self.model_class, field).property.columns[0].type.python_type
         return field_type
 
+    def is_field_indexed(self, field: str) -> bool:
+        column = getattr(self.model_class, field).property.columns[0]
+        table = column.table
+        for index in table.indexes:
+            if index.expressions and index.expressions[0] is column:
+                return True
+        for constraint in table.constraints:
+            if isinstance(constraint, PrimaryKeyConstraint | UniqueConstraint):
+                columns = list(constraint.columns)
+                if columns and columns[0] is column:
+                    return True
+        return False
+
     def apply_and(self, *conditions: ColumnExpressionArgument) -> ColumnElement:
         return and_(*conditions)
 
@@ -53,6 +142,9 @@ class SQLAlchemyQueryBuilder(QueryBuilder):
     def apply_not(self, condition: ColumnElement) -> ColumnElement:
         return ~condition
 
+    def apply_false(self) -> ColumnElement:
+        return false()
+
     def apply_eq(
         self, prop: str, value: str | bool | date | datetime | int | float | None
     ) -> ColumnExpressionArgument:
@@ -60,18 +152,18 @@ class SQLAlchemyQueryBuilder(QueryBuilder):
         if isinstance(model_field.property, RelationshipProperty):
             if value is not None:
                 raise ValueError("`eq` can be applied to relationship only to test for null.")
-            return self.apply_eq_to_relationship(model_field.property)
+            return self.apply_eq_to_relationship(model_field.property, model_field.parent.entity)
 
         if value is True or value is False or value is None:
             return model_field.is_(value)
-        return model_field == self.cast_value(model_field, value)
+        return model_field == self.bind_literal(model_field)
 
     def apply_eq_to_relationship(
-        self, relationship_property: RelationshipProperty
+        self, relationship_property: RelationshipProperty, entity: Any
     ) -> ColumnExpressionArgument:
         conditions = []
         for local_col in relationship_property.local_columns:
-            conditions.append(local_col.is_(None))
+            conditions.append(_get_column(entity, local_col).is_(None))
         return and_(*conditions)
 
     def apply_ne(
@@ -81,146 +173,517 @@ class SQLAlchemyQueryBuilder(QueryBuilder):
         if isinstance(model_field.property, RelationshipProperty):
             if value is not None:
                 raise ValueError("`ne` can be applied to relationship only to test for null.")
-            return self.apply_ne_to_relationship(model_field.property)
+            return self.apply_ne_to_relationship(model_field.property, model_field.parent.entity)
         if value is True or value is False or value is None:
             return model_field.isnot(value)
-        return model_field != self.cast_value(model_field, value)
+        return model_field != self.bind_literal(model_field)
 
     def apply_ne_to_relationship(
-        self, relationship_property: RelationshipProperty
+        self, relationship_property: RelationshipProperty, entity: Any
     ) -> ColumnExpressionArgument:
         conditions = []
         for local_col in relationship_property.local_columns:
-            conditions.append(local_col.isnot(None))
+            conditions.append(_get_column(entity, local_col).isnot(None))
         return or_(*conditions)
 
     def apply_gt(self, prop: str, value: date | datetime | int | float) -> ColumnExpressionArgument:
-        return self.resolve_property(prop) > self.cast_value(self.resolve_property(prop), value)
+        model_field = self.resolve_property(prop)
+        return model_field > self.bind_literal(model_field)
 
     def apply_lt(self, prop: str, value: date | datetime | int | float) -> ColumnExpressionArgument:
-        return self.resolve_property(prop) < self.cast_value(self.resolve_property(prop), value)
+        model_field = self.resolve_property(prop)
+        return model_field < self.bind_literal(model_field)
 
     def apply_gte(
         self, prop: str, value: date | datetime | int | float
     ) -> ColumnExpressionArgument:
-        return self.resolve_property(prop) >= self.cast_value(self.resolve_property(prop), value)
+        model_field = self.resolve_property(prop)
+        return model_field >= self.bind_literal(model_field)
 
     def apply_lte(
         self, prop: str, value: date | datetime | int | float
     ) -> ColumnExpressionArgument:
-        return self.resolve_property(prop) <= self.cast_value(self.resolve_property(prop), value)
+        model_field = self.resolve_property(prop)
+        return model_field <= self.bind_literal(model_field)
 
     def apply_in(
         self, prop: str, value: Sequence[str] | Sequence[float] | Sequence[int]
     ) -> ColumnExpressionArgument:
-        return self.resolve_property(prop).in_(
-            [self.cast_value(self.resolve_property(prop), item) for item in value]
-        )
+        model_field = self.resolve_property(prop)
+        return InValues(model_field, self.bind_literals(model_field))
 
     def apply_out(
         self, prop: str, value: Sequence[str] | Sequence[float] | Sequence[int]
     ) -> ColumnExpressionArgument:
-        return self.resolve_property(prop).not_in(
-            [self.cast_value(self.resolve_property(prop), item) for item in value]
-        )
-
-    def apply_like(self, prop: str, value: str) -> ColumnExpressionArgument:
-        sql_pattern = value.replace("*", "%")
-        return self.resolve_property(prop).like(sql_pattern)
+        model_field = self.resolve_property(prop)
+        return InValues(model_field, self.bind_literals(model_field), negate=True)
 
-    def apply_ilike(self, prop: str, value: str) -> ColumnExpressionArgument:
-        sql_pattern = value.replace("*", "%")
-        return self.resolve_property(prop).ilike(sql_pattern)
+    def apply_range(
+        self, prop: str, operator: Operator, convert: Callable[[Any], Any]
+    ) -> ColumnExpressionArgument:
+        model_field = self.resolve_property(prop)
+        return RANGE_OPERATORS[operator](model_field, self.bind_literal(model_field, convert))
 
-    def resolve_property(self, prop_path: str) -> UnaryExpression:
-        prop_path = self.resolve_alias(prop_path)
-        model = self.model_class
-        parts = prop_path.split(".")
+    def get_property_type(self, prop: str) -> type:
+        model_field = self.resolve_property(prop)
+        if isinstance(model_field.property, RelationshipProperty):
+            return object
+        return self.get_python_type(model_field)
 
-        if len(parts) > 1:
-            current = model
+    def get_property_collation(self, prop: str) -> str | None:
+        return getattr(self.resolve_property(prop).type, "collation", None)
 
-            for part in parts[:-1]:
-                relationship = getattr(current, part)
-                target_model = relationship.property.mapper.class_
-                alias = aliased(target_model)
+    def apply_like(self, prop: str, value: str) -> ColumnExpressionArgument:
+        model_field = self.resolve_property(prop)
+        return model_field.like(self.bind_literal(model_field, self.to_sql_pattern))
 
-                if not relationship.property.uselist:
-                    is_nullable = any(
-                        column.nullable for column in relationship.property.local_columns
-                    )
-                    self.joins.append(
-                        JoinExpression(target=alias, on=relationship, is_outer=is_nullable)
-                    )
-                current = alias
+    def apply_ilike(self, prop: str, value: str) -> ColumnExpressionArgument:
+        model_field = self.resolve_property(prop)
+        return model_field.ilike(self.bind_literal(model_field, self.to_sql_pattern))
+
+    @staticmethod
+    def to_sql_pattern(value: str) -> str:
+        return value.replace("*", "%")
+
+    def bind_literal(
+        self, column: Any, convert: Callable[[Any], Any] | None = None
+    ) -> BindParameter:
+        """Returns a bound parameter standing for the literal of the comparison being compiled.
+
+        Its value is the literal converted by `convert`, cast to the type of the column by
+        default. It is named after the column, like the parameters SQLAlchemy creates.
+        """
+        parameter: BindParameter = bindparam(column.key, type_=column.type, unique=True)
+        setattr(parameter, BINDING_KEY_ATTRIBUTE, parameter.key)
+        self.add_binding(parameter.key, convert or get_coercer(self.get_python_type(column)))
+        return parameter
+
+    def bind_literals(self, column: Any) -> BindParameter:
+        """Returns an expanding bound parameter standing for the tuple of the comparison
+        being compiled, whose items are cast to the type of the column"""
+        parameter: BindParameter = bindparam(
+            column.key, type_=column.type, unique=True, expanding=True
+        )
+        setattr(parameter, BINDING_KEY_ATTRIBUTE, parameter.key)
+        self.add_binding(parameter.key, get_tuple_coercer(self.get_python_type(column)))
+        return parameter
 
-            return getattr(current, parts[-1])
+    @staticmethod
+    def get_python_type(column: Any) -> type:
+        """Returns the Python type of the values of the column, `object` if it has none"""
+        try:
+            return column.type.python_type
+        except NotImplementedError:
+            return object
+
+    def bind_condition(self, condition: Any, values: dict[Hashable, Any]) -> Any:
+        if not values:
+            return condition
+
+        def bind(parameter: BindParameter) -> None:
+            key = getattr(parameter, BINDING_KEY_ATTRIBUTE, None)
+            if key in values:  # pragma: no branch
+                parameter.value = values[key]
+                parameter.required = False
+
+        # Same traversal as `ClauseElement.params`, which matches parameters by their key
+        return cloned_traverse(
+            condition,
+            {"maintain_key": True, "detect_subquery_cols": True},
+            {"bindparam": bind},
+        )
 
-        return getattr(model, prop_path)
+    def resolve_property(self, prop_path: str) -> UnaryExpression:
+        """Returns the column of the property, joining the relationships along its path.
+
+        Each relationship path is joined once per query and its alias shared by every
+        property of the query under it, in filters as well as in orderings. Properties under
+        the relationship of an `any()` being compiled are resolved within its subquery,
+        joining their relationships there, see `enter_any`.
+        """
+        return self._resolve_path(self.resolve_alias(prop_path))
+
+    def _resolve_path(self, path: str) -> Any:
+        if "." not in path:
+            return getattr(self.model_class, path)
+        entity, joins, prefix, path = self._get_scope(path)
+        parts = path.split(".")
+        for end, part in enumerate(parts[:-1], start=1):
+            join_path = prefix + ".".join(parts[:end])
+            join = joins.get(join_path)
+            if join is None:
+                relationship = getattr(entity, part)
+                if relationship.property.uselist:
+                    raise ValueError(
+                        f"Relationship '{join_path}' has many rows, filter it with `any()`."
+                    )
+                is_nullable = any(column.nullable for column in relationship.property.local_columns)
+                target = aliased(relationship.property.mapper.class_)
+                # Joined on its columns rather than on the relationship: SQLAlchemy may adapt
+                # the relationship to the wrong entity when statements sharing it are compiled
+                # by several threads at once, as those of a shared template are
+                join = joins[join_path] = JoinExpression(
+                    target=target,
+                    on=and_(
+                        *(
+                            _get_column(target, remote) == _get_column(entity, local)
+                            for local, remote in relationship.property.local_remote_pairs
+                        )
+                    ),
+                    is_outer=is_nullable,
+                    relationship=relationship,
+                )
+            entity = join.target
+        return getattr(entity, parts[-1])
+
+    def _get_scope(self, path: str) -> tuple[Any, dict[str, JoinExpression], str, str]:
+        # The innermost `any()` the path is under, the query itself if none
+        context = self.context
+        for scope in reversed(context.scopes):
+            if path.startswith(f"{scope.path}."):
+                return scope.target, scope.joins, f"{scope.path}.", path[len(scope.path) + 1 :]
+        return self.model_class, context.joins, "", path
+
+    def enter_any(self, relationship_name: str) -> None:
+        path = self.resolve_alias(relationship_name)
+        relationship = self._resolve_path(path)
+        if not isinstance(getattr(relationship, "property", None), RelationshipProperty):
+            raise ValueError(f"`any()` can be applied to relationships only, not '{path}'.")
+        self.context.scopes.append(
+            AnyScope(
+                path=path,
+                relationship=relationship,
+                target=aliased(relationship.property.mapper.class_),
+            )
+        )
 
     def apply_any(
         self, relationship_name, condition: ColumnElement | ColumnExpressionArgument
     ) -> Exists:
-        relationship = getattr(self.model_class, relationship_name)
-        related_model = relationship.property.mapper.class_
-        alias = aliased(related_model)
-
-        foreign_keys = list(relationship.property.local_remote_pairs)
-        local_col, remote_col = foreign_keys[0]
-
-        exists_clause = exists(alias).where(
-            getattr(alias, remote_col.name) == getattr(self.model_class, local_col.name),
-            self._adapt_condition(condition, alias),
-        )
-        return exists_clause
-
-    def cast_value(self, column: ColumnElement, value: Any) -> Any:  # pragma: no cover
-        if isinstance(value, column.type.python_type):
-            return value
-        try:
-            if column.type.python_type is str:
-                return str(value)
-            if column.type.python_type is bool:
-                return bool(value)
-            if column.type.python_type is int:
-                return int(value)
-            if column.type.python_type is float:
-                return float(value)
-            if column.type.python_type is Decimal:
-                return Decimal(value)
-            if column.type.python_type is datetime:
-                return datetime.fromisoformat(value)
-            if column.type.python_type is date:
-                return date.fromisoformat(value)
-            if issubclass(column.type.python_type, Enum):
-                return column.type.python_type(value)
-        except Exception as e:
-            raise ValueError(f"Cannot cast value {value} to {column.type.python_type}: {e}") from e
-
-    def _adapt_condition(self, condition, alias):
-        if isinstance(condition, BooleanClauseList):
-            return condition.operator(
-                *(self._adapt_condition(clause, alias) for clause in condition.clauses)
+        """Returns a correlated EXISTS over the related rows matching the condition.
+
+        The subquery joins the related rows to the row of the enclosing query on the columns
+        of the relationship, through its secondary table for many-to-many relationships,
+        and the relationships its properties need after them.
+        """
+        scope = self.context.scopes.pop()
+        relationship_property = scope.relationship.property
+        parent = scope.relationship.parent.entity
+        target = scope.target
+        if relationship_property.secondary is None:
+            from_clause = target
+            correlation = [
+                _get_column(target, remote) == _get_column(parent, local)
+                for local, remote in relationship_property.local_remote_pairs
+            ]
+        else:
+            secondary = relationship_property.secondary.alias()
+            from_clause = secondary.join(
+                target,
+                and_(
+                    *(
+                        _get_column(target, column) == secondary.c[secondary_column.key]
+                        for column, secondary_column in (
+                            relationship_property.secondary_synchronize_pairs
+                        )
+                    )
+                ),
+            )
+            correlation = [
+                secondary.c[secondary_column.key] == _get_column(parent, column)
+                for column, secondary_column in relationship_property.synchronize_pairs
+            ]
+        for join in scope.joins.values():
+            from_clause = orm_join(from_clause, join.target, join.on, isouter=join.is_outer)
+        return exists().select_from(from_clause).where(*correlation, condition)
+
+    def is_relationship(self, path: str) -> bool:
+        entity = self.model_class
+        for part in path.split("."):
+            attribute = getattr(entity, part)
+            if not isinstance(attribute.property, RelationshipProperty):
+                return False
+            entity = attribute.property.mapper.class_
+        return True
+
+    def get_projection(self, query: ir.Query) -> Projection | None:
+        """Returns the fields to load of the rows of the query, see
+        `QueryBuilder.get_projection`, along with its joins with `eager_joins`"""
+        projection = super().get_projection(query)
+        if projection is None and self.eager_joins and self.context.joins:
+            return Projection()
+        return projection
+
+    def compile_projection(self, projection: Projection) -> list[Load]:
+        """Compiles the fields to load into loader options: the related rows are joined to
+        the rows, with `load_only` when only some of their fields are loaded, the deferred
+        fields are left out with `defer` and the included relationships are loaded with
+        `joinedload`, or `selectinload` for those leading to many rows. With `eager_joins`,
+        the relationships the query joins are loaded out of their joins with
+        `contains_eager`."""
+        options: list[Load] = []
+        if self.eager_joins:
+            options.extend(self._get_loader(path)[0] for path in self.context.joins)
+        for path, names in projection.relationships.items():
+            option, entity = self._get_loader(path, Load.joinedload)
+            if names is not None:
+                columns = [getattr(entity, name) for name in names] or [
+                    _get_column(entity, column) for column in inspect(entity).primary_key
+                ]
+                option = option.load_only(*columns)
+            options.append(option)
+        for path in projection.deferred:
+            relationship_path, _, name = path.rpartition(".")
+            option, entity = self._get_loader(relationship_path, Load.defaultload)
+            options.append(option.defer(getattr(entity, name)))
+        for path in projection.includes:
+            options.append(self._get_loader(path)[0])
+        return options
+
+    def _get_loader(
+        self, path: str, loader: Callable[[Load, Any], Load] | None = None
+    ) -> tuple[Load, Any]:
+        # The loader option of the relationships along the path and the entity it leads to.
+        # Relationships the query joins are loaded out of their join with `eager_joins`, the
+        # others with `loader`, which only loads relationships to a single row, or if None
+        # with `joinedload` or `selectinload` depending on how many rows they lead to
+        joins = self.context.joins if self.eager_joins else {}
+        option, entity = Load(self.model_class), self.model_class
+        parts = path.split(".") if path else []
+        for end, part in enumerate(parts, start=1):
+            relationship_path = ".".join(parts[:end])
+            join = joins.get(relationship_path)
+            if join is not None:
+                option, entity = (
+                    option.contains_eager(join.relationship.of_type(join.target)),
+                    join.target,
+                )
+                continue
+            relationship = getattr(entity, part)
+            if loader is not None and relationship.property.uselist:
+                raise ValueError(
+                    f"Relationship '{relationship_path}' has many rows, "
+                    "it cannot be loaded along with the rows."
+                )
+            step = loader or (
+                Load.selectinload if relationship.property.uselist else Load.joinedload
             )
-        return condition.operator(getattr(alias, condition.left.key), condition.right.value)
+            option, entity = step(option, relationship), relationship.property.mapper.class_
+        return option, entity
+
+    def apply_projection(self, query: Query, projection: list[Load]) -> Query:
+        return query.options(*projection)
 
     def apply_filter(self, query: Query, filter_expression: FilterExpression) -> Query:
         return query.filter(filter_expression.condition)
 
-    def apply_joins(self, query: Query):
-        for join_expr in self.joins:
+    def apply_joins(self, query: Query, joins: tuple[JoinExpression, ...]) -> Query:
+        for join_expr in joins:
             query = query.join(join_expr.target, join_expr.on, isouter=join_expr.is_outer)
         return query
 
-    def apply_order_by(self, query: Query, order_by_expression: OrderByExpression) -> Query:
+    async def aexecute(
+        self, query: Any, session: AsyncSession | None = None, stream: bool = False
+    ) -> Any:
+        """Runs the query through the session.
+
+        Returns the list of the objects it selects or, with `stream`, an async iterator
+        over them.
+        """
+        if session is None:
+            raise ValueError("An AsyncSession is required to run SQLAlchemy queries.")
+        if stream:
+            return await session.stream_scalars(query)
+        return (await session.scalars(query)).all()
+
+    def compile_order_by(self, order_by_expression: OrderByExpression) -> list[Any]:
         fields = []
         for order_field in order_by_expression.fields:
             field = self.resolve_property(order_field.field_path)
             if order_field.direction == "-":
                 field = field.desc()
             fields.append(field)
-        return query.order_by(*fields)
+        return fields
+
+    def apply_ordering(self, query: Query, ordering: list[Any]) -> Query:
+        return query.order_by(*ordering)
+
+    def get_primary_key(self) -> tuple[str, ...]:
+        mapper = inspect(self.model_class)
+        return tuple(mapper.get_property_by_column(column).key for column in mapper.primary_key)
+
+    def compile_key(self, order_field: OrderField) -> SortKey:
+        """Returns the column of the sort key, which can be null if its column is nullable
+        or its path goes through an outer join"""
+        path = order_field.field_path
+        column = self._resolve_path(path)
+        joins = self.context.joins
+        parts = path.split(".")
+        nullable = column.property.columns[0].nullable or any(
+            joins[".".join(parts[:end])].is_outer for end in range(1, len(parts))
+        )
+        return SortKey(
+            expression=column, descending=order_field.direction == "-", nullable=nullable
+        )
+
+    def compile_keyset_ordering(self, keys: tuple[SortKey, ...]) -> list[Any]:
+        ordering = []
+        for key in keys:
+            field = key.expression.desc() if key.descending else key.expression.asc()
+            ordering.append(field.nulls_last() if key.nullable else field)
+        return ordering
+
+    def compile_seek(self, keys: tuple[SortKey, ...], null_keys: tuple[bool, ...]) -> Any:
+        """Compiles the seek condition into a comparison of row values, `(k1, k2) > (v1, v2)`,
+        which databases match against an index on the keys, when there are several keys,
+        all sorted in the same direction and none of them nullable"""
+        descending = keys[0].descending
+        if len(keys) == 1 or any(key.nullable or key.descending != descending for key in keys):
+            return super().compile_seek(keys, null_keys)
+        context = self.context
+        values = []
+        for key in keys:
+            values.append(self.bind_key(key))
+            context.slot += 1
+        columns = tuple_(*(key.expression for key in keys))
+        return columns < tuple_(*values) if descending else columns > tuple_(*values)
+
+    def bind_key(self, key: SortKey) -> BindParameter:
+        return self.bind_literal(key.expression)
+
+    def apply_key_comparison(self, key: SortKey, operator: Operator, value: Any) -> Any:
+        if value is None:
+            return key.expression.is_(None)
+        if operator == Operator.GT:
+            return key.expression > value
+        if operator == Operator.LT:
+            return key.expression < value
+        return key.expression == value
+
+    def apply_keys(self, query: Query, keys: tuple[SortKey, ...]) -> Query:
+        return query.add_columns(*(key.expression for key in keys))
+
+    def apply_limit(self, query: Query, limit: int, offset: int = 0) -> Query:
+        query = query.limit(limit)
+        return query.offset(offset) if offset else query
+
+    def apply_count(self, query: Any) -> Any:
+        """Selects `count(*)` in place of the rows, out of the same tables and joins"""
+        return query.with_only_columns(func.count(), maintain_column_froms=True).order_by(None)
+
+    def count_rows(self, count_query: Any, session: Session | None = None) -> int:
+        if session is None:
+            raise ValueError("A Session is required to run SQLAlchemy queries.")
+        return session.scalar(count_query)
+
+    async def acount_rows(self, count_query: Any, session: AsyncSession | None = None) -> int:
+        if session is None:
+            raise ValueError("An AsyncSession is required to run SQLAlchemy queries.")
+        return await session.scalar(count_query)
+
+    def estimate_rows(self, query: Any, session: Session | None = None) -> int | None:
+        """Returns the number of rows in the plan of the query, on PostgreSQL only"""
+        if session is None:
+            raise ValueError("A Session is required to run SQLAlchemy queries.")
+        if session.get_bind().dialect.name != "postgresql":
+            return None
+        return get_plan_rows(session.scalar(Explain(query)))
+
+    async def aestimate_rows(self, query: Any, session: AsyncSession | None = None) -> int | None:
+        if session is None:
+            raise ValueError("An AsyncSession is required to run SQLAlchemy queries.")
+        if session.get_bind().dialect.name != "postgresql":
+            return None
+        return get_plan_rows(await session.scalar(Explain(query)))
+
+    def split_row(self, row: Any, key_count: int) -> tuple[Any, tuple[Any, ...]]:
+        return row[0], tuple(row[1 : key_count + 1])
+
+    def fetch_rows(self, query: Any, session: Session | None = None) -> list[Any]:
+        if session is None:
+            raise ValueError("A Session is required to run SQLAlchemy queries.")
+        return list(session.execute(query).all())
+
+    async def afetch_rows(self, query: Any, session: AsyncSession | None = None) -> list[Any]:
+        if session is None:
+            raise ValueError("An AsyncSession is required to run SQLAlchemy queries.")
+        return list((await session.execute(query)).all())
+
+
+class Explain(Executable, ClauseElement):
+    """The `EXPLAIN (FORMAT JSON)` of a statement, which returns its plan"""
+
+    inherit_cache = False
+
+    def __init__(self, statement: Any):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element: Explain, compiler: Any, **kw: Any) -> str:
+    return f"EXPLAIN (FORMAT JSON) {compiler.process(element.statement, **kw)}"
+
+
+class InValues(ColumnElement[bool]):
+    """The `in()`, or with `negate` the `out()`, of a column and the values of a parameter.
+
+    The values are bound to the parameter as a single list, whatever their number. It is
+    compiled into an expanding `IN`, whose parameters SQLAlchemy renders when the statement
+    runs, or on PostgreSQL into `= ANY` of an array, so the statement is the same for any
+    number of values and so is its plan in the cache of the database.
+    """
+
+    __visit_name__ = "in_values"
+    inherit_cache = True
+    type = Boolean()
+    _traverse_internals = [
+        ("column", InternalTraversal.dp_clauseelement),
+        ("parameter", InternalTraversal.dp_clauseelement),
+        ("negate", InternalTraversal.dp_boolean),
+    ]
+
+    def __init__(self, column: Any, parameter: BindParameter, negate: bool = False):
+        self.column = column
+        self.parameter = parameter
+        self.negate = negate
+
+    def _negate(self) -> "InValues":
+        return InValues(self.column, self.parameter, negate=not self.negate)
+
+
+@compiles(InValues)
+def _compile_in_values(element: InValues, compiler: Any, **kw: Any) -> str:
+    if element.negate:
+        return compiler.process(element.column.not_in(element.parameter), **kw)
+    return compiler.process(element.column.in_(element.parameter), **kw)
+
+
+@compiles(InValues, "postgresql")
+def _compile_in_values_postgresql(element: InValues, compiler: Any, **kw: Any) -> str:
+    # A copy of the parameter holding the list as a whole, which SQLAlchemy still matches
+    # to the parameter when the values of a cached statement are extracted
+    array = element.parameter._clone()
+    array.expanding = False
+    array.type = ARRAY(element.column.type)
+    if element.negate:
+        return compiler.process(element.column != all_(array), **kw)
+    return compiler.process(element.column == any_(array), **kw)
+
+
+@dataclass
+class AnyScope:
+    """An `any()` whose condition is being compiled.
+
+    `path` is the path of its relationship, `target` the alias of the related model in its
+    subquery and `joins` the joins of the subquery, keyed by their relationship path.
+    """
+
+    path: str
+    relationship: Any
+    target: Any
+    joins: dict[str, JoinExpression] = field(default_factory=dict)
+
 
-    def build_query(self, rql_query: str, initial_query: Any = None) -> Any:
-        self.joins = []
-        return super().build_query(rql_query=rql_query, initial_query=initial_query)
+def _get_column(entity: Any, column: Any) -> Any:
+    """Returns the attribute of the entity, a model or an alias, mapped to the column"""
+    return getattr(entity, inspect(entity).mapper.get_property_by_column(column).key)
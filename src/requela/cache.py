@@ -0,0 +1,219 @@
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from threading import Lock
+from typing import Any
+
+from requela.dataclasses import CacheStats
+
+_SKETCH_DEPTH = 4
+_SKETCH_SEEDS = (
+    0x9E3779B97F4A7C15,
+    0xC2B2AE3D27D4EB4F,
+    0x165667B19E3779F9,
+    0xD6E8FEB86659FD93,
+)
+_SKETCH_MIN_WIDTH = 64
+_HASH_MASK = (1 << 64) - 1
+_SKETCH_MAX_COUNT = 15
+_SKETCH_HALVE_TABLE = bytes(count >> 1 for count in range(256))
+_MISSING = object()
+
+
+class FrequencySketch:
+    """A count-min sketch with 4-bit counters and periodic aging.
+
+    It estimates how many times a key has been seen recently using a fixed amount of memory
+    regardless of how many distinct keys are recorded. Once ``sample_size`` increments have
+    been recorded every counter is halved so that keys which were popular in the past
+    gradually lose their weight.
+    """
+
+    def __init__(self, capacity: int):
+        width = _SKETCH_MIN_WIDTH
+        while width < capacity:
+            width <<= 1
+        self._shift = 64 - width.bit_length() + 1
+        self._rows = [bytearray(width) for _ in range(_SKETCH_DEPTH)]
+        self._sample_size = 10 * width
+        self._additions = 0
+
+    def _indexes(self, key: Hashable) -> list[int]:
+        # Multiplicative hashing with a different odd multiplier per row
+        key_hash = hash(key) & _HASH_MASK
+        return [(key_hash * seed & _HASH_MASK) >> self._shift for seed in _SKETCH_SEEDS]
+
+    def increment(self, key: Hashable) -> None:
+        for row, index in zip(self._rows, self._indexes(key), strict=True):
+            if row[index] < _SKETCH_MAX_COUNT:
+                row[index] += 1
+        self._additions += 1
+        if self._additions >= self._sample_size:
+            self._reset()
+
+    def estimate(self, key: Hashable) -> int:
+        return min(row[index] for row, index in zip(self._rows, self._indexes(key), strict=True))
+
+    def _reset(self) -> None:
+        for row in self._rows:
+            row[:] = row.translate(_SKETCH_HALVE_TABLE)
+        self._additions //= 2
+
+
+class ParseCache:
+    """LRU cache with TinyLFU admission and a negative cache for invalid entries.
+
+    While the cache has free slots every entry is admitted. Once it is full, a new entry
+    only replaces the least recently used one if it has been requested more often, so a
+    burst of one-off keys cannot flush the entries that are requested over and over again.
+
+    Errors are remembered in a separate, smaller LRU so that repeatedly submitted invalid
+    entries are rejected without doing the work again.
+    """
+
+    def __init__(self, maxsize: int = 1000, negative_maxsize: int = 256):
+        self._lock = Lock()
+        self._configure(maxsize, negative_maxsize)
+
+    def _configure(self, maxsize: int, negative_maxsize: int) -> None:
+        if maxsize < 0 or negative_maxsize < 0:
+            raise ValueError("Cache sizes must be greater than or equal to zero.")
+        self.maxsize = maxsize
+        self.negative_maxsize = negative_maxsize
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+        self._errors: OrderedDict[Hashable, str] = OrderedDict()
+        self._sketch = FrequencySketch(maxsize)
+        self._hits = 0
+        self._misses = 0
+        self._negative_hits = 0
+        self._evictions = 0
+        self._rejections = 0
+
+    def configure(self, maxsize: int | None = None, negative_maxsize: int | None = None) -> None:
+        """Resizes the cache, dropping every cached entry and resetting the statistics"""
+        with self._lock:
+            self._configure(
+                self.maxsize if maxsize is None else maxsize,
+                self.negative_maxsize if negative_maxsize is None else negative_maxsize,
+            )
+
+    def clear(self) -> None:
+        """Drops every cached entry and resets the statistics"""
+        self.configure()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            self._sketch.increment(key)
+            value = self._entries.get(key, _MISSING)
+            if value is _MISSING:
+                self._misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+                return
+            if self.maxsize == 0:
+                self._rejections += 1
+                return
+            if len(self._entries) >= self.maxsize:
+                victim = next(iter(self._entries))
+                if self._sketch.estimate(key) <= self._sketch.estimate(victim):
+                    self._rejections += 1
+                    return
+                del self._entries[victim]
+                self._evictions += 1
+            self._entries[key] = value
+
+    def get_error(self, key: Hashable) -> str | None:
+        with self._lock:
+            message = self._errors.get(key)
+            if message is not None:
+                self._errors.move_to_end(key)
+                self._negative_hits += 1
+            return message
+
+    def put_error(self, key: Hashable, message: str) -> None:
+        with self._lock:
+            if self.negative_maxsize == 0:
+                return
+            self._errors[key] = message
+            self._errors.move_to_end(key)
+            if len(self._errors) > self.negative_maxsize:
+                self._errors.popitem(last=False)
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                negative_hits=self._negative_hits,
+                evictions=self._evictions,
+                rejections=self._rejections,
+                size=len(self._entries),
+                maxsize=self.maxsize,
+            )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+
+class TTLCache:
+    """LRU cache whose entries expire `ttl` seconds after they are put.
+
+    Expired entries are dropped as they are requested, or as the least recently used ones
+    once the cache is full.
+    """
+
+    def __init__(
+        self, ttl: float, maxsize: int = 1024, clock: Callable[[], float] = time.monotonic
+    ):
+        if ttl <= 0:
+            raise ValueError("The time to live must be greater than zero.")
+        if maxsize < 0:
+            raise ValueError("Cache sizes must be greater than or equal to zero.")
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._clock = clock
+        self._lock = Lock()
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def clear(self) -> None:
+        """Drops every cached entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            if self.maxsize == 0:
+                return
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
@@ -0,0 +1,114 @@
+"""Conversion of literals to the Python type of the fields they are compared to.
+
+Coercers are built once per type and looked up when a comparison is compiled, so binding a
+literal calls a single function, picked upfront, instead of dispatching on the type of the
+field for every value. Literals reach them in their raw form, see `ir.split_literals`:
+numbers and dates as written in the query, strings and keywords as their value.
+"""
+
+from collections.abc import Callable, Sequence
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from functools import cache
+from typing import Any
+from uuid import UUID
+
+_MISSING = object()
+
+BOOLEANS = {True: True, False: False, "true": True, "false": False, "1": True, "0": False}
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _to_str(value: Any) -> str:
+    return value if type(value) is str else str(value)
+
+
+def _to_bool(value: Any) -> bool:
+    return BOOLEANS[value]
+
+
+def _to_date(value: Any) -> date:
+    return value if type(value) is date else date.fromisoformat(value)
+
+
+def _to_datetime(value: Any) -> datetime:
+    return value if type(value) is datetime else datetime.fromisoformat(value)
+
+
+def _to_uuid(value: Any) -> UUID:
+    return value if type(value) is UUID else UUID(value)
+
+
+CONVERTERS: dict[type, Callable[[Any], Any]] = {
+    str: _to_str,
+    int: int,
+    float: float,
+    Decimal: Decimal,
+    bool: _to_bool,
+    date: _to_date,
+    datetime: _to_datetime,
+    UUID: _to_uuid,
+}
+
+
+def _enum_converter(enum_type: type[Enum]) -> Callable[[Any], Any]:
+    # Members are looked up by their value and by its text, as written in queries
+    members: dict[Any, Enum] = {}
+    for member in enum_type:
+        members.setdefault(member.value, member)
+        members.setdefault(str(member.value), member)
+
+    def convert(value: Any) -> Enum:
+        member = members.get(value, _MISSING)
+        if member is _MISSING:
+            return enum_type(value)
+        return member  # type: ignore[return-value]
+
+    return convert
+
+
+def _get_converter(python_type: type) -> Callable[[Any], Any]:
+    if issubclass(python_type, Enum):
+        return _enum_converter(python_type)
+    return CONVERTERS.get(python_type, _identity)
+
+
+@cache
+def get_coercer(python_type: type) -> Callable[[Any], Any]:
+    """Returns the function converting a literal to `python_type`.
+
+    Literals of types without a converter are kept as they are. A literal that cannot be
+    converted raises a `ValueError`.
+    """
+    convert = _get_converter(python_type)
+
+    def coerce(value: Any) -> Any:
+        try:
+            return convert(value)
+        except Exception as e:
+            raise ValueError(f"Cannot cast value {value} to {python_type}: {e}") from e
+
+    return coerce
+
+
+@cache
+def get_tuple_coercer(python_type: type) -> Callable[[Sequence[Any]], list[Any]]:
+    """Returns the function converting the literals of a tuple to `python_type`.
+
+    The values are deduplicated, keeping the first occurrence of each.
+    """
+    convert = _get_converter(python_type)
+    coerce = get_coercer(python_type)
+
+    def coerce_all(values: Sequence[Any]) -> list[Any]:
+        try:
+            return list(dict.fromkeys([convert(value) for value in values]))
+        except Exception:
+            # Convert them again one by one to report the value that cannot be converted
+            return [coerce(value) for value in values]
+
+    return coerce_all
@@ -0,0 +1,111 @@
+"""Static estimation of the cost of running a query.
+
+The cost is estimated out of the IR of a query, before it is built: the joins its dotted
+paths need, the correlated subqueries of its `any()` conditions, the `like` and `ilike`
+patterns starting with a wildcard, which cannot use an index, the negations, the large
+`in()` and `out()` tuples, and whether it selects whole tables for lack of a filter and
+of a limit.
+"""
+
+from collections.abc import Callable
+
+from requela import ir
+from requela.dataclasses import LogicalOperator, Operator, QueryCost
+
+NEGATIONS = frozenset({Operator.NE, Operator.OUT})
+PATTERNS = frozenset({Operator.LIKE, Operator.ILIKE})
+
+
+def _identity(path: str) -> str:
+    return path
+
+
+def _add_joins(joins: set[str], scopes: list[tuple[str, str]], path: str) -> None:
+    # Every relationship along the path is a join, within the subquery of the innermost
+    # `any()` the path is under, the query itself if none
+    key, relative = "", path
+    for scope_key, scope_path in reversed(scopes):
+        if path.startswith(f"{scope_path}."):
+            key, relative = scope_key, path[len(scope_path) + 1 :]
+            break
+    parts = relative.split(".")
+    for end in range(1, len(parts)):
+        joins.add(key + ".".join(parts[:end]))
+
+
+def estimate_cost(
+    query: ir.Query, resolve_alias: Callable[[str], str] = _identity, limited: bool = False
+) -> QueryCost:
+    """Counts the features of a parsed query that make it expensive to run.
+
+    Fields are counted by the path `resolve_alias` resolves them to, and joins once per
+    relationship path, however many fields of the relationship the query uses. Fields
+    under the relationship of an `any()` are joined within its subquery, other fields
+    within the enclosing query, as they are when the query is built. Large
+    tuples are not counted, as they depend on the literals rather than on the shape of the
+    query, see `QueryCost.with_large_ins`. A query is unbounded if it has neither a filter
+    nor a `limit()`, unless `limited` tells that its rows are limited anyway, like those of
+    pages and of builders with a default limit.
+
+    Negations are counted by the comparisons and `any()` conditions `not()` applies to,
+    along with the `ne()` and `out()` comparisons, so that pushing `not()` down to them, see
+    `requela.optimizer`, keeps their number.
+    """
+    joins: set[str] = set()
+    subqueries = leading_wildcards = negations = 0
+    filtered = False
+    for expression in query:
+        if isinstance(expression, ir.Limit):
+            limited = True
+            continue
+        if isinstance(expression, ir.OrderBy):
+            for order_field in expression.fields:
+                _add_joins(joins, [], resolve_alias(order_field.field_path))
+            continue
+        if isinstance(expression, ir.Select):
+            # Included related fields are loaded along with the rows
+            for select_field in expression.fields:
+                if select_field.direction != "-":
+                    _add_joins(joins, [], resolve_alias(select_field.field_path))
+            continue
+        if isinstance(expression, ir.Include):
+            # Included relationships are joined, or loaded by a query of their own
+            for relationship in expression.relationships:
+                parts = resolve_alias(relationship).split(".")
+                joins.update(".".join(parts[:end]) for end in range(1, len(parts) + 1))
+            continue
+        filtered = True
+        scopes: list[tuple[str, str]] = []
+        # Whether the conditions walked are negated, by the `not()` above them within the
+        # innermost `any()`
+        negated = [False]
+        for node, leaving in ir.walk(expression):
+            if isinstance(node, ir.Any):
+                if leaving:
+                    scopes.pop()
+                    negated.pop()
+                else:
+                    path = resolve_alias(node.relationship)
+                    _add_joins(joins, scopes, path)
+                    subqueries += 1
+                    scopes.append((f"{subqueries}:", path))
+                    negations += negated[-1]
+                    negated.append(False)
+            elif isinstance(node, ir.Logical) and node.operator == LogicalOperator.NOT:
+                if leaving:
+                    negated.pop()
+                else:
+                    negated.append(not negated[-1])
+            elif leaving:
+                continue
+            elif isinstance(node, ir.Comparison):
+                _add_joins(joins, scopes, resolve_alias(node.field))
+                negations += negated[-1] + (node.operator in NEGATIONS)
+                leading_wildcards += node.operator in PATTERNS and str(node.value).startswith("*")
+    return QueryCost(
+        joins=len(joins),
+        subqueries=subqueries,
+        leading_wildcards=leading_wildcards,
+        negations=negations,
+        unbounded=not filtered and not limited,
+    )
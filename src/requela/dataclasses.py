@@ -1,5 +1,5 @@
-from collections.abc import Callable
-from dataclasses import dataclass
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass, field, replace
 from datetime import date, datetime
 from decimal import Decimal
 from enum import Enum
@@ -11,9 +11,9 @@ class FilterExpression:
     condition: Any
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class OrderField:
-    direction: str
+    direction: str | None
     field_path: str
 
 
@@ -22,6 +22,7 @@ class JoinExpression:
     target: Any
     on: Any
     is_outer: bool = False
+    relationship: Any = None
 
 
 @dataclass
@@ -29,6 +30,217 @@ class OrderByExpression:
     fields: list[OrderField]
 
 
+@dataclass(frozen=True)
+class Projection:
+    """The fields to load of the rows of a query, by attribute path.
+
+    `relationships` are the relationships to load along with the rows, each with the names
+    of the fields to load of the related rows, None for all of them, and `deferred` the
+    fields not to load, of the rows or of the related rows.
+    """
+
+    relationships: dict[str, tuple[str, ...] | None] = field(default_factory=dict)
+    deferred: tuple[str, ...] = ()
+    # The relationships of `include()`, loaded whole, in the same statement or, for those
+    # leading to many rows, in a statement of their own
+    includes: tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class SortKey:
+    """A sort key of the pages of a query, see `pagination`.
+
+    `expression` is the compiled field of the key and `nullable` whether its values can be
+    null, which sort after the others.
+    """
+
+    expression: Any
+    descending: bool
+    nullable: bool
+
+
+@dataclass(frozen=True)
+class Binding:
+    """A placeholder of a query template and the literal it is bound to.
+
+    `slot` is the position of the literal among the literals of the query and `convert`
+    turns the literal into the value of the placeholder.
+    """
+
+    key: Hashable
+    slot: int
+    convert: Callable[[Any], Any]
+
+
+@dataclass
+class BuildContext:
+    """The state of the query a builder is compiling into a template.
+
+    `bindings` are the placeholders created so far, `slot` the position of the literal of
+    the comparison being compiled, `joins` the joins needed so far, keyed by their
+    relationship path, and `scopes` the `any()` being compiled, innermost last, for
+    builders that keep track of them.
+    """
+
+    bindings: list[Binding] = field(default_factory=list)
+    slot: int = 0
+    joins: dict[str, Any] = field(default_factory=dict)
+    scopes: list[Any] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class CostModel:
+    """The weights of the features that make a query expensive to run.
+
+    `in()` and `out()` tuples count as large from `large_in_size` values.
+    """
+
+    join: int = 10
+    subquery: int = 25
+    leading_wildcard: int = 50
+    negation: int = 5
+    large_in: int = 20
+    large_in_size: int = 100
+    unbounded: int = 20
+
+
+@dataclass(frozen=True)
+class QueryCost:
+    """The features of a query that make it expensive to run, see `cost.estimate_cost`"""
+
+    joins: int = 0
+    subqueries: int = 0
+    leading_wildcards: int = 0
+    negations: int = 0
+    large_ins: int = 0
+    unbounded: bool = False
+
+    def score(self, model: CostModel) -> int:
+        return (
+            self.joins * model.join
+            + self.subqueries * model.subquery
+            + self.leading_wildcards * model.leading_wildcard
+            + self.negations * model.negation
+            + self.large_ins * model.large_in
+            + self.unbounded * model.unbounded
+        )
+
+    def with_large_ins(self, literals: tuple[Any, ...], model: CostModel) -> "QueryCost":
+        """Returns the cost with the `in()` and `out()` tuples among the literals counted"""
+        large_ins = sum(
+            1
+            for literal in literals
+            if isinstance(literal, tuple) and len(literal) >= model.large_in_size
+        )
+        return replace(self, large_ins=large_ins) if large_ins else self
+
+
+@dataclass(frozen=True)
+class QueryTemplate:
+    """A query compiled with placeholders in place of its literals.
+
+    `steps` are the filter conditions and orderings to apply, in the order of the query,
+    `joins` the joins they need, for builders that keep track of them, and `keys` the sort
+    keys to select along the rows of the templates of pages.
+    """
+
+    steps: tuple[tuple[str, Any], ...]
+    bindings: tuple[Binding, ...]
+    joins: tuple[Any, ...] = ()
+    cost: QueryCost = QueryCost()
+    keys: tuple[SortKey, ...] = ()
+
+
+@dataclass(frozen=True)
+class PageQuery:
+    """The query of a page, selecting a row more than `page_size` to tell whether a next
+    page follows, see `QueryBuilder.build_page_query`.
+
+    `keyset` holds the fields the rows are sorted by, by attribute path, and `empty` tells
+    whether the filters of the query cannot select any row, see `requela.optimizer`, so
+    the page is empty without running it.
+    """
+
+    query: Any
+    page_size: int
+    keyset: tuple[OrderField, ...]
+    empty: bool = False
+
+
+@dataclass(frozen=True)
+class Page:
+    """A page of the rows of a query and the cursor of the next page, None on the last one"""
+
+    items: list[Any]
+    next_cursor: str | None = None
+
+
+@dataclass(frozen=True)
+class BuildResult:
+    """The outcome of building one of the queries of a batch"""
+
+    rql_query: str
+    query: Any = None
+    error: Exception | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    hits: int
+    misses: int
+    negative_hits: int
+    evictions: int
+    rejections: int
+    size: int
+    maxsize: int
+
+
+@dataclass(frozen=True)
+class CanonicalQuery:
+    text: str
+    permutations: tuple[tuple[int, ...], ...] | None = None
+
+
+@dataclass(frozen=True)
+class QueryLimits:
+    """Upper bounds on the size and complexity of the queries a builder accepts.
+
+    A limit set to None is not enforced. `max_limit` bounds the `limit()` of queries and
+    `default_limit` is the limit of the queries without one, `max_limit` if None, so with
+    either of them set no query selects every row of a table.
+    """
+
+    max_length: int | None = 10_000
+    max_depth: int | None = 32
+    max_logical_arguments: int | None = 100
+    max_tuple_size: int | None = 1000
+    max_any_depth: int | None = 3
+    max_order_by_fields: int | None = 10
+    max_select_fields: int | None = 100
+    max_include_fields: int | None = 10
+    max_cost: int | None = None
+    max_limit: int | None = None
+    default_limit: int | None = None
+
+
+@dataclass(frozen=True)
+class QueryComplexity:
+    """The measures of a parsed query that are checked against `QueryLimits`"""
+
+    depth: int = 0
+    logical_arguments: int = 0
+    tuple_size: int = 0
+    any_depth: int = 0
+    order_by_fields: int = 0
+    select_fields: int = 0
+    include_fields: int = 0
+    limit: int = 0
+
+
 class Operator(Enum):
     EQ = "eq"
     NE = "ne"
@@ -43,6 +255,49 @@ class Operator(Enum):
     ANY = "any"
 
 
+class LogicalOperator(Enum):
+    AND = "and"
+    OR = "or"
+    NOT = "not"
+
+
+class IndexPolicy(Enum):
+    """What to do with filters and orderings that no index of the database can serve"""
+
+    IGNORE = "ignore"
+    WARN = "warn"
+    REJECT = "reject"
+
+
+DEFAULT_QUERY_LIMITS = QueryLimits()
+NO_QUERY_LIMITS = QueryLimits(
+    max_length=None,
+    max_depth=None,
+    max_logical_arguments=None,
+    max_tuple_size=None,
+    max_any_depth=None,
+    max_order_by_fields=None,
+    max_select_fields=None,
+    max_include_fields=None,
+    max_cost=None,
+    max_limit=None,
+    default_limit=None,
+)
+DEFAULT_COST_MODEL = CostModel()
+
+# Operators an index on a field can serve, `like` only without a leading wildcard
+INDEX_OPERATORS = frozenset(
+    {
+        Operator.EQ,
+        Operator.GT,
+        Operator.LT,
+        Operator.GTE,
+        Operator.LTE,
+        Operator.IN,
+        Operator.LIKE,
+    }
+)
+
 # Default operator sets based on field types
 DEFAULT_OPERATORS = {
     str: {
@@ -102,26 +357,3 @@ DEFAULT_OPERATORS = {
         Operator.OUT,
     },
 }
-
-
-@dataclass
-class OperatorFunctions:
-    # logical
-    and_op: Callable
-    or_op: Callable
-    not_op: Callable
-
-    # comparison
-    eq_op: Callable
-    ne_op: Callable
-    gt_op: Callable
-    lt_op: Callable
-    gte_op: Callable
-    lte_op: Callable
-    in_op: Callable
-    out_op: Callable
-    like_op: Callable
-    ilike_op: Callable
-
-    # any operator
-    any_op: Callable
@@ -1,2 +1,25 @@
+from requela.dataclasses import QueryCost
+
+
 class RequelaError(Exception):
     pass
+
+
+class QueryCostError(RequelaError, ValueError):
+    """Raised when the estimated cost of a query exceeds its budget.
+
+    `cost` holds what the cost is made of, `score` its total and `max_cost` the budget.
+    """
+
+    def __init__(self, cost: QueryCost, score: int, max_cost: int):
+        super().__init__(f"Query cost of {score} exceeds the maximum of {max_cost}.")
+        self.cost = cost
+        self.score = score
+        self.max_cost = max_cost
+
+
+class InvalidCursorError(RequelaError, ValueError):
+    """Raised when a pagination cursor is malformed or comes from a query sorted otherwise"""
+
+    def __init__(self):
+        super().__init__("Invalid pagination cursor.")
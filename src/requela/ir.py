@@ -0,0 +1,147 @@
+"""Backend-neutral intermediate representation of a parsed RQL query.
+
+The grammar produces these nodes in a single parse pass and they are what the parse cache
+keeps, so they are immutable, hashable and hold already typed literals. Query builders
+compile them into the expressions of their ORM.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from dataclasses import dataclass
+from dataclasses import field as dataclass_field
+
+from requela.dataclasses import LogicalOperator, Operator, OrderField
+
+
+@dataclass(frozen=True, slots=True)
+class Comparison:
+    operator: Operator
+    field: str
+    value: object
+    # The literal as written for the types the grammar guesses, see `transformer.literal`
+    raw: object = dataclass_field(default=None, compare=False)
+
+
+@dataclass(frozen=True, slots=True)
+class Logical:
+    operator: LogicalOperator
+    arguments: tuple[Node, ...]
+
+
+@dataclass(frozen=True, slots=True)
+class Any:
+    relationship: str
+    condition: Node
+
+
+@dataclass(frozen=True, slots=True)
+class Empty:
+    """The condition no row satisfies, which the optimizer replaces the filters of queries
+    that cannot select any row with, see `requela.optimizer`"""
+
+
+@dataclass(frozen=True, slots=True)
+class OrderBy:
+    fields: tuple[OrderField, ...]
+
+
+@dataclass(frozen=True, slots=True)
+class Select:
+    # The sign of a field is its direction: "-" excludes it, "+" or None includes it
+    fields: tuple[OrderField, ...]
+
+
+@dataclass(frozen=True, slots=True)
+class Include:
+    relationships: tuple[str, ...]
+
+
+@dataclass(frozen=True, slots=True)
+class Limit:
+    limit: int
+    offset: int = 0
+
+
+Node = Comparison | Logical | Any | Empty
+Expression = Node | OrderBy | Select | Include | Limit
+Query = tuple[Expression, ...]
+
+
+def children(node: Node) -> tuple[Node, ...]:
+    if isinstance(node, Logical):
+        return node.arguments
+    if isinstance(node, Any):
+        return (node.condition,)
+    return ()
+
+
+def walk(node: Node) -> Iterator[tuple[Node, bool]]:
+    """Traverses a node depth-first, left to right, with an explicit stack.
+
+    Every node is yielded twice: with False when the traversal enters it, before its
+    children, and with True when it leaves it, after its children. Being iterative, it
+    handles nesting of any depth without hitting the recursion limit.
+    """
+    stack: list[tuple[Node, bool]] = [(node, False)]
+    while stack:
+        node, leaving = stack.pop()
+        yield node, leaving
+        if not leaving:
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(children(node)))
+
+
+def filters(query: Query) -> tuple[Node, ...]:
+    """Returns the filters of a query, without its `order_by()`, `select()`, `include()`
+    and `limit()`"""
+    return tuple(expression for expression in query if isinstance(expression, Node))
+
+
+def literal_kind(value: object) -> object:
+    """Returns what the compiled form of a comparison may depend on in its literal.
+
+    Builders compile null and booleans into their own conditions and turn the leading and
+    trailing `*` of `like` patterns into different lookups, so those are kept, as is whether
+    patterns start with `_` or `%`, which have no prefix to rewrite into a range, see
+    `requela.rewrites`. For any other literal only its type is.
+    """
+    if value is None or value is True or value is False:
+        return value
+    if isinstance(value, str):
+        return str, value.startswith("*"), value.endswith("*"), value.startswith(("_", "%"))
+    return type(value)
+
+
+def split_literals(query: Query) -> tuple[tuple[object, ...], tuple[object, ...]]:
+    """Splits a query into its shape and its literals.
+
+    The shape is a hashable description of the query where the literals are replaced by
+    their kind, so queries that only differ in their literals share it. The literals are
+    returned in the order their comparisons appear in the query, in their raw form when
+    they have one, so builders convert them to the type of their field from their text.
+    Builders apply the `limit()` of a query apart from its template, so only whether it
+    has one is part of its shape.
+    """
+    shape: list[object] = []
+    literals: list[object] = []
+    for expression in query:
+        if isinstance(expression, OrderBy | Select | Include):
+            shape.append(expression)
+            continue
+        if isinstance(expression, Limit):
+            shape.append(Limit)
+            continue
+        for node, leaving in walk(expression):
+            if leaving:
+                continue
+            if isinstance(node, Comparison):
+                shape.append((node.operator, node.field, literal_kind(node.value)))
+                literals.append(node.value if node.raw is None else node.raw)
+            elif isinstance(node, Logical):
+                shape.append((node.operator, len(node.arguments)))
+            elif isinstance(node, Empty):
+                shape.append(Empty)
+            else:
+                shape.append((Any, node.relationship))
+    return tuple(shape), tuple(literals)
@@ -0,0 +1,298 @@
+"""Logical optimization of the filters of parsed queries.
+
+Queries written by clients are often redundant, and builders compile them as written.
+Builders created with `optimize_filters` optimize the filters of a query first, see
+`QueryBuilder.optimize`, so the conditions they compile are as small as the query allows:
+
+* `not()` is pushed down to the comparisons and the `any()` it applies to, with De Morgan's
+  laws, so double negations cancel out.
+* `and()` and `or()` nested in the same operator are flattened, and those left with a single
+  argument replaced by it.
+* Conditions repeated within an `and()` or an `or()`, or among the filters of the query, are
+  removed.
+* `eq()` and `in()` comparisons of a field within an `or()` are folded into a single `in()`.
+* Conditions that no row can satisfy, like `and(eq(age,30),eq(age,40))` or a condition along
+  with its negation, make the whole query select no row: its filters are replaced by
+  `ir.Empty`.
+
+Conditions are unknown rather than false for the rows whose fields are null, and so are
+their negations: `and(eq(email,a),ne(email,a))` selects no row, but neither does its `not()`
+select the rows whose `email` is null. A condition that no row satisfies is only replaced by
+false, and its negation by true, where it is under an even number of `not()`, which select
+the same rows either way.
+
+Comparisons are not inverted when `not()` is pushed down to them: `not(gt(age,30))` and
+`lte(age,30)` differ for the rows of Django models whose field is null, and fields may allow
+an operator but not its inverse. The passes are iterative, like `ir.walk`, so deeply nested
+queries don't hit the recursion limit.
+"""
+
+from collections.abc import Callable
+from typing import Any
+
+from requela import ir
+from requela.dataclasses import LogicalOperator, Operator
+
+# The conditions every row and no row satisfy, which only exist while optimizing
+_TRUE = object()
+_FALSE = object()
+
+DUAL_OPERATORS = {LogicalOperator.AND: LogicalOperator.OR, LogicalOperator.OR: LogicalOperator.AND}
+
+# Tells a condition apart from those that are not the same, see `_get_key`
+Key = tuple[Any, ...]
+# An optimized condition, or `_TRUE` or `_FALSE`, and its key
+Result = tuple[Any, Key]
+
+
+def _can_always_fold(comparison: ir.Comparison) -> bool:
+    return True
+
+
+def optimize(
+    query: ir.Query, can_fold: Callable[[ir.Comparison], bool] = _can_always_fold
+) -> ir.Query:
+    """Returns the query with its filters optimized.
+
+    `can_fold` tells whether an `eq()` or `in()` comparison can be folded into an `in()`,
+    e.g. whether the rules of its field allow it. The other expressions of the query are
+    kept as they are, and its filters in their order, those selecting no row replaced by a
+    single `ir.Empty` in place of the first one.
+    """
+    results: dict[Key, ir.Node] = {}
+    for condition in ir.filters(query):
+        # Negations are only pushed down once the negated conditions are optimized, as
+        # conditions and their negations are told apart before that
+        node, key = _optimize(condition, can_fold)
+        if node is not _TRUE and node is not _FALSE:
+            node, key = _optimize(_push_negations(node), can_fold)
+        if node is _FALSE:
+            return _select_nothing(query)
+        if node is not _TRUE:
+            results.setdefault(key, node)
+    conjuncts: list[Result] = []
+    for key, node in results.items():
+        if isinstance(node, ir.Logical) and node.operator == LogicalOperator.AND:
+            conjuncts.extend(zip(node.arguments, key[2], strict=True))
+        else:
+            conjuncts.append((node, key))
+    if _contradicts(conjuncts):
+        return _select_nothing(query)
+    optimized: list[ir.Expression] = []
+    filters = iter(results.values())
+    for expression in query:
+        if not isinstance(expression, ir.Node):
+            optimized.append(expression)
+        elif (optimized_filter := next(filters, None)) is not None:
+            optimized.append(optimized_filter)
+    return tuple(optimized)
+
+
+def is_empty(query: ir.Query) -> bool:
+    """Whether the optimizer found that the filters of the query cannot select any row"""
+    return any(isinstance(expression, ir.Empty) for expression in query)
+
+
+def _select_nothing(query: ir.Query) -> ir.Query:
+    optimized: list[ir.Expression] = []
+    for expression in query:
+        if not isinstance(expression, ir.Node):
+            optimized.append(expression)
+        elif not is_empty(tuple(optimized)):
+            optimized.append(ir.Empty())
+    return tuple(optimized)
+
+
+def _negate(node: ir.Node) -> ir.Node:
+    return ir.Logical(operator=LogicalOperator.NOT, arguments=(node,))
+
+
+def _push_negations(node: ir.Node) -> ir.Node:
+    """Returns the node with its `not()` applied to comparisons and `any()` only"""
+    results: list[ir.Node] = []
+    stack: list[tuple[ir.Node, bool, bool]] = [(node, False, False)]
+    while stack:
+        current, negated, leaving = stack.pop()
+        if isinstance(current, ir.Logical) and current.operator == LogicalOperator.NOT:
+            stack.append((current.arguments[0], not negated, False))
+        elif isinstance(current, ir.Logical):
+            if not leaving:
+                stack.append((current, negated, True))
+                stack.extend((argument, negated, False) for argument in reversed(current.arguments))
+                continue
+            arguments = tuple(results[-len(current.arguments) :])
+            del results[-len(current.arguments) :]
+            operator = DUAL_OPERATORS[current.operator] if negated else current.operator
+            results.append(ir.Logical(operator=operator, arguments=arguments))
+        elif isinstance(current, ir.Any):
+            if not leaving:
+                stack.append((current, negated, True))
+                stack.append((current.condition, False, False))
+                continue
+            result = ir.Any(relationship=current.relationship, condition=results.pop())
+            results.append(_negate(result) if negated else result)
+        else:
+            results.append(_negate(current) if negated else current)
+    return results[0]
+
+
+def _get_key(node: ir.Comparison) -> Key:
+    """Returns the key of a comparison: unlike the comparison itself, it includes its literal
+    as written, as literals written differently may be different values of some fields"""
+    literal = node.value if node.raw is None else node.raw
+    return ir.Comparison, node.operator, node.field, ir.literal_kind(node.value), literal
+
+
+def _optimize(node: ir.Node, can_fold: Callable[[ir.Comparison], bool]) -> Result:
+    results: list[Result] = []
+    # Whether the conditions walked are under an odd number of `not()` within the innermost
+    # `any()`, whose conditions are either true or false for its related rows
+    negated = [False]
+    for current, leaving in ir.walk(node):
+        if isinstance(current, ir.Any) or _is_negation(current):
+            if not leaving:
+                negated.append(_is_negation(current) and not negated[-1])
+                continue
+            negated.pop()
+        elif not leaving:
+            continue
+        if isinstance(current, ir.Comparison):
+            results.append((current, _get_key(current)))
+        elif isinstance(current, ir.Empty):
+            results.append((_FALSE, ()))
+        elif isinstance(current, ir.Any):
+            condition, key = results.pop()
+            if condition is _FALSE:
+                results.append((_FALSE, ()))
+            elif condition is _TRUE:
+                # Rows with any related row, which cannot be written without a condition
+                results.append((current, ir.split_literals((current,))))
+            else:
+                any_node = ir.Any(relationship=current.relationship, condition=condition)
+                results.append((any_node, (ir.Any, current.relationship, key)))
+        elif current.operator == LogicalOperator.NOT:
+            argument, key = results.pop()
+            if argument is _TRUE or argument is _FALSE:
+                results.append((_FALSE if argument is _TRUE else _TRUE, ()))
+            else:
+                results.append((_negate(argument), (ir.Logical, current.operator, (key,))))
+        else:
+            arguments = results[-len(current.arguments) :]
+            del results[-len(current.arguments) :]
+            results.append(_combine(current.operator, arguments, can_fold, not negated[-1]))
+    return results[0]
+
+
+def _is_negation(node: ir.Node) -> bool:
+    return isinstance(node, ir.Logical) and node.operator == LogicalOperator.NOT
+
+
+def _combine(
+    operator: LogicalOperator,
+    arguments: list[Result],
+    can_fold: Callable[[ir.Comparison], bool],
+    find_contradictions: bool = True,
+) -> Result:
+    """Optimizes an `and()` or an `or()` of optimized arguments, replacing an `and()` that
+    no row can satisfy by `_FALSE` with `find_contradictions`"""
+    absorbing, neutral = (_FALSE, _TRUE) if operator == LogicalOperator.AND else (_TRUE, _FALSE)
+    flattened: dict[Key, ir.Node] = {}
+    for node, key in arguments:
+        if node is absorbing:
+            return absorbing, ()
+        if node is neutral:
+            continue
+        if isinstance(node, ir.Logical) and node.operator == operator:
+            for argument, argument_key in zip(node.arguments, key[2], strict=True):
+                flattened.setdefault(argument_key, argument)
+        else:
+            flattened.setdefault(key, node)
+    results = [(node, key) for key, node in flattened.items()]
+    if operator == LogicalOperator.OR:
+        results = _fold(results, can_fold)
+    elif find_contradictions and _contradicts(results):
+        return _FALSE, ()
+    if not results:
+        return neutral, ()
+    if len(results) == 1:
+        return results[0]
+    node = ir.Logical(operator=operator, arguments=tuple(node for node, _ in results))
+    return node, (ir.Logical, operator, tuple(key for _, key in results))
+
+
+def _is_foldable(node: ir.Node) -> bool:
+    if not isinstance(node, ir.Comparison):
+        return False
+    if node.operator == Operator.IN:
+        return True
+    value = node.value
+    return node.operator == Operator.EQ and value is not None and not isinstance(value, bool)
+
+
+def _fold(results: list[Result], can_fold: Callable[[ir.Comparison], bool]) -> list[Result]:
+    """Folds the `eq()` and `in()` comparisons of each field among the arguments of an
+    `or()` that `can_fold` allows into an `in()`, in place of the first one"""
+    comparisons: dict[str, list[tuple[int, ir.Comparison]]] = {}
+    for position, (node, _) in enumerate(results):
+        if _is_foldable(node) and can_fold(node):
+            comparisons.setdefault(node.field, []).append((position, node))
+    folded: dict[int, Result | None] = {}
+    for field, field_comparisons in comparisons.items():
+        if len(field_comparisons) < 2:
+            continue
+        values: list[object] = []
+        raws: list[object] = []
+        for position, comparison in field_comparisons:
+            raw = comparison.value if comparison.raw is None else comparison.raw
+            if comparison.operator == Operator.IN:
+                values.extend(comparison.value)  # type: ignore[arg-type]
+                raws.extend(raw)  # type: ignore[arg-type]
+            else:
+                values.append(comparison.value)
+                raws.append(raw)
+            folded[position] = None
+        node = ir.Comparison(Operator.IN, field, value=tuple(values), raw=tuple(raws))
+        folded[field_comparisons[0][0]] = (node, _get_key(node))
+    optimized = []
+    for position, result in enumerate(results):
+        folded_result = folded.get(position, result)
+        if folded_result is not None:
+            optimized.append(folded_result)
+    return optimized
+
+
+def _are_distinct(value: object, other: object) -> bool:
+    """Whether two literals are surely different values of any field they are compared to.
+
+    Strings never are, as string fields are compared to them as written, while other fields
+    may convert different strings to the same value, e.g. UUIDs written in another case.
+    """
+    if value is None or other is None:
+        return (value is None) != (other is None)
+    if type(value) is not type(other) or isinstance(value, str):
+        return False
+    return value != other
+
+
+def _contradicts(conjuncts: list[Result]) -> bool:
+    """Whether no row can satisfy all the conditions at once"""
+    keys = {key for _, key in conjuncts}
+    equalities: dict[str, list[object]] = {}
+    for node, key in conjuncts:
+        if (
+            isinstance(node, ir.Logical)
+            and node.operator == LogicalOperator.NOT
+            and key[2][0] in keys
+        ):
+            # A condition along with its negation
+            return True
+        if not isinstance(node, ir.Comparison):
+            continue
+        if node.operator == Operator.NE and (ir.Comparison, Operator.EQ, *key[2:]) in keys:
+            return True
+        if node.operator == Operator.EQ:
+            values = equalities.setdefault(node.field, [])
+            if any(_are_distinct(value, node.value) for value in values):
+                return True
+            values.append(node.value)
+    return False
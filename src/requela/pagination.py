@@ -0,0 +1,89 @@
+"""Keyset pagination: the sort keys of the pages of a query and the cursors between them.
+
+The rows of a paginated query are sorted by the fields of its `order_by()` followed by the
+primary key of the model, which makes their order total. The cursor of the next page
+holds the sort keys of the last row of a page, and the next page is the rows sorted after
+it, which the database seeks to through an index on the keys instead of reading and
+skipping all the rows of the previous pages like an offset does.
+
+Cursors are the keys encoded in JSON, in base64 for URLs, preceded by a checksum of the
+fields they are keys of, so a cursor cannot be used with a query sorted otherwise.
+"""
+
+import base64
+import json
+import zlib
+from collections.abc import Callable, Sequence
+from datetime import date
+from enum import Enum
+from typing import Any
+
+from requela import ir
+from requela.dataclasses import OrderField
+from requela.exceptions import InvalidCursorError
+
+
+def _identity(path: str) -> str:
+    return path
+
+
+def get_keyset(
+    query: ir.Query,
+    primary_key: Sequence[str],
+    resolve_alias: Callable[[str], str] = _identity,
+) -> tuple[OrderField, ...]:
+    """Returns the fields the pages of the query are sorted by, by attribute path.
+
+    They are the fields of its `order_by()`, in their order and direction, followed by the
+    fields of the primary key it does not sort by, in the direction of the last field of
+    its `order_by()`, so the keys of a query sorted in a single direction can be compared
+    as a whole, and in ascending order if it has none.
+    """
+    keyset: dict[str, OrderField] = {}
+    direction = None
+    for expression in query:
+        if isinstance(expression, ir.OrderBy):
+            for order_field in expression.fields:
+                path = resolve_alias(order_field.field_path)
+                direction = "-" if order_field.direction == "-" else None
+                keyset.setdefault(path, OrderField(direction=direction, field_path=path))
+    for path in primary_key:
+        keyset.setdefault(path, OrderField(direction=direction, field_path=path))
+    return tuple(keyset.values())
+
+
+def _checksum(keyset: tuple[OrderField, ...]) -> int:
+    fields = ",".join(
+        f"{order_field.direction or ''}{order_field.field_path}" for order_field in keyset
+    )
+    return zlib.crc32(fields.encode())
+
+
+def _to_json(value: Any) -> Any:
+    # Keys are bound back through the coercer of their field, which reads them as written:
+    # enums as their value, dates in ISO format and others, decimals and UUIDs, as text
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_cursor(keyset: tuple[OrderField, ...], keys: Sequence[Any]) -> str:
+    """Returns the cursor of the page following a row, out of its sort keys"""
+    data = json.dumps([_checksum(keyset), *keys], separators=(",", ":"), default=_to_json)
+    return base64.urlsafe_b64encode(data.encode()).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, keyset: tuple[OrderField, ...]) -> tuple[Any, ...]:
+    """Returns the sort keys a cursor holds.
+
+    Raises `InvalidCursorError` if it is malformed or does not hold keys of the keyset.
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError as e:
+        raise InvalidCursorError() from e
+    if not isinstance(data, list) or len(data) != len(keyset) + 1 or data[0] != _checksum(keyset):
+        raise InvalidCursorError()
+    return tuple(data[1:])
@@ -1,19 +1,719 @@
-from functools import lru_cache
+"""RQL parsing.
+
+Queries are parsed by `QueryParser`, a hand-written tokenizer and recursive-descent parser
+for the language of `grammar.lark`. The LALR parser built by lark from the grammar is only
+used for the inputs `QueryParser` rejects, which are mostly invalid queries: it is the
+reference implementation of the grammar and the one reporting syntax errors.
+
+The LALR parse tables are generated ahead of time and shipped in `parser_tables.pickle`,
+so neither lark nor the grammar analysis is needed to import requela: lark is imported and
+the parser is loaded on the first call to `parse`. After changing `grammar.lark`, regenerate
+the tables with::
+
+    python -c "from requela.parser import save_parser_tables; save_parser_tables()"
+
+`parse` enforces `QueryLimits`: the length of a query is checked before anything else and
+`QueryParser` checks the other limits as it consumes the query, so a hostile query is
+rejected as soon as it crosses one of them.
+"""
+
+import re
+from collections.abc import Iterator, Sequence
 from pathlib import Path
+from threading import Lock
+from typing import TYPE_CHECKING, NoReturn
+
+from requela import ir
+from requela.cache import ParseCache
+from requela.dataclasses import (
+    NO_QUERY_LIMITS,
+    CanonicalQuery,
+    LogicalOperator,
+    Operator,
+    OrderField,
+    QueryComplexity,
+    QueryLimits,
+)
+from requela.transformer import RQLTransformer, literal
+
+if TYPE_CHECKING:  # pragma: no cover
+    from lark import Lark
 
-from lark import Lark, LarkError
-from lark.tree import ParseTree
+GRAMMAR_PATH = Path(__file__).parent / "grammar.lark"
+PARSER_TABLES_PATH = Path(__file__).parent / "parser_tables.pickle"
 
-with open(Path(__file__).parent / "grammar.lark") as f:
+with open(GRAMMAR_PATH) as f:
     GRAMMAR = f.read()
 
+PARSE_CACHE = ParseCache(maxsize=1000)
+
+COMMUTATIVE_OPERATORS = frozenset(("and", "or"))
+# The literals written as calls, which are single terminals of the grammar
+LITERAL_CALLS = frozenset(("null", "empty"))
+
+_SPECIAL_CHARS = re.compile(r"""[(),&'"]""")
+
+_KEYWORD = re.compile(r"([a-z_]+)\(")
+_PROPERTY = re.compile(r"[a-zA-Z_][\w\-\.]*")
+_SIGN = re.compile(r"([+-])[ \t\f\r\n]*")
+_WHITESPACE = re.compile(r"[ \t\f\r\n]*")
+_COUNT = re.compile(r"\d+")
+# Literal terminals in the order the lark lexer tries them, the first one that matches wins
+_LITERAL = re.compile(
+    r"(?P<DATETIME>\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:\d{2}))"
+    r"|(?P<QUOTED_STRING>'[^']*')"
+    r'|(?P<DOUBLE_QUOTED_STRING>"[^"]*")'
+    r"|(?P<UUID>[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})"
+    r"|(?P<DATE>\d{4}-\d{2}-\d{2})"
+    r"|(?P<FLOAT>-?\d+\.\d+)"
+    r"|(?P<INT>-?\d+)"
+    r"|(?P<NULL_LITERAL>null\(\))"
+    r"|(?P<EMPTY_LITERAL>empty\(\))"
+    r"|(?P<UNQUOTED_VAL>[^(),]+)"
+)
+
+LOGICAL_KEYWORDS = {operator.value: operator for operator in LogicalOperator}
+COMPARISON_KEYWORDS = {
+    operator.value: operator for operator in Operator if operator != Operator.ANY
+}
+
+# The measure of a query each limit applies to, along with how it is described in errors
+LIMITED_MEASURES = (
+    ("max_depth", "depth", "nesting depth"),
+    ("max_logical_arguments", "logical_arguments", "number of arguments of a logical operator"),
+    ("max_tuple_size", "tuple_size", "number of values in a tuple"),
+    ("max_any_depth", "any_depth", "any() nesting depth"),
+    ("max_order_by_fields", "order_by_fields", "number of order_by fields"),
+    ("max_select_fields", "select_fields", "number of select fields"),
+    ("max_include_fields", "include_fields", "number of include fields"),
+    ("max_limit", "limit", "limit"),
+)
+
+
+class _MalformedQueryError(Exception):
+    pass
+
+
+class QueryRejectedError(Exception):
+    """Raised by `QueryParser` for the inputs it leaves to the LALR parser"""
+
+
+class QueryLimitError(ValueError):
+    """Raised when a query exceeds one of the configured `QueryLimits`"""
+
+
+def _limit_exceeded(description: str, limit: int) -> NoReturn:
+    raise QueryLimitError(f"Query exceeds the maximum {description} of {limit}.")
+
+
+def check_limits(complexity: QueryComplexity, limits: QueryLimits) -> None:
+    """Raises `QueryLimitError` if the measures of a query exceed the limits"""
+    for limit_name, measure_name, description in LIMITED_MEASURES:
+        limit = getattr(limits, limit_name)
+        if limit is not None and getattr(complexity, measure_name) > limit:
+            _limit_exceeded(description, limit)
+
+
+def measure_complexity(query: ir.Query) -> QueryComplexity:
+    """Measures the complexity of a parsed query, without recursion"""
+    depth = any_depth = max_depth = max_any_depth = 0
+    logical_arguments = tuple_size = order_by_fields = select_fields = include_fields = 0
+    limit = 0
+    for expression in query:
+        if isinstance(expression, ir.OrderBy):
+            max_depth = max(max_depth, 1)
+            order_by_fields = max(order_by_fields, len(expression.fields))
+            continue
+        if isinstance(expression, ir.Select):
+            max_depth = max(max_depth, 1)
+            select_fields = max(select_fields, len(expression.fields))
+            continue
+        if isinstance(expression, ir.Include):
+            max_depth = max(max_depth, 1)
+            include_fields = max(include_fields, len(expression.relationships))
+            continue
+        if isinstance(expression, ir.Limit):
+            max_depth = max(max_depth, 1)
+            limit = expression.limit
+            continue
+        for node, leaving in ir.walk(expression):
+            step = -1 if leaving else 1
+            depth += step
+            max_depth = max(max_depth, depth)
+            if isinstance(node, ir.Any):
+                any_depth += step
+                max_any_depth = max(max_any_depth, any_depth)
+            elif isinstance(node, ir.Logical):
+                logical_arguments = max(logical_arguments, len(node.arguments))
+            elif isinstance(node, ir.Comparison) and isinstance(node.value, tuple):
+                tuple_size = max(tuple_size, len(node.value))
+    return QueryComplexity(
+        depth=max_depth,
+        logical_arguments=logical_arguments,
+        tuple_size=tuple_size,
+        any_depth=max_any_depth,
+        order_by_fields=order_by_fields,
+        select_fields=select_fields,
+        include_fields=include_fields,
+        limit=limit,
+    )
+
+
+class QueryParser:
+    """Hand-written tokenizer and recursive-descent parser for RQL.
+
+    It accepts the canonical form of the queries described by `grammar.lark` and builds the
+    same IR as the LALR parser, without going through lark's lexer and callbacks. Tokens are
+    read on demand, as the terminals allowed at a given position depend on the context just
+    like they do for lark's contextual lexer.
+
+    The limits, except for the length, are checked as the query is consumed and
+    `QueryLimitError` is raised as soon as one is exceeded. Once a query is parsed,
+    `complexity` holds its measures.
+    """
+
+    def __init__(self, text: str, limits: QueryLimits = NO_QUERY_LIMITS):
+        self.text = text
+        self.position = 0
+        self.limits = limits
+        self.complexity = QueryComplexity()
+        self._depth = 0
+        self._any_depth = 0
+        self._max_depth = 0
+        self._max_any_depth = 0
+        self._max_logical_arguments = 0
+        self._max_tuple_size = 0
+        self._max_order_by_fields = 0
+        self._max_select_fields = 0
+        self._max_include_fields = 0
+        self._limit = 0
+
+    def parse(self) -> ir.Query:
+        try:
+            expressions = [self._single_expression()]
+            while self._accept("&"):
+                expressions.append(self._single_expression())
+        except RecursionError:
+            self._reject()
+        if self.position != len(self.text):
+            self._reject()
+        self.complexity = QueryComplexity(
+            depth=self._max_depth,
+            logical_arguments=self._max_logical_arguments,
+            tuple_size=self._max_tuple_size,
+            any_depth=self._max_any_depth,
+            order_by_fields=self._max_order_by_fields,
+            select_fields=self._max_select_fields,
+            include_fields=self._max_include_fields,
+            limit=self._limit,
+        )
+        return tuple(expressions)
+
+    def _reject(self) -> NoReturn:
+        raise QueryRejectedError(self.text)
+
+    def _accept(self, char: str) -> bool:
+        if self.text.startswith(char, self.position):
+            self.position += 1
+            return True
+        return False
+
+    def _expect(self, char: str) -> None:
+        if not self.text.startswith(char, self.position):
+            self._reject()
+        self.position += 1
+
+    def _keyword(self) -> str:
+        match = _KEYWORD.match(self.text, self.position)
+        if match is None:
+            self._reject()
+        self.position = match.end()
+        return match.group(1)
+
+    def _property(self) -> str:
+        match = _PROPERTY.match(self.text, self.position)
+        if match is None:
+            self._reject()
+        self.position = match.end()
+        return match.group()
+
+    def _single_expression(self) -> ir.Expression:
+        if self._accept("("):
+            return self._grouped_expression()
+        keyword = self._keyword()
+        if keyword == "order_by":
+            return self._order_by()
+        if keyword == "select":
+            return self._select()
+        if keyword == "include":
+            return self._include()
+        if keyword == "limit":
+            return self._limit_expression()
+        return self._call(keyword)
+
+    def _expression(self) -> ir.Node:
+        if self._accept("("):
+            return self._grouped_expression()
+        return self._call(self._keyword())
+
+    def _grouped_expression(self) -> ir.Node:
+        expression = self._expression()
+        self._expect(")")
+        return expression
+
+    def _call(self, keyword: str) -> ir.Node:
+        self._depth += 1
+        if self._depth > self._max_depth:
+            self._max_depth = self._depth
+            if self.limits.max_depth is not None and self._depth > self.limits.max_depth:
+                _limit_exceeded("nesting depth", self.limits.max_depth)
+
+        node: ir.Node
+        if keyword in COMPARISON_KEYWORDS:
+            node = self._comparison(COMPARISON_KEYWORDS[keyword])
+        elif keyword in LOGICAL_KEYWORDS:
+            node = self._logical(LOGICAL_KEYWORDS[keyword])
+        elif keyword == "any":
+            node = self._any()
+        else:
+            self._reject()
+        self._depth -= 1
+        return node
+
+    def _logical(self, operator: LogicalOperator) -> ir.Logical:
+        limit = self.limits.max_logical_arguments
+        arguments = [self._expression()]
+        while self._accept(","):
+            if limit is not None and len(arguments) == limit:
+                _limit_exceeded("number of arguments of a logical operator", limit)
+            arguments.append(self._expression())
+        self._expect(")")
+        self._max_logical_arguments = max(self._max_logical_arguments, len(arguments))
+        return ir.Logical(operator=operator, arguments=tuple(arguments))
+
+    def _comparison(self, operator: Operator) -> ir.Comparison:
+        field = self._property()
+        self._expect(",")
+        if self._accept("("):
+            limit = self.limits.max_tuple_size
+            literals = [self._literal()]
+            while self._accept(","):
+                if limit is not None and len(literals) == limit:
+                    _limit_exceeded("number of values in a tuple", limit)
+                literals.append(self._literal())
+            self._expect(")")
+            self._max_tuple_size = max(self._max_tuple_size, len(literals))
+            value: object
+            raw: object
+            value, raw = zip(*literals, strict=True)
+        else:
+            value, raw = self._literal()
+        self._expect(")")
+        return ir.Comparison(operator=operator, field=field, value=value, raw=raw)
+
+    def _literal(self) -> tuple[object, object]:
+        match = _LITERAL.match(self.text, self.position)
+        if match is None:
+            self._reject()
+        self.position = match.end()
+        if match.lastgroup != "UNQUOTED_VAL":
+            # Trailing whitespace is only part of unquoted strings, the grammar ignores it
+            # after the other terminals
+            whitespace = _WHITESPACE.match(self.text, self.position)
+            self.position = whitespace.end()  # type: ignore[union-attr]
+        return literal(match.lastgroup, match.group())  # type: ignore[arg-type]
+
+    def _any(self) -> ir.Any:
+        self._any_depth += 1
+        if self._any_depth > self._max_any_depth:
+            self._max_any_depth = self._any_depth
+            limit = self.limits.max_any_depth
+            if limit is not None and self._any_depth > limit:
+                _limit_exceeded("any() nesting depth", limit)
+
+        relationship = self._property()
+        self._expect(",")
+        condition = self._call(self._keyword())
+        self._expect(")")
+        self._any_depth -= 1
+        return ir.Any(relationship=relationship, condition=condition)
+
+    def _order_by(self) -> ir.OrderBy:
+        fields = self._order_list(self.limits.max_order_by_fields, "number of order_by fields")
+        self._max_order_by_fields = max(self._max_order_by_fields, len(fields))
+        return ir.OrderBy(fields=fields)
+
+    def _select(self) -> ir.Select:
+        fields = self._order_list(self.limits.max_select_fields, "number of select fields")
+        self._max_select_fields = max(self._max_select_fields, len(fields))
+        return ir.Select(fields=fields)
+
+    def _include(self) -> ir.Include:
+        limit = self.limits.max_include_fields
+        relationships = [self._property()]
+        while self._accept(","):
+            if limit is not None and len(relationships) == limit:
+                _limit_exceeded("number of include fields", limit)
+            relationships.append(self._property())
+        self._expect(")")
+        self._max_depth = max(self._max_depth, 1)
+        self._max_include_fields = max(self._max_include_fields, len(relationships))
+        return ir.Include(relationships=tuple(relationships))
+
+    def _order_list(self, limit: int | None, description: str) -> tuple[OrderField, ...]:
+        fields = [self._order_field()]
+        while self._accept(","):
+            if limit is not None and len(fields) == limit:
+                _limit_exceeded(description, limit)
+            fields.append(self._order_field())
+        self._expect(")")
+        self._max_depth = max(self._max_depth, 1)
+        return tuple(fields)
+
+    def _limit_expression(self) -> ir.Limit:
+        # Invalid and repeated limits are left to the LALR parser, which reports them
+        limit = self._count()
+        offset = self._count() if self._accept(",") else 0
+        self._expect(")")
+        if limit == 0 or self._limit:
+            self._reject()
+        if self.limits.max_limit is not None and limit > self.limits.max_limit:
+            _limit_exceeded("limit", self.limits.max_limit)
+        self._max_depth = max(self._max_depth, 1)
+        self._limit = limit
+        return ir.Limit(limit=limit, offset=offset)
+
+    def _count(self) -> int:
+        match = _COUNT.match(self.text, self.position)
+        if match is None:
+            self._reject()
+        self.position = match.end()
+        return int(match.group())
+
+    def _order_field(self) -> OrderField:
+        direction = None
+        match = _SIGN.match(self.text, self.position)
+        if match is not None:
+            direction = match.group(1)
+            self.position = match.end()
+        return OrderField(direction=direction, field_path=self._property())
+
+
+_parser: "Lark | None" = None
+_parser_lock = Lock()
+
+
+def get_parser() -> "Lark":
+    """Returns the LALR parser, loading it on first use"""
+    global _parser
+    if _parser is None:
+        with _parser_lock:
+            if _parser is None:  # pragma: no branch
+                _parser = _load_parser()
+    return _parser
 
-PARSER = Lark(GRAMMAR, parser="lalr")
 
+def build_parser() -> "Lark":
+    """Builds the LALR parser from the grammar"""
+    from lark import Lark
 
-@lru_cache(maxsize=1000)
-def parse(rql_query: str) -> ParseTree:
+    return Lark(GRAMMAR, parser="lalr", transformer=RQLTransformer())
+
+
+def save_parser_tables(path: Path = PARSER_TABLES_PATH) -> None:
+    """Serializes the parser built from the grammar so it can be shipped along with it"""
+    import pickle
+
+    import lark
+    from lark.grammar import Rule
+    from lark.lexer import TerminalDef
+
+    data, memo = build_parser().memo_serialize([TerminalDef, Rule])
+    data["options"] = {
+        name: value for name, value in data["options"].items() if name != "transformer"
+    }
+    with open(path, "wb") as tables_file:
+        pickle.dump(
+            {
+                "grammar_hash": _grammar_hash(),
+                "lark_version": lark.__version__,
+                "parser": pickle.dumps(
+                    {"data": data, "memo": memo}, protocol=pickle.HIGHEST_PROTOCOL
+                ),
+            },
+            tables_file,
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+
+
+def _grammar_hash() -> str:
+    import hashlib
+
+    return hashlib.sha256(GRAMMAR.encode()).hexdigest()
+
+
+def _load_parser() -> "Lark":
+    """Loads the shipped parser tables, building the parser from the grammar if the tables
+    are missing or were generated from another grammar or lark version.
+
+    The parser is pickled apart from the versions it was generated from, as unpickling it
+    needs the lark classes it references, so the versions are checked first. Tables that
+    cannot be loaded anyway, e.g. corrupted ones, fall back to building the parser too.
+    """
+    import pickle
+
+    import lark
+
+    try:
+        with open(PARSER_TABLES_PATH, "rb") as tables_file:
+            tables = pickle.load(tables_file)
+        if tables["grammar_hash"] != _grammar_hash() or tables["lark_version"] != lark.__version__:
+            return build_parser()
+        parser = pickle.loads(tables["parser"])
+        return lark.Lark._load_from_dict(
+            parser["data"], parser["memo"], transformer=RQLTransformer()
+        )
+    except Exception:
+        return build_parser()
+
+
+def configure_parse_cache(maxsize: int | None = None, negative_maxsize: int | None = None):
+    """Resizes the shared parse cache, dropping every cached entry"""
+    PARSE_CACHE.configure(maxsize=maxsize, negative_maxsize=negative_maxsize)
+
+
+def canonicalize(rql_query: str) -> CanonicalQuery:
+    """Returns the canonical form of an RQL query.
+
+    The whitespace the grammar ignores, around calls and before values, is stripped and the
+    arguments of the commutative `and`/`or` operators are sorted, so equivalent queries
+    share the same text. The permutations needed to restore the original argument order
+    are returned along with it, one per `and`/`or` node in pre-order, or None if the
+    arguments were already sorted.
+
+    Queries whose parentheses or quotes are unbalanced are returned unchanged.
+    """
     try:
-        return PARSER.parse(rql_query)
+        parts = _scan(rql_query)
+    except _MalformedQueryError:
+        return CanonicalQuery(text=rql_query)
+
+    texts = []
+    permutations: list[tuple[int, ...]] = []
+    for text, part_permutations in parts:
+        texts.append(text)
+        permutations.extend(part_permutations)
+
+    is_sorted = all(permutation == tuple(range(len(permutation))) for permutation in permutations)
+    return CanonicalQuery(
+        text="&".join(texts),
+        permutations=None if is_sorted else tuple(permutations),
+    )
+
+
+def parse(rql_query: str, limits: QueryLimits = NO_QUERY_LIMITS) -> ir.Query:
+    """Parses an RQL query into its intermediate representation.
+
+    Raises `QueryLimitError` if the query exceeds the given limits, which are not
+    enforced by default.
+    """
+    if limits.max_length is not None and len(rql_query) > limits.max_length:
+        _limit_exceeded("length", limits.max_length)
+
+    canonical = canonicalize(rql_query)
+    entry = PARSE_CACHE.get(canonical.text)
+    if entry is None:
+        error = PARSE_CACHE.get_error(canonical.text)
+        if error is not None:
+            raise ValueError(error)
+        try:
+            entry = _parse_uncached(canonical.text, limits)
+        except QueryLimitError:
+            raise
+        except ValueError as e:
+            message = f"Invalid RQL query: {e}"
+            PARSE_CACHE.put_error(canonical.text, message)
+            raise ValueError(message) from e
+        PARSE_CACHE.put(canonical.text, entry)
+
+    query, complexity = entry
+    check_limits(complexity, limits)
+
+    if canonical.permutations:
+        permutations = iter(canonical.permutations)
+        return tuple(
+            expression
+            if isinstance(expression, ir.OrderBy | ir.Select | ir.Include | ir.Limit)
+            else _restore_order(expression, permutations)
+            for expression in query
+        )
+    return query
+
+
+def parse_many(
+    rql_queries: Sequence[str], limits: QueryLimits = NO_QUERY_LIMITS
+) -> list[ir.Query | ValueError]:
+    """Parses a batch of RQL queries, returning the error instead of the IR of the invalid ones.
+
+    The IR and the errors can be pickled, so batches can be parsed by other processes.
+    """
+    parsed_queries: list[ir.Query | ValueError] = []
+    for rql_query in rql_queries:
+        try:
+            parsed_queries.append(parse(rql_query, limits))
+        except ValueError as e:
+            parsed_queries.append(e)
+    return parsed_queries
+
+
+def _parse_uncached(text: str, limits: QueryLimits) -> tuple[ir.Query, QueryComplexity]:
+    parser = QueryParser(text, limits)
+    try:
+        return parser.parse(), parser.complexity
+    except QueryRejectedError:
+        pass
+
+    from lark import LarkError
+
+    try:
+        query: ir.Query = get_parser().parse(text)  # type: ignore[assignment]
     except LarkError as e:
-        raise ValueError(f"Invalid RQL query: {e}") from e
+        raise ValueError(str(e)) from e
+    return query, measure_complexity(query)
+
+
+def _scan(rql_query: str) -> list[tuple[str, tuple[tuple[int, ...], ...]]]:
+    """Splits the query into its `&` separated parts, serializing each one canonically.
+
+    Each part is returned as its canonical text along with the argument permutations of
+    its `and`/`or` nodes. The scan is iterative, so deeply nested queries are fine.
+    """
+    parts: list[tuple[str, tuple[tuple[int, ...], ...]]] = []
+    calls: list[tuple[str, list[tuple[str, tuple[tuple[int, ...], ...]]]]] = []
+    closed: tuple[str, tuple[tuple[int, ...], ...]] | None = None
+    start = position = 0
+
+    while True:
+        match = _SPECIAL_CHARS.search(rql_query, position)
+        if match is None:
+            break
+        char, index = match.group(), match.start()
+        position = index + 1
+
+        if char in "'\"":
+            # Quotes delimit a value only when the value starts with them
+            if closed is None and not rql_query[start:index].strip():
+                position = rql_query.find(char, position) + 1
+                if position == 0:
+                    raise _MalformedQueryError()
+            continue
+
+        if char == "&" and calls:
+            continue
+
+        if char == "(":
+            if closed is not None:
+                raise _MalformedQueryError()
+            name = rql_query[start:index].strip()
+            if name in LITERAL_CALLS:
+                # Whitespace splits their token, so it is kept
+                name = rql_query[start:index].lstrip()
+            calls.append((name, []))
+        elif char == ",":
+            if not calls:
+                raise _MalformedQueryError()
+            calls[-1][1].append(_take_item(rql_query[start:index], closed, calls[-1]))
+            closed = None
+        elif char == ")":
+            if not calls:
+                raise _MalformedQueryError()
+            item = _take_item(rql_query[start:index], closed, calls[-1])
+            name, arguments = calls.pop()
+            if arguments or item != ("", ()):
+                arguments.append(item)
+            closed = _serialize_call(name, arguments)
+        else:
+            parts.append(_take_item(rql_query[start:index], closed, None))
+            closed = None
+        start = position
+
+    if calls:
+        raise _MalformedQueryError()
+    parts.append(_take_item(rql_query[start:], closed, None))
+    return parts
+
+
+def _take_item(
+    text: str,
+    closed: tuple[str, tuple[tuple[int, ...], ...]] | None,
+    call: tuple[str, list[tuple[str, tuple[tuple[int, ...], ...]]]] | None,
+) -> tuple[str, tuple[tuple[int, ...], ...]]:
+    """Returns the item between two separators, the next argument of `call`: the call just
+    closed, or the text stripped of the whitespace the grammar ignores.
+
+    That is all of it around property names and counts, but only the leading whitespace of
+    values, whose trailing whitespace is part of them.
+    """
+    if closed is None:
+        if not _is_value(call):
+            return text.strip(), ()
+        return text.lstrip() or text, ()
+    if text and not text.isspace():
+        raise _MalformedQueryError()
+    return closed
+
+
+def _is_value(call: tuple[str, list[tuple[str, tuple[tuple[int, ...], ...]]]] | None) -> bool:
+    """Whether the next argument of a call is a value: the literal of a comparison, one of a
+    tuple or what the literals written as calls are given"""
+    if call is None:
+        return False
+    name, arguments = call
+    return not name or name in LITERAL_CALLS or (name in COMPARISON_KEYWORDS and bool(arguments))
+
+
+def _serialize_call(
+    name: str, arguments: list[tuple[str, tuple[tuple[int, ...], ...]]]
+) -> tuple[str, tuple[tuple[int, ...], ...]]:
+    if name not in COMMUTATIVE_OPERATORS:
+        texts = [text for text, _ in arguments]
+        permutations = tuple(
+            permutation for _, item_permutations in arguments for permutation in item_permutations
+        )
+        return f"{name}({','.join(texts)})", permutations
+
+    order = sorted(range(len(arguments)), key=lambda index: arguments[index][0])
+    positions = [0] * len(arguments)
+    for canonical_index, original_index in enumerate(order):
+        positions[original_index] = canonical_index
+
+    texts = [arguments[index][0] for index in order]
+    permutations = (tuple(positions),) + tuple(
+        permutation for index in order for permutation in arguments[index][1]
+    )
+    return f"{name}({','.join(texts)})", permutations
+
+
+def _restore_order(node: ir.Node, permutations: Iterator[tuple[int, ...]]) -> ir.Node:
+    """Rebuilds a node parsed from a canonical query with the original argument order"""
+    results: list[ir.Node] = []
+    pending: list[tuple[int, ...] | None] = []
+    for current, leaving in ir.walk(node):
+        if not leaving:
+            if isinstance(current, ir.Logical):
+                # Permutations are listed in pre-order
+                is_sorted = current.operator == LogicalOperator.NOT
+                pending.append(None if is_sorted else next(permutations))
+            continue
+        if isinstance(current, ir.Logical):
+            permutation = pending.pop()
+            arguments = tuple(results[-len(current.arguments) :])
+            del results[-len(current.arguments) :]
+            if permutation is not None:
+                arguments = tuple(arguments[index] for index in permutation)
+            results.append(ir.Logical(operator=current.operator, arguments=arguments))
+        elif isinstance(current, ir.Any):
+            results.append(ir.Any(relationship=current.relationship, condition=results.pop()))
+        else:
+            results.append(current)
+    return results[0]
@@ -0,0 +1,76 @@
+"""Index-friendly forms of comparisons.
+
+Some comparisons compile into conditions that an index cannot serve, or only partly. A prefix
+`like` becomes `LIKE 'John%'`, which a b-tree index only serves under the C collation, and
+comparing a datetime field to a date compares it to midnight rather than to the whole day.
+Builders created with `sargable_rewrites` compile them into ranges instead:
+
+* `like(name,John*)`: `name >= 'John' AND name < 'Joho'`, along with the `LIKE` itself, which
+  the database only checks on the rows in the range. The range only holds the rows the `LIKE`
+  matches when it is case-sensitive and strings are compared code point by code point, so only
+  the string fields whose column declares one of `BINARY_COLLATIONS` are rewritten. `_` and
+  `%` match any character in SQL, so the prefix ends at the first of them: `like(name,J_hn*)`
+  becomes `name >= 'J' AND name < 'K'`, and patterns starting with one are not rewritten.
+* `eq(created_at,2024-01-01)`: `created_at >= '2024-01-01' AND created_at < '2024-01-02'`, and
+  `ne()` the rows out of that range.
+* `gt(created_at,2024-01-01)` and `lte(created_at,2024-01-01)`: `created_at >= '2024-01-02'`
+  and `created_at < '2024-01-02'`, so that the day of the date is a whole.
+
+The functions below compute the bounds of the ranges out of the raw literals, so they are
+bound to the literals of any query sharing the template.
+"""
+
+import re
+from datetime import date, datetime, time, timedelta
+from typing import Any
+
+from requela.dataclasses import Operator
+
+MAX_CHARACTER = chr(0x10FFFF)
+
+# The collations under which `LIKE` is case-sensitive and strings are ordered by code point,
+# PostgreSQL's binary ones
+BINARY_COLLATIONS = frozenset({"C", "POSIX"})
+
+# The `*` of patterns and the characters SQL `LIKE` matches any character with
+WILDCARD = re.compile("[*_%]")
+
+# The bounds of the range of rows of each comparison of a datetime field to a date: the
+# operator comparing the field to the bound and whether it is the end of the day
+DAY_RANGES: dict[Operator, tuple[tuple[Operator, bool], ...]] = {
+    Operator.EQ: ((Operator.GTE, False), (Operator.LT, True)),
+    Operator.NE: ((Operator.LT, False), (Operator.GTE, True)),
+    Operator.GT: ((Operator.GTE, True),),
+    Operator.LTE: ((Operator.LT, True),),
+}
+
+
+def is_prefix_pattern(value: Any) -> bool:
+    """Whether a `like` pattern matches the strings starting with some text"""
+    return isinstance(value, str) and not WILDCARD.match(value) and value.endswith("*")
+
+
+def get_prefix(pattern: str) -> str:
+    """Returns the text the strings matching a prefix pattern start with, up to its first
+    wildcard, the lower bound of their range"""
+    return WILDCARD.split(pattern, maxsplit=1)[0]
+
+
+def get_prefix_end(pattern: str) -> str:
+    """Returns the upper bound, excluded, of the range of the strings matching a prefix
+    pattern: the prefix with its last character incremented"""
+    prefix = get_prefix(pattern).rstrip(MAX_CHARACTER)
+    if not prefix:
+        raise ValueError(f"The pattern '{pattern}' has no upper bound.")
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def get_day_start(value: Any) -> datetime:
+    """Returns the midnight starting the day of a date literal"""
+    day = value if type(value) is date else date.fromisoformat(value)
+    return datetime.combine(day, time())
+
+
+def get_day_end(value: Any) -> datetime:
+    """Returns the midnight ending the day of a date literal"""
+    return get_day_start(value) + timedelta(days=1)
@@ -1,36 +1,202 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import logging
+from collections.abc import Hashable, Iterable, Iterator, Mapping
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
 from enum import Enum, IntEnum, StrEnum
-from typing import Any, ClassVar
+from importlib import import_module
+from threading import Lock
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, ClassVar
 
 from requela.builders import QueryBuilder, get_builder_for_model
-from requela.dataclasses import DEFAULT_OPERATORS, Operator
+from requela.cache import ParseCache, TTLCache
+from requela.dataclasses import (
+    DEFAULT_COST_MODEL,
+    DEFAULT_OPERATORS,
+    DEFAULT_QUERY_LIMITS,
+    INDEX_OPERATORS,
+    BuildResult,
+    CostModel,
+    IndexPolicy,
+    Operator,
+    Page,
+    QueryCost,
+    QueryLimits,
+)
 from requela.exceptions import RequelaError
 
+if TYPE_CHECKING:  # pragma: no cover
+    from concurrent.futures import Executor
+
+_COMPILE_LOCK = Lock()
+
+RELATIONSHIP_OPERATORS = frozenset({Operator.EQ, Operator.NE})
+
 DOCS_HEADER = [
-    "| Field | Operators | Order By |",
-    "|-------|-----------|----------|",
+    "| Field | Operators | Order By | Indexed |",
+    "|-------|-----------|----------|---------|",
 ]
 
+logger = logging.getLogger(__name__)
+
+
+def _as_requela_error(error: Exception) -> RequelaError:
+    """Returns the error of an invalid query as a `RequelaError` caused by it"""
+    requela_error = RequelaError(str(error))
+    requela_error.__cause__ = error
+    return requela_error
+
+
+@contextmanager
+def _requela_errors() -> Iterator[None]:
+    """Raises the errors of invalid queries raised within the block as `RequelaError`s"""
+    try:
+        yield
+    except RequelaError:
+        raise
+    except (ValueError, TypeError, AttributeError) as e:
+        raise RequelaError(str(e)) from e
+
 
 @dataclass
 class FieldRule:
     allowed_operators: set[Operator] | None = None
     alias: str | None = None
     allow_ordering: bool = True
+    # Whether an index leads with the field, inferred from the model if None
+    indexed: bool | None = None
+    # The operators the index can serve, `INDEX_OPERATORS` if None
+    index_operators: set[Operator] | None = None
+    # Whether the field is left out of the rows unless a query includes it with `select()`
+    deferred: bool = False
 
 
 @dataclass
 class RelationshipRule:
-    rules: ModelRQLRules
+    """A relation to the model of other rules.
+
+    The rules can be given as an instance, a class or the dotted path of a class, or only
+    its name if it is defined in the same module as the relation. Classes and paths are
+    only resolved, and their rules compiled, when the relation is first used, so they can
+    refer to rules defined later or leading back to the rules holding the relation.
+    """
+
+    rules: ModelRQLRules | type[ModelRQLRules] | str
     alias: str | None = None
+    # Whether queries can load the related rows along with the rows with `include()`
+    allow_include: bool = True
+    _rules_class: type[ModelRQLRules] | None = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _module: str | None = field(default=None, init=False, repr=False, compare=False)
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self._module = owner.__module__
+
+    def get_rules_class(self) -> type[ModelRQLRules]:
+        rules_class = self._rules_class
+        if rules_class is None:
+            rules_class = self._rules_class = self._resolve_rules_class()
+        return rules_class
+
+    def _resolve_rules_class(self) -> type[ModelRQLRules]:
+        rules = self.rules
+        if isinstance(rules, str):
+            module_name, _, class_name = rules.rpartition(".")
+            rules = getattr(import_module(module_name or self._module), class_name)  # type: ignore[arg-type]
+        elif isinstance(rules, ModelRQLRules):
+            rules = type(rules)
+        if not (isinstance(rules, type) and issubclass(rules, ModelRQLRules)):
+            raise TypeError(f"Relation rules must be a ModelRQLRules class, not {rules!r}.")
+        return rules
+
+
+@dataclass(frozen=True)
+class ResolvedField:
+    """What an alias path resolves to: the attribute path and the rules that apply to it"""
+
+    path: str
+    rule: FieldRule | RelationshipRule
+    allowed_operators: frozenset[Operator]
+    allow_ordering: bool
+    allow_include: bool = False
+    indexed: bool = False
+    index_operators: frozenset[Operator] = frozenset()
+
+
+@dataclass(frozen=True)
+class CompiledRules:
+    """The rules of a rules class once validated, shared by all its instances.
+
+    It holds the fields and relations of the class resolved, with the operators of the
+    fields inferred from their types, and the builder of the class, which keeps no state of
+    the queries it builds.
+    The alias index, which memoizes the alias paths resolved through relations, is the only
+    thing that changes after compiling, and adding an entry to it is a single dict
+    assignment, so compiled rules can be shared between threads.
+    """
+
+    fields: Mapping[str, ResolvedField]
+    aliases: Mapping[str, ResolvedField]
+    relations: Mapping[str, tuple[str, RelationshipRule]]
+    builder: QueryBuilder
+    index: dict[str, ResolvedField] = field(default_factory=dict, compare=False)
+
+    @property
+    def templates(self) -> ParseCache:
+        return self.builder.templates
+
+    def resolve(self, alias: str) -> ResolvedField:
+        """Resolves an alias path of the fields and relations reachable from the rules.
+
+        Paths through relations are resolved when first looked up rather than upfront, as
+        relations may lead back to the same rules, and kept in the alias index.
+        """
+        resolved = self.aliases.get(alias) or self.index.get(alias)
+        if resolved is None:
+            resolved = self.index[alias] = self._resolve_through_relation(alias)
+        return resolved
+
+    def _resolve_through_relation(self, alias: str) -> ResolvedField:
+        relations = []
+        separator = alias.find(".")
+        while separator != -1:
+            relation = self.relations.get(alias[:separator])
+            if relation is not None:
+                relations.append((separator, *relation))
+            separator = alias.find(".", separator + 1)
+        if not relations:
+            raise ValueError(f"Relation with alias '{alias}' not found")
+        if len(relations) > 1:
+            raise ValueError(f"Multiple relations found for alias '{alias}'")
+        separator, relation_name, relation_def = relations[0]
+        resolved = relation_def.get_rules_class().compile().resolve(alias[separator + 1 :])
+        return replace(resolved, path=f"{relation_name}.{resolved.path}")
 
 
 class ModelRQLRules:
     __model__: ClassVar[Any]
+    __limits__: ClassVar[QueryLimits] = DEFAULT_QUERY_LIMITS
+    __async_threshold__: ClassVar[int] = 4096
+    __index_policy__: ClassVar[IndexPolicy] = IndexPolicy.IGNORE
+    __cost_model__: ClassVar[CostModel] = DEFAULT_COST_MODEL
+    # Seconds the numbers of rows counted by `count` are cached for, None not to cache them
+    __count_ttl__: ClassVar[float | None] = None
+    __approximate_count_threshold__: ClassVar[int] = 10_000
+    # Whether the relationships joined by queries are loaded out of their joins, see
+    # `SQLAlchemyQueryBuilder`
+    __eager_joins__: ClassVar[bool] = False
+    # Whether comparisons are compiled into the ranges an index can serve, see
+    # `requela.rewrites`
+    __sargable_rewrites__: ClassVar[bool] = False
+    # Whether the filters of queries are simplified before they are built, see
+    # `requela.optimizer`
+    __optimize_filters__: ClassVar[bool] = False
     _fields: ClassVar[dict[str, FieldRule]]
     _relations: ClassVar[dict[str, RelationshipRule]]
+    _compiled: ClassVar[CompiledRules | None]
 
     def __init_subclass__(cls):
         super().__init_subclass__()
@@ -41,8 +207,15 @@ class ModelRQLRules:
         fields = {}
         relations = {}
 
-        for attr_name in dir(cls):
-            attr_value = getattr(cls, attr_name)
+        # The attributes of the class and its bases, as `dir` and `getattr` would see them,
+        # without going through the attributes of `ModelRQLRules` and `object`
+        namespace: dict[str, Any] = {}
+        for klass in reversed(cls.__mro__):
+            if klass is not ModelRQLRules and klass is not object:
+                namespace.update(vars(klass))
+
+        for attr_name in sorted(namespace):
+            attr_value = namespace[attr_name]
 
             if isinstance(attr_value, FieldRule):
                 fields[attr_name] = attr_value
@@ -52,71 +225,282 @@ class ModelRQLRules:
         cls._fields = fields
         cls._relations = relations
 
+        cls._compiled = None
+
     def __init__(self):
-        self.builder = self._get_builder()
-        self._validate()
+        self.compiled = self.compile()
+        self.builder = self.compiled.builder
 
-    def build_query(self, rql_expression: str, initial_query: Any = None) -> Any:
-        """Builds the query using the configured builder"""
-        try:
+    @classmethod
+    def compile(cls) -> CompiledRules:
+        """Returns the compiled rules of the class, compiling them on first use.
+
+        Raises an `ExceptionGroup` of the errors found if the rules are not valid, in which
+        case they are compiled again the next time.
+        """
+        compiled = cls._compiled
+        if compiled is None:
+            with _COMPILE_LOCK:
+                compiled = cls._compiled
+                if compiled is None:  # pragma: no branch
+                    compiled = cls._compiled = cls._compile()
+        return compiled
+
+    def build_query(
+        self, rql_expression: str, initial_query: Any = None, max_cost: int | None = None
+    ) -> Any:
+        """Builds the query using the configured builder.
+
+        Queries whose cost exceeds `max_cost`, or the `max_cost` of the limits of the class if
+        None, are rejected with a `QueryCostError`.
+        """
+        with _requela_errors():
             return self.builder.build_query(
                 rql_expression,
                 initial_query=initial_query,
+                max_cost=max_cost,
+            )
+
+    async def abuild_query(
+        self,
+        rql_expression: str,
+        initial_query: Any = None,
+        executor: Executor | None = None,
+        max_cost: int | None = None,
+    ) -> Any:
+        """Builds the query without blocking the event loop, see `QueryBuilder.abuild_query`"""
+        with _requela_errors():
+            return await self.builder.abuild_query(
+                rql_expression,
+                initial_query=initial_query,
+                executor=executor,
+                max_cost=max_cost,
+            )
+
+    def paginate(
+        self,
+        rql_expression: str,
+        page_size: int,
+        cursor: str | None = None,
+        session: Any = None,
+        initial_query: Any = None,
+        max_cost: int | None = None,
+    ) -> Page:
+        """Returns a page of the rows the query selects, see `QueryBuilder.paginate`"""
+        with _requela_errors():
+            return self.builder.paginate(
+                rql_expression,
+                page_size,
+                cursor=cursor,
+                session=session,
+                initial_query=initial_query,
+                max_cost=max_cost,
+            )
+
+    async def apaginate(
+        self,
+        rql_expression: str,
+        page_size: int,
+        cursor: str | None = None,
+        session: Any = None,
+        initial_query: Any = None,
+        max_cost: int | None = None,
+    ) -> Page:
+        """Returns a page of the rows the query selects, running its query asynchronously,
+        see `QueryBuilder.apaginate`"""
+        with _requela_errors():
+            return await self.builder.apaginate(
+                rql_expression,
+                page_size,
+                cursor=cursor,
+                session=session,
+                initial_query=initial_query,
+                max_cost=max_cost,
+            )
+
+    def build_count_query(
+        self, rql_expression: str, initial_query: Any = None, max_cost: int | None = None
+    ) -> Any:
+        """Builds the query of the number of rows the query selects, see
+        `QueryBuilder.build_count_query`"""
+        with _requela_errors():
+            return self.builder.build_count_query(
+                rql_expression, initial_query=initial_query, max_cost=max_cost
+            )
+
+    def build_query_and_count(
+        self, rql_expression: str, initial_query: Any = None, max_cost: int | None = None
+    ) -> tuple[Any, Any]:
+        """Builds the query and the query of the number of rows it selects, see
+        `QueryBuilder.build_query_and_count`"""
+        with _requela_errors():
+            return self.builder.build_query_and_count(
+                rql_expression, initial_query=initial_query, max_cost=max_cost
+            )
+
+    def count(
+        self,
+        rql_expression: str,
+        session: Any = None,
+        initial_query: Any = None,
+        max_cost: int | None = None,
+        approximate: bool = False,
+        scope: Hashable = None,
+    ) -> int:
+        """Returns the number of rows the query selects, see `QueryBuilder.count`.
+
+        The numbers are cached for `__count_ttl__` seconds if set.
+        """
+        with _requela_errors():
+            return self.builder.count(
+                rql_expression,
+                session=session,
+                initial_query=initial_query,
+                max_cost=max_cost,
+                approximate=approximate,
+                scope=scope,
             )
-        except (ValueError, TypeError, AttributeError) as e:
-            raise RequelaError(str(e)) from e
+
+    async def acount(
+        self,
+        rql_expression: str,
+        session: Any = None,
+        initial_query: Any = None,
+        max_cost: int | None = None,
+        approximate: bool = False,
+        scope: Hashable = None,
+    ) -> int:
+        """Returns the number of rows the query selects, running its queries
+        asynchronously, see `QueryBuilder.acount`"""
+        with _requela_errors():
+            return await self.builder.acount(
+                rql_expression,
+                session=session,
+                initial_query=initial_query,
+                max_cost=max_cost,
+                approximate=approximate,
+                scope=scope,
+            )
+
+    def estimate_cost(self, rql_expression: str) -> QueryCost:
+        """Returns the static cost of the query, see `cost.estimate_cost`"""
+        with _requela_errors():
+            return self.builder.estimate_cost(rql_expression)
+
+    async def aexecute(
+        self,
+        rql_expression: str,
+        session: Any = None,
+        initial_query: Any = None,
+        stream: bool = False,
+        executor: Executor | None = None,
+        max_cost: int | None = None,
+    ) -> Any:
+        """Builds the query and runs it asynchronously, see `QueryBuilder.aexecute`"""
+        query = await self.abuild_query(
+            rql_expression, initial_query=initial_query, executor=executor, max_cost=max_cost
+        )
+        return await self.builder.aexecute(query, session=session, stream=stream)
+
+    def build_many(
+        self,
+        rql_expressions: Iterable[str],
+        initial_query: Any = None,
+        executor: Executor | None = None,
+    ) -> list[BuildResult]:
+        """Builds a batch of queries using the configured builder, see `QueryBuilder.build_many`.
+
+        The errors of the results are `RequelaError`s.
+        """
+        results = []
+        for result in self.builder.build_many(
+            rql_expressions, initial_query=initial_query, executor=executor
+        ):
+            if result.error is not None and not isinstance(result.error, RequelaError):
+                result = replace(result, error=_as_requela_error(result.error))
+            results.append(result)
+        return results
 
     def get_documentation(self) -> str:
         """Returns the documentation for the rules"""
         docs = DOCS_HEADER + self._get_fields_documentation()
         return "\n".join(docs)
 
-    def _get_fields_documentation(self, alias_prefix: str = "") -> list[str]:
-        """Returns the documentation for the rules"""
-
+    @classmethod
+    def _get_fields_documentation(
+        cls, alias_prefix: str = "", documented: frozenset[type[ModelRQLRules]] = frozenset()
+    ) -> list[str]:
+        """Returns the documentation for the rules.
+
+        Relations leading back to rules already being documented are listed but not
+        expanded, as their fields would be documented over and over again.
+        """
+        compiled = cls.compile()
+        documented = documented | {cls}
         docs = []
-        for field_name, field in self._fields.items():
-            operators = ", ".join(sorted([op.value for op in field.allowed_operators]))  # type: ignore
+        for field_name, field_def in cls._fields.items():
+            allowed_operators = compiled.fields[field_name].allowed_operators
+            operators = ", ".join(sorted([op.value for op in allowed_operators]))
             prefix = ""
             if alias_prefix:
                 prefix = f"{alias_prefix}."
             docs.append(
-                f"|{prefix}{field.alias or field_name}"
-                f"|{operators}|{'yes' if field.allow_ordering else 'no'}|"
+                f"|{prefix}{field_def.alias or field_name}"
+                f"|{operators}|{'yes' if field_def.allow_ordering else 'no'}"
+                f"|{'yes' if compiled.fields[field_name].indexed else 'no'}|"
             )
-        for relation_name, relation in self._relations.items():
+        for relation_name, relation in cls._relations.items():
             prefix = ""
             if alias_prefix:
                 prefix = f"{alias_prefix}."
-            docs.append(f"|{prefix}{relation.alias or relation_name}|eq, ne|no|")
-            docs.extend(
-                relation.rules._get_fields_documentation(
-                    f"{prefix}{relation.alias or relation_name}"
+            docs.append(f"|{prefix}{relation.alias or relation_name}|eq, ne|no|no|")
+            rules_class = relation.get_rules_class()
+            if rules_class not in documented:
+                docs.extend(
+                    rules_class._get_fields_documentation(
+                        f"{prefix}{relation.alias or relation_name}", documented
+                    )
                 )
-            )
         return sorted(docs)
 
     @classmethod
     def _resolve_alias(cls, alias: str) -> str:
-        field_name, _ = cls._get_field_by_alias(alias)
-        return field_name
+        return cls.compile().resolve(alias).path
 
     @classmethod
     def _validate_operator_and_field(cls, field: str, operator: Operator):
-        _, field_def = cls._get_field_by_alias(field)
-        allowed_operators = (
-            field_def.allowed_operators
-            if isinstance(field_def, FieldRule)
-            else {Operator.EQ, Operator.NE}
-        )
-        if operator not in allowed_operators:  # type: ignore
+        if operator not in cls.compile().resolve(field).allowed_operators:
             raise ValueError(f"Operator '{operator.value}' is not allowed for field '{field}'.")
 
     @classmethod
     def _validate_ordering(cls, field: str):
-        _, field_def = cls._get_field_by_alias(field)
-        if not field_def.allow_ordering:  # type: ignore
+        resolved = cls.compile().resolve(field)
+        if not resolved.allow_ordering:
             raise ValueError(f"Order by '{field}' is not allowed.")
+        if cls.__index_policy__ is not IndexPolicy.IGNORE and not resolved.indexed:
+            cls._report_unindexed(f"Order by '{field}' cannot use an index.")
+
+    @classmethod
+    def _validate_include(cls, relationship: str):
+        if not cls.compile().resolve(relationship).allow_include:
+            raise ValueError(f"Include '{relationship}' is not allowed.")
+
+    @classmethod
+    def _validate_index_usage(cls, field: str, operator: Operator, value: Any):
+        if cls.__index_policy__ is IndexPolicy.IGNORE:
+            return
+        resolved = cls.compile().resolve(field)
+        if isinstance(resolved.rule, RelationshipRule):
+            return
+        leading_wildcard = operator == Operator.LIKE and str(value).startswith("*")
+        if not resolved.indexed or operator not in resolved.index_operators or leading_wildcard:
+            cls._report_unindexed(f"Filter '{operator.value}' on '{field}' cannot use an index.")
+
+    @classmethod
+    def _report_unindexed(cls, message: str):
+        if cls.__index_policy__ is IndexPolicy.REJECT:
+            raise ValueError(message)
+        logger.warning("%s: %s", cls.__name__, message)
 
     @classmethod
     def _get_builder(cls) -> QueryBuilder:
@@ -125,55 +509,105 @@ class ModelRQLRules:
             resolve_alias_callback=cls._resolve_alias,
             validate_operator_and_field_callback=cls._validate_operator_and_field,
             validate_ordering_callback=cls._validate_ordering,
+            validate_index_usage_callback=cls._validate_index_usage,
+            validate_include_callback=cls._validate_include,
+            limits=cls.__limits__,
+            async_threshold=cls.__async_threshold__,
+            cost_model=cls.__cost_model__,
+            deferred_fields=[name for name, rule in cls._fields.items() if rule.deferred],
+            totals=None if cls.__count_ttl__ is None else TTLCache(ttl=cls.__count_ttl__),
+            approximate_count_threshold=cls.__approximate_count_threshold__,
+            eager_joins=cls.__eager_joins__,
+            sargable_rewrites=cls.__sargable_rewrites__,
+            optimize_filters=cls.__optimize_filters__,
         )
 
-    def _validate(self) -> None:
+    @classmethod
+    def _compile(cls) -> CompiledRules:
+        builder = cls._get_builder()
+        fields = {}
         errors = []
 
-        for field_name, field_def in self._fields.items():
+        for field_name, field_def in cls._fields.items():
             try:
                 # Get field type from model (implementation depends on ORM)
-                field_type = self._get_field_type(field_name)
-
-                # If no operators specified, infer from field type
-                if field_def.allowed_operators is None:
-                    if issubclass(field_type, Enum | StrEnum | IntEnum):
-                        default_operators = DEFAULT_OPERATORS.get(Enum)
-                    else:
-                        default_operators = DEFAULT_OPERATORS.get(field_type)
-
-                    if default_operators is None:  # pragma: no cover
-                        errors.append(
-                            f"Cannot infer default operators for field {field_name} "
-                            f"of type {field_type}"
-                        )
-                    else:
-                        field_def.allowed_operators = default_operators
-
-                # Validate that the operators are compatible with the field type
-                if field_def.allowed_operators:  # pragma: no branch
-                    invalid_ops = self._validate_operators(field_type, field_def.allowed_operators)
-                    if invalid_ops:
-                        invalid_ops_str = ", ".join(sorted([f"'{op.value}'" for op in invalid_ops]))
-                        errors.append(
-                            f"Invalid operators {invalid_ops_str} for field '{field_name}' "
-                            f"of type '{field_type.__name__}'."
-                        )
-
+                field_type = builder.get_field_type(field_name)
             except AttributeError:
                 errors.append(
-                    f"Field '{field_name}' not found in model '{self.__model__.__name__}'."
+                    f"Field '{field_name}' not found in model '{cls.__model__.__name__}'."
                 )
+                continue
+
+            # If no operators specified, infer from field type
+            allowed_operators = field_def.allowed_operators
+            if allowed_operators is None:
+                if issubclass(field_type, Enum | StrEnum | IntEnum):
+                    allowed_operators = DEFAULT_OPERATORS.get(Enum)
+                else:
+                    allowed_operators = DEFAULT_OPERATORS.get(field_type)
+
+                if allowed_operators is None:  # pragma: no cover
+                    errors.append(
+                        f"Cannot infer default operators for field {field_name} "
+                        f"of type {field_type}"
+                    )
+                    continue
+
+            # Validate that the operators are compatible with the field type
+            invalid_ops = cls._validate_operators(field_type, set(allowed_operators))
+            if invalid_ops:
+                invalid_ops_str = ", ".join(sorted([f"'{op.value}'" for op in invalid_ops]))
+                errors.append(
+                    f"Invalid operators {invalid_ops_str} for field '{field_name}' "
+                    f"of type '{field_type.__name__}'."
+                )
+
+            indexed = field_def.indexed
+            if indexed is None:
+                indexed = builder.is_field_indexed(field_name)
+            fields[field_name] = ResolvedField(
+                path=field_name,
+                rule=field_def,
+                allowed_operators=frozenset(allowed_operators),
+                allow_ordering=field_def.allow_ordering,
+                indexed=indexed,
+                index_operators=frozenset(
+                    INDEX_OPERATORS
+                    if field_def.index_operators is None
+                    else field_def.index_operators
+                ),
+            )
 
         if errors:
             raise ExceptionGroup(
-                f"Model validation failed for '{self.__model__.__name__}'",
+                f"Model validation failed for '{cls.__model__.__name__}'",
                 [ValueError(error_msg) for error_msg in errors],
             )
 
-    def _get_field_type(self, field_name: str) -> type:
-        """Gets the type of a field - to be implemented by specific ORM builders"""
-        return self.builder.get_field_type(field_name)
+        # Fields can be referred to by their alias and their name, relations by their alias
+        aliases: dict[str, ResolvedField] = {}
+        for field_name, resolved in fields.items():
+            aliases.setdefault(field_name, resolved)
+            aliases.setdefault(cls._fields[field_name].alias or field_name, resolved)
+        relations = {}
+        for relation_name, relation_def in cls._relations.items():
+            relation_alias = relation_def.alias or relation_name
+            relations[relation_alias] = (relation_name, relation_def)
+            fields[relation_name] = ResolvedField(
+                path=relation_name,
+                rule=relation_def,
+                allowed_operators=RELATIONSHIP_OPERATORS,
+                allow_ordering=False,
+                allow_include=relation_def.allow_include,
+            )
+            aliases.setdefault(relation_alias, fields[relation_name])
+
+        return CompiledRules(
+            fields=MappingProxyType(fields),
+            aliases=MappingProxyType(aliases),
+            relations=MappingProxyType(relations),
+            builder=builder,
+        )
 
     @classmethod
     def _validate_operators(cls, field_type: type, operators: set[Operator]) -> set[Operator]:
@@ -188,32 +622,3 @@ class ModelRQLRules:
             return operators
 
         return {op for op in operators if op not in valid_operators}  # type: ignore
-
-    @classmethod
-    def _get_relation_by_alias(cls, alias: str) -> tuple[str, RelationshipRule]:
-        relations = {}
-        for relation_name, relation_def in cls._relations.items():
-            relation_field_name = relation_def.alias or relation_name
-            if alias.startswith(relation_field_name):
-                relations[relation_name] = relation_def
-        if not relations:
-            raise ValueError(f"Relation with alias '{alias}' not found")
-        if len(relations) > 1:
-            raise ValueError(f"Multiple relations found for alias '{alias}'")
-        return list(relations.items())[0]
-
-    @classmethod
-    def _get_field_by_alias(cls, alias: str) -> tuple[str, FieldRule | RelationshipRule]:
-        """Gets a field definition by its alias or field name"""
-        # First, check local fields
-        for field_name, field_def in cls._fields.items():
-            if field_def.alias == alias or field_name == alias:
-                return field_name, field_def
-
-        relation_name, relation_def = cls._get_relation_by_alias(alias)
-        relation_field_name = relation_def.alias or relation_name
-        if alias == relation_field_name:
-            return relation_name, relation_def
-        field_to_search = alias.removeprefix(relation_field_name)[1:] or relation_field_name
-        f_name, f_def = relation_def.rules._get_field_by_alias(field_to_search)
-        return f"{relation_name}.{f_name}", f_def
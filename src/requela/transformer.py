@@ -1,158 +1,154 @@
 from datetime import date, datetime
 
-from lark import Transformer
-
-from requela.dataclasses import (
-    FilterExpression,
-    OperatorFunctions,
-    OrderByExpression,
-    OrderField,
-)
-
-
-class RQLTransformer(Transformer):
-    def __init__(self, operators: OperatorFunctions):
-        super().__init__()
-        self.operators = operators
+from requela import ir
+from requela.dataclasses import LogicalOperator, Operator, OrderField
+
+# Terminals whose type the grammar guesses from their text alone
+GUESSED_TERMINALS = frozenset(("FLOAT", "INT", "DATETIME", "DATE"))
+
+LITERAL_KEYWORDS = {
+    "true": True,
+    "false": False,
+    "null()": None,
+    "empty()": "",
+}
+
+
+def literal_value(terminal: str, text: str):
+    """Converts the text of a literal token to its Python value"""
+    match terminal:
+        case "FLOAT":
+            return float(text)
+        case "INT":
+            return int(text)
+        case "DATETIME":
+            return datetime.fromisoformat(text)
+        case "DATE":
+            return date.fromisoformat(text)
+        case "QUOTED_STRING" | "DOUBLE_QUOTED_STRING":
+            text = text[1:-1]
+    return LITERAL_KEYWORDS.get(text, text)
+
+
+def literal(terminal: str, text: str) -> tuple[object, object]:
+    """Returns the Python value of a literal token along with its raw form.
+
+    The type of numbers and dates is guessed from their text, before the field they are
+    compared to is known, so their raw form is their text, which builders convert to the
+    type of the field. Strings and keywords are their own raw form.
+    """
+    value = literal_value(terminal, text)
+    return value, text if terminal in GUESSED_TERMINALS else value
+
+
+class RQLTransformer:
+    """Builds the intermediate representation of a query.
+
+    It is meant to be given to the LALR parser as its inline transformer, so the callbacks
+    run while parsing and the parser directly returns a tuple of `requela.ir` nodes.
+    Lark only looks the callbacks up by rule name, so it doesn't subclass `lark.Transformer`
+    and importing it doesn't import lark.
+    """
 
     def start(self, args):
         return args[0]
 
-    def expression(self, args):
-        # Extract the actual operation from the expression node
-        return args[0]
+    def combined_expression(self, args):
+        if sum(isinstance(arg, ir.Limit) for arg in args) > 1:
+            raise ValueError("A query can only have one limit().")
+        return tuple(args)
 
     def logical_expression(self, args):
-        # apply the logical operator to the list of conditions
-        operator_func = args[0]
-        argument_list = args[1]
-        conditions = [argument.condition for argument in argument_list]
-        return FilterExpression(condition=operator_func(*conditions))
+        operator, arguments = args
+        for argument in arguments:
+            if not isinstance(argument, ir.Comparison | ir.Logical | ir.Any):
+                raise ValueError(f"Invalid argument '{argument}' for operator '{operator.value}'.")
+        return ir.Logical(operator=operator, arguments=arguments)
 
     def and_op(self, _):
-        return self.operators.and_op
+        return LogicalOperator.AND
 
     def or_op(self, _):
-        return self.operators.or_op
+        return LogicalOperator.OR
 
     def not_op(self, _):
-        return self.operators.not_op
+        return LogicalOperator.NOT
 
     def eq_op(self, _):
-        return self.operators.eq_op
+        return Operator.EQ
 
     def ne_op(self, _):
-        return self.operators.ne_op
+        return Operator.NE
 
     def gt_op(self, _):
-        return self.operators.gt_op
+        return Operator.GT
 
     def lt_op(self, _):
-        return self.operators.lt_op
+        return Operator.LT
 
     def gte_op(self, _):
-        return self.operators.gte_op
+        return Operator.GTE
 
     def lte_op(self, _):
-        return self.operators.lte_op
+        return Operator.LTE
 
     def in_op(self, _):
-        return self.operators.in_op
+        return Operator.IN
 
     def out_op(self, _):
-        return self.operators.out_op
+        return Operator.OUT
 
     def like_op(self, _):
-        return self.operators.like_op
+        return Operator.LIKE
 
     def ilike_op(self, _):
-        return self.operators.ilike_op
+        return Operator.ILIKE
 
     def argument_list(self, args):
-        return list(args)
+        return tuple(args)
 
-    def argument(self, args):
+    def grouped_expression(self, args):
         return args[0]
 
     def comparison(self, args):
-        operator, prop, value = args
-        return FilterExpression(
-            condition=operator(prop, value),
-        )
+        operator, prop, (value, raw) = args
+        return ir.Comparison(operator=operator, field=prop, value=value, raw=raw)
 
     def property(self, args):
         return str(args[0])
 
-    def value(self, args):
-        # Directly return the processed literal
-        return args[0]
-
     def literal(self, args):
-        value = args[0]
-        if isinstance(value, str):
-            if value == "true":
-                return True
-            if value == "false":
-                return False
-            if value == "null()":
-                return None
-            if value == "empty()":
-                return ""
-        return value
-
-    def FLOAT(self, token):
-        return float(token)
-
-    def INT(self, token):
-        return int(token)
-
-    def DATETIME(self, token):
-        return datetime.fromisoformat(token)
-
-    def DATE(self, token):
-        return date.fromisoformat(token)
-
-    def UNQUOTED_VAL(self, token):
-        return str(token)
-
-    def QUOTED_STRING(self, token):
-        return str(token)[1:-1]
-
-    def DOUBLE_QUOTED_STRING(self, token):
-        return str(token)[1:-1]
-
-    def UUID(self, token):
-        return str(token)
+        token = args[0]
+        return literal(token.type, str(token))
 
     def tuple(self, args):
-        return tuple(args)
+        values, raws = zip(*args, strict=True)
+        return values, raws
 
     def any_expression(self, args):
-        relationship_name, filter_expression = args
-        return FilterExpression(
-            condition=self.operators.any_op(relationship_name, filter_expression.condition)
-        )
+        relationship, condition = args
+        return ir.Any(relationship=relationship, condition=condition)
 
     def order_expression(self, args):
-        order_list = args[0]
-        return OrderByExpression(fields=order_list)
+        return ir.OrderBy(fields=args[0])
 
-    def order_list(self, args):
-        return list(args)
+    def select_expression(self, args):
+        return ir.Select(fields=args[0])
 
-    def order_item(self, args):
-        return OrderField(direction=args[0], field_path=args[1])
+    def include_expression(self, args):
+        return ir.Include(relationships=tuple(args))
 
-    def SIGN(self, token):
-        return str(token)
+    def order_list(self, args):
+        return tuple(args)
 
-    def combined_expression(self, args):
-        # Handle multiple operations
-        operations = []
-        for arg in args:
-            operations.append(arg)
-        return operations
-
-    def single_expression(self, args):
-        # Extract the actual operation from the single_expression node
-        return args[0]
+    def order_item(self, args):
+        sign, field_path = args
+        return OrderField(direction=sign and str(sign), field_path=field_path)
+
+    def limit_expression(self, args):
+        limit, offset = int(args[0]), int(args[1] or 0)
+        if limit < 1:
+            raise ValueError("The limit must be greater than zero.")
+        if offset < 0:
+            raise ValueError("The offset cannot be negative.")
+        return ir.Limit(limit=limit, offset=offset)
@@ -0,0 +1,62 @@
+import re
+import subprocess
+import sys
+
+import pytest
+
+IMPORT_TIME_BUDGET_US = 150_000
+RUNS = 5
+
+
+def _import_requela() -> tuple[int, set[str]]:
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            "import sys, requela; print(' '.join(sys.modules))",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative = re.search(r"\|\s*(\d+)\s*\|\s*requela$", result.stderr, re.MULTILINE)
+    assert cumulative is not None, result.stderr
+    return int(cumulative.group(1)), set(result.stdout.split())
+
+
+def test_import_does_not_load_parser_or_orms():
+    _, modules = _import_requela()
+
+    assert "lark" not in modules
+    assert "sqlalchemy" not in modules
+    assert "django" not in modules
+    assert "asyncio" not in modules
+    assert "concurrent.futures" not in modules
+
+
+@pytest.mark.benchmark
+def test_import_time_budget():
+    import_time = min(_import_requela()[0] for _ in range(RUNS))
+
+    assert import_time < IMPORT_TIME_BUDGET_US, (
+        f"`import requela` took {import_time / 1000:.1f}ms, "
+        f"the budget is {IMPORT_TIME_BUDGET_US / 1000:.1f}ms"
+    )
+
+
+def test_parsing_valid_query_does_not_load_lalr_parser():
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys; from requela.parser import parse; parse('and(eq(name,John),gt(age,30))');"
+            "print('lark' in sys.modules)",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,31 @@
+import re
+
+import pytest
+
+from tests.sqlalchemy.rules import UserRules
+
+JOIN = re.compile(r"\bJOIN\b")
+
+# Queries and the relationship paths they need to join
+QUERIES = [
+    ("in(account.name,(a,b,c,d,e,f,g,h))", 1),
+    ("and(gt(account.balance,1),lt(account.balance,9),gte(account.balance,2))", 1),
+    ("and(eq(account.name,a),eq(account.status,1),out(account.description,(x,y)))", 1),
+    ("eq(account.name,a)&order_by(account.name,-account.balance)", 1),
+    ("and(eq(account.tenant.name,a),eq(account.name,b))&order_by(account.tenant.name)", 2),
+    (
+        "or(eq(account.events.created.by.name,a),eq(account.tenant.name,b),"
+        "eq(account.name,c))&order_by(-account.events.created.at)",
+        3,
+    ),
+]
+
+
+@pytest.mark.parametrize(("query", "joins"), QUERIES)
+def test_each_relationship_joined_once(query, joins):
+    rules = UserRules()
+
+    for _ in range(2):
+        sql = str(rules.build_query(query))
+        assert len(JOIN.findall(sql)) == joins, sql
+    assert rules.estimate_cost(query).joins == joins
@@ -0,0 +1,46 @@
+import pytest
+
+from requela.parser import QueryParser, canonicalize, get_parser
+from tests.benchmarks.utils import best_time
+
+
+def _in_query(size):
+    return f"in(id,({','.join(str(value) for value in range(size))}))"
+
+
+def _nested_query(depth):
+    query = "eq(name,John)"
+    for level in range(depth):
+        operator = "and" if level % 2 else "or"
+        query = f"{operator}(eq(age,{level}),{query},ne(name,'level {level}'))"
+    return query
+
+
+QUERIES = pytest.mark.parametrize(
+    ("query", "number"),
+    [
+        (_in_query(2_000), 2),
+        (_nested_query(100), 2),
+        ("and(eq(name,John),gt(age,30),in(role,(admin,user)))&order_by(name,-age)", 50),
+    ],
+    ids=["long-in-tuple", "deeply-nested-and-or", "typical"],
+)
+
+
+@QUERIES
+def test_query_parser_matches_lalr_parser(query, number):
+    text = canonicalize(query).text
+
+    assert QueryParser(text).parse() == get_parser().parse(text)
+
+
+@pytest.mark.benchmark
+@QUERIES
+def test_query_parser_is_faster_than_lalr_parser(query, number):
+    text = canonicalize(query).text
+    parser = get_parser()
+
+    fast = best_time(lambda: QueryParser(text).parse(), number)
+    lalr = best_time(lambda: parser.parse(text), number)
+
+    assert fast * 2 < lalr, f"QueryParser {fast * 1e3:.3f}ms, LALR parser {lalr * 1e3:.3f}ms"
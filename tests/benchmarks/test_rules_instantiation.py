@@ -0,0 +1,40 @@
+import pytest
+
+from requela.rules import FieldRule, ModelRQLRules
+from tests.benchmarks.utils import best_time
+from tests.sqlalchemy.models import User
+
+
+class UserRules(ModelRQLRules):
+    __model__ = User
+
+    name = FieldRule()
+    age = FieldRule()
+    email = FieldRule()
+    role = FieldRule()
+    is_active = FieldRule()
+    birth_date = FieldRule(alias="events.born.at")
+
+
+def test_instances_share_the_compiled_rules():
+    compiled = UserRules.compile()
+
+    UserRules()
+    UserRules()
+
+    assert UserRules._compiled is compiled
+
+
+@pytest.mark.benchmark
+def test_instantiation_is_faster_than_compiling():
+    def compile_rules():
+        UserRules._compiled = None
+        UserRules.compile()
+
+    compiling = best_time(compile_rules, number=200)
+    UserRules.compile()
+    instantiation = best_time(UserRules, number=200)
+
+    assert instantiation * 5 < compiling, (
+        f"instantiation {instantiation * 1e6:.0f}us, compiling {compiling * 1e6:.0f}us"
+    )
@@ -0,0 +1,68 @@
+import pytest
+from sqlalchemy import ForeignKey, Integer, String
+from sqlalchemy.orm import DeclarativeBase, configure_mappers, mapped_column, relationship
+
+from requela.rules import FieldRule, ModelRQLRules, RelationshipRule
+from tests.benchmarks.utils import best_time
+
+MODELS = 300
+
+
+class Base(DeclarativeBase):
+    """Base class of the synthetic schema"""
+
+
+def _create_models():
+    models = []
+    for index in range(MODELS):
+        attributes = {
+            "__tablename__": f"model_{index}",
+            "id": mapped_column(Integer, primary_key=True),
+            "name": mapped_column(String),
+            "code": mapped_column(String),
+            "amount": mapped_column(Integer),
+        }
+        if models:
+            attributes["parent_id"] = mapped_column(ForeignKey(f"model_{index - 1}.id"))
+            attributes["parent"] = relationship(models[-1])
+        models.append(type(f"Model{index}", (Base,), attributes))
+    configure_mappers()
+    return models
+
+
+MODEL_CLASSES = _create_models()
+
+
+def _define_rules(lazy):
+    """Defines the rules of the schema, like importing a package of rules classes does"""
+    rules_classes: list[type[ModelRQLRules]] = []
+    for model in MODEL_CLASSES:
+        attributes = {
+            "__model__": model,
+            "name": FieldRule(),
+            "code": FieldRule(alias="reference.code"),
+            "amount": FieldRule(),
+        }
+        if rules_classes:
+            parent_rules = rules_classes[-1] if lazy else rules_classes[-1]()
+            attributes["parent"] = RelationshipRule(rules=parent_rules)
+        rules_classes.append(type(f"{model.__name__}Rules", (ModelRQLRules,), attributes))
+    return rules_classes
+
+
+@pytest.mark.benchmark
+def test_lazy_relationship_rules_speed_up_startup():
+    eager = best_time(lambda: _define_rules(lazy=False), number=1, repeat=5)
+    lazy = best_time(lambda: _define_rules(lazy=True), number=1, repeat=5)
+
+    assert lazy * 2 < eager, f"lazy {lazy * 1e3:.1f}ms, eager {eager * 1e3:.1f}ms"
+
+
+def test_lazy_relationship_rules_compile_on_first_use():
+    rules_classes = _define_rules(lazy=True)
+    path = ".".join(["parent"] * 10) + ".reference.code"
+
+    compiled = rules_classes[-1].compile()
+    assert compiled.resolve(path).path == ".".join(["parent"] * 10) + ".code"
+    assert all(rules._compiled is not None for rules in rules_classes[-11:])
+    assert all(rules._compiled is None for rules in rules_classes[:-11])
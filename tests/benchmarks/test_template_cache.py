@@ -0,0 +1,40 @@
+import pytest
+
+from tests.benchmarks.utils import best_time
+from tests.sqlalchemy.rules import UserRules
+
+QUERY = (
+    "and(eq(name,John),ne(is_active,false),gt(events.born.at,2000-01-01),"
+    "eq(account.name,Acme),in(role,(admin,user)))&order_by(-name)"
+)
+
+
+def test_template_is_reused():
+    rules = UserRules()
+    templates = rules.builder.templates
+
+    templates.clear()
+    before = templates.stats()
+
+    first = str(rules.build_query(QUERY))
+    second = str(rules.build_query(QUERY.replace("John", "Jane")))
+
+    after = templates.stats()
+    assert first == second
+    assert (after.hits - before.hits, after.misses - before.misses) == (1, 1)
+
+
+@pytest.mark.benchmark
+def test_template_hit_is_faster_than_building_query():
+    rules = UserRules()
+    templates = rules.builder.templates
+
+    def build_without_template():
+        templates.clear()
+        rules.build_query(QUERY)
+
+    rules.build_query(QUERY)
+    hit = best_time(lambda: rules.build_query(QUERY), number=50)
+    miss = best_time(build_without_template, number=50)
+
+    assert hit * 1.5 < miss, f"template hit {hit * 1e6:.0f}us, full build {miss * 1e6:.0f}us"
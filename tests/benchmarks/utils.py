@@ -0,0 +1,9 @@
+import timeit
+
+REPEAT = 3
+
+
+def best_time(function, number, repeat=REPEAT):
+    """Returns the time a call of the function takes in the fastest of `repeat` rounds of
+    `number` calls, timed with the garbage collector disabled"""
+    return min(timeit.repeat(function, number=number, repeat=repeat)) / number
@@ -18,6 +18,7 @@ class AccountStatus(int, enum.Enum):
 class Account(models.Model):
     class Meta:
         db_table = "accounts"
+        indexes = [models.Index(fields=["name", "created_at"], name="ix_accounts_name_created_at")]
 
     id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=255)
@@ -32,10 +33,20 @@ class User(models.Model):
         db_table = "users"
 
     id = models.AutoField(primary_key=True)
-    name = models.CharField(max_length=255)
+    name = models.CharField(max_length=255, db_index=True)
     age = models.IntegerField()
     email = models.CharField(max_length=255, null=True)
     role = models.CharField(max_length=255, choices=[(role.value, role.name) for role in UserRole])
     is_active = models.BooleanField()
     birth_date = models.DateField()
     account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name="users")
+
+
+class Product(models.Model):
+    class Meta:
+        db_table = "products"
+
+    id = models.AutoField(primary_key=True)
+    code = models.CharField(max_length=255, db_collation="C", db_index=True)
+    name = models.CharField(max_length=255)
+    parent = models.ForeignKey("self", on_delete=models.CASCADE, null=True)
@@ -0,0 +1,69 @@
+from datetime import UTC, date, datetime
+
+import pytest
+from asgiref.sync import sync_to_async
+from django.db import connection
+
+from requela.builders.django import DjangoQueryBuilder
+from tests.django.models import Account, AccountStatus, User, UserRole
+from tests.django.rules import UserRules
+
+
+def _create_users():
+    with connection.schema_editor() as editor:
+        editor.create_model(Account)
+        editor.create_model(User)
+    account = Account.objects.create(
+        name="Account",
+        status=AccountStatus.ACTIVE,
+        balance=0,
+        created_at=datetime(2025, 1, 1, tzinfo=UTC),
+    )
+    for name, age in [("John", 30), ("Jane", 25), ("Bob", 40)]:
+        User.objects.create(
+            name=name,
+            age=age,
+            role=UserRole.USER,
+            is_active=True,
+            birth_date=date(2000, 1, 1),
+            account=account,
+        )
+
+
+def _drop_users():
+    with connection.schema_editor() as editor:
+        editor.delete_model(User)
+        editor.delete_model(Account)
+
+
+@pytest.fixture
+async def users():
+    # Django runs the queries of its async interface in a dedicated thread, so the tables
+    # are created from it as well
+    await sync_to_async(_create_users)()
+    yield
+    await sync_to_async(_drop_users)()
+
+
+async def test_aexecute(users):
+    builder = DjangoQueryBuilder(User)
+    query = await builder.abuild_query("gt(age,26)&order_by(-age)")
+
+    result = await builder.aexecute(query)
+
+    assert [user.name for user in result] == ["Bob", "John"]
+
+
+async def test_aexecute_stream(users):
+    builder = DjangoQueryBuilder(User)
+    query = await builder.abuild_query("gt(age,26)&order_by(age)")
+
+    result = await builder.aexecute(query, stream=True)
+
+    assert [user.name async for user in result] == ["John", "Bob"]
+
+
+async def test_rules_aexecute(users):
+    result = await UserRules().aexecute("eq(name,Jane)")
+
+    assert [user.name for user in result] == ["Jane"]
@@ -0,0 +1,38 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+
+from tests.django.rules import UserRules
+
+THREADS = 8
+ROUNDS = 10
+
+QUERIES = [
+    "and(eq(name,John {n}),eq(is_active,true))&order_by(-name)",
+    "or(eq(account.name,Acme {n}),like(name,J*))",
+    "in(name,({n},{n}1,{n}2))",
+    "not(ne(name,{n}))&order_by(name)",
+]
+
+
+def _queries(worker):
+    return [
+        query.format(n=worker * ROUNDS + round_) for round_ in range(ROUNDS) for query in QUERIES
+    ]
+
+
+def test_shared_rules_from_threads():
+    rules = UserRules()
+    barrier = Barrier(THREADS)
+
+    def work(worker):
+        barrier.wait()
+        return [(query, rules.build_query(query)) for query in _queries(worker)]
+
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        results = [item for items in executor.map(work, range(THREADS)) for item in items]
+
+    # Querysets are compiled here, Django connections being local to threads
+    serial_rules = UserRules()
+    assert len(results) == THREADS * ROUNDS * len(QUERIES)
+    for query, queryset in results:
+        assert str(queryset.query) == str(serial_rules.build_query(query).query), query
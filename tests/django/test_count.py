@@ -0,0 +1,72 @@
+import pytest
+from asgiref.sync import sync_to_async
+
+from requela.builders.django import DjangoQueryBuilder
+from requela.cache import TTLCache
+from tests.django.models import User
+from tests.django.rules import UserRules
+from tests.django.test_pagination import _create_rows, _drop_rows
+from tests.django.utils import assert_statements_equal
+
+
+@pytest.fixture
+def rows():
+    _create_rows()
+    yield
+    _drop_rows()
+
+
+def test_build_count_query():
+    builder = DjangoQueryBuilder(User)
+
+    count_query = builder.build_count_query(
+        "eq(account.name,Acme)&order_by(-account.description)&select(account)&limit(5)"
+    )
+
+    assert_statements_equal(count_query, User.objects.filter(account__name="Acme").order_by())
+
+
+def test_build_query_and_count():
+    builder = DjangoQueryBuilder(User)
+
+    query, count_query = builder.build_query_and_count("eq(name,John)&order_by(-age)")
+
+    assert_statements_equal(query, User.objects.filter(name="John").order_by("-age"))
+    assert_statements_equal(count_query, User.objects.filter(name="John").order_by())
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        ("ne(name,Nobody)", 7),
+        ("eq(account.name,Acme)&order_by(-name)", 3),
+        ("gt(age,25)&limit(1)", 5),
+    ],
+)
+def test_count(rows, query, expected):
+    builder = DjangoQueryBuilder(User)
+
+    assert builder.count(query) == expected
+    assert builder.count(query, approximate=True) == expected
+
+
+def test_count_totals_are_cached(rows):
+    builder = DjangoQueryBuilder(User, totals=TTLCache(ttl=60))
+    assert builder.count("eq(account.name,Acme)") == 3
+
+    User.objects.filter(id=2).update(account_id=1)
+
+    assert builder.count("eq(account.name,Acme)&order_by(name)") == 3
+    assert builder.count("eq(account.id,1)") == 4
+
+
+async def test_acount():
+    await sync_to_async(_create_rows)()
+    try:
+        total = await UserRules().acount("eq(account.name,Acme)&order_by(name)")
+        approximate = await UserRules().acount("ne(name,Nobody)", approximate=True)
+    finally:
+        await sync_to_async(_drop_rows)()
+
+    assert total == 3
+    assert approximate == 7
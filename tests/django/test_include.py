@@ -0,0 +1,69 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from requela.builders.django import DjangoQueryBuilder
+from requela.exceptions import RequelaError
+from tests.django.models import Account, User
+from tests.django.rules import UserRules
+from tests.django.test_pagination import _create_rows, _drop_rows
+from tests.django.utils import assert_statements_equal
+
+
+@pytest.fixture
+def rows():
+    _create_rows()
+    yield
+    _drop_rows()
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        ("include(account)", User.objects.select_related("account")),
+        (
+            "include(account.users,account)",
+            User.objects.select_related("account").prefetch_related("account__users"),
+        ),
+        (
+            "select(+account.name)&include(account)",
+            User.objects.select_related("account").defer(
+                "account__description", "account__status", "account__balance", "account__created_at"
+            ),
+        ),
+    ],
+)
+def test_include(query, expected):
+    assert_statements_equal(DjangoQueryBuilder(User).build_query(query), expected)
+
+
+def test_include_many_rows():
+    assert_statements_equal(
+        DjangoQueryBuilder(Account).build_query("include(users)"),
+        Account.objects.prefetch_related("users"),
+    )
+
+
+def test_include_field():
+    with pytest.raises(ValueError, match="Only relationships can be included, not 'age'."):
+        DjangoQueryBuilder(User).build_query("include(age)")
+
+
+def test_include_loads_related_rows(rows):
+    query = DjangoQueryBuilder(User).build_query("gt(age,25)&include(account.users)")
+
+    with CaptureQueriesContext(connection) as queries:
+        users = list(query)
+        colleagues = {user.name: len(user.account.users.all()) for user in users}
+
+    assert colleagues == {"John": 3, "Bob": 3, "Alice": 2, "Mallory": 2, "Trent": 2}
+    # The users with their accounts, then the users of their accounts
+    assert len(queries) == 2
+
+
+def test_rules_include():
+    assert_statements_equal(
+        UserRules().build_query("include(account)"), User.objects.select_related("account")
+    )
+    with pytest.raises(RequelaError, match="Include 'name' is not allowed."):
+        UserRules().build_query("include(name)")
@@ -0,0 +1,41 @@
+import pytest
+
+from requela.builders.django import DjangoQueryBuilder
+from requela.dataclasses import QueryLimits
+from requela.parser import QueryLimitError
+from tests.django.models import User
+from tests.django.utils import assert_statements_equal
+
+
+def test_limit():
+    builder = DjangoQueryBuilder(User)
+    stmt = builder.build_query("eq(age,30)&order_by(name)&limit(10)")
+    expected = User.objects.filter(age=30).order_by("name")[:10]
+    assert_statements_equal(stmt, expected)
+
+
+def test_limit_with_offset():
+    builder = DjangoQueryBuilder(User)
+    stmt = builder.build_query("limit(10,20)&order_by(name)")
+    expected = User.objects.order_by("name")[20:30]
+    assert_statements_equal(stmt, expected)
+
+
+@pytest.mark.parametrize(
+    ("limits", "expected"),
+    [
+        (QueryLimits(default_limit=50), 50),
+        (QueryLimits(max_limit=100), 100),
+        (QueryLimits(default_limit=500, max_limit=100), 100),
+    ],
+)
+def test_default_limit(limits, expected):
+    builder = DjangoQueryBuilder(User, limits=limits)
+    stmt = builder.build_query("eq(age,30)")
+    assert_statements_equal(stmt, User.objects.filter(age=30)[:expected])
+
+
+def test_limit_over_max_limit():
+    builder = DjangoQueryBuilder(User, limits=QueryLimits(max_limit=100))
+    with pytest.raises(QueryLimitError, match="Query exceeds the maximum limit of 100."):
+        builder.build_query("eq(age,30)&limit(101)")
@@ -0,0 +1,139 @@
+from datetime import datetime
+
+import pytest
+from django.db import connection
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from requela.builders.django import DjangoQueryBuilder
+from requela.dataclasses import Operator, Page
+from requela.rules import FieldRule
+from tests.django.models import User
+from tests.django.rules import UserRules
+from tests.django.test_pagination import _create_rows, _drop_rows
+from tests.django.utils import assert_statements_equal
+
+CONTRADICTION = "and(eq(age,30),eq(age,40))"
+
+
+class OptimizedUserRules(UserRules):
+    __optimize_filters__ = True
+
+
+class EqualNameUserRules(OptimizedUserRules):
+    name = FieldRule(allowed_operators=[Operator.EQ])
+
+
+@pytest.fixture
+def rows():
+    _create_rows()
+    yield
+    _drop_rows()
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        ("or(eq(name,John),eq(name,Jane))", User.objects.filter(name__in=["John", "Jane"])),
+        ("not(not(eq(name,John)))&eq(name,John)", User.objects.filter(name="John")),
+        (
+            "not(or(eq(name,John),gt(age,30)))",
+            User.objects.filter(~Q(name="John") & ~Q(age__gt=30)),
+        ),
+    ],
+)
+def test_build_optimized_query(query, expected):
+    assert_statements_equal(
+        DjangoQueryBuilder(User, optimize_filters=True).build_query(query), expected
+    )
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        ("or(eq(name,John),and(eq(name,Bob),eq(name,Bob)),eq(name,Eve))", ["Bob", "Eve", "John"]),
+        ("and(eq(name,John),or(eq(name,John),eq(is_active,true)))", ["John"]),
+        ("eq(name,John)&or(eq(name,John),eq(is_active,true))", ["John"]),
+    ],
+)
+def test_optimized_query_selects_the_same_rows(rows, query, expected):
+    optimized = DjangoQueryBuilder(User, optimize_filters=True).build_query(query)
+    original = DjangoQueryBuilder(User).build_query(query)
+
+    names = sorted(user.name for user in optimized)
+
+    assert names == sorted(user.name for user in original)
+    assert names == expected
+
+
+@pytest.mark.parametrize(
+    "query", ["not(and(eq(email,a),ne(email,a)))", "not(and(eq(email,null()),eq(email,a)))"]
+)
+def test_negated_contradiction_selects_the_same_rows(rows, query):
+    User.objects.filter(id=2).update(email="b")
+
+    optimized = DjangoQueryBuilder(User, optimize_filters=True).build_query(query)
+    original = DjangoQueryBuilder(User).build_query(query)
+
+    ids = sorted(user.id for user in optimized)
+
+    assert ids == sorted(user.id for user in original)
+
+
+def test_contradiction_is_not_run():
+    # The tables don't exist, so running any query would fail
+    builder = DjangoQueryBuilder(User, optimize_filters=True)
+
+    with CaptureQueriesContext(connection) as queries:
+        assert list(builder.build_query(CONTRADICTION)) == []
+        assert builder.count(CONTRADICTION) == 0
+        assert builder.paginate(f"{CONTRADICTION}&order_by(name)", 5) == Page(items=[])
+
+    assert len(queries) == 0
+
+
+async def test_async_contradiction_is_not_run():
+    builder = DjangoQueryBuilder(User, optimize_filters=True)
+
+    assert await builder.acount(CONTRADICTION) == 0
+    assert await builder.apaginate(CONTRADICTION, 5) == Page(items=[])
+
+
+def test_optimization_is_opt_in():
+    query = "or(eq(name,John),eq(name,Jane))"
+    expected = User.objects.filter(Q(name="John") | Q(name="Jane"))
+
+    assert_statements_equal(DjangoQueryBuilder(User).build_query(query), expected)
+    assert_statements_equal(UserRules().build_query(query), expected)
+    assert not UserRules().builder.optimize_filters
+    assert OptimizedUserRules().builder.optimize_filters
+
+
+def test_rules_fold_allowed_in():
+    query = "or(eq(name,John),eq(name,Jane))"
+
+    assert_statements_equal(
+        OptimizedUserRules().build_query(query), User.objects.filter(name__in=["John", "Jane"])
+    )
+    assert_statements_equal(
+        EqualNameUserRules().build_query(query),
+        User.objects.filter(Q(name="John") | Q(name="Jane")),
+    )
+
+
+def test_days_are_not_folded_with_sargable_rewrites():
+    builder = DjangoQueryBuilder(User, optimize_filters=True, sargable_rewrites=True)
+
+    queryset = builder.build_query(
+        "or(eq(account.created_at,2025-01-01),eq(account.created_at,2025-01-02))"
+    )
+
+    days = [timezone.make_aware(datetime(2025, 1, day)) for day in (1, 2, 3)]
+    assert_statements_equal(
+        queryset,
+        User.objects.filter(
+            Q(account__created_at__gte=days[0], account__created_at__lt=days[1])
+            | Q(account__created_at__gte=days[1], account__created_at__lt=days[2])
+        ),
+    )
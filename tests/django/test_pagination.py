@@ -0,0 +1,151 @@
+from datetime import UTC, date, datetime
+
+import pytest
+from asgiref.sync import sync_to_async
+from django.db import connection
+from django.db.models import F, Q
+
+from requela.builders.django import DjangoQueryBuilder
+from requela.exceptions import InvalidCursorError
+from requela.pagination import encode_cursor
+from tests.django.models import Account, AccountStatus, User, UserRole
+from tests.django.rules import UserRules
+from tests.django.utils import assert_statements_equal
+
+USERS = [
+    # id, name, age, account id
+    (1, "John", 30, 1),
+    (2, "Jane", 25, 2),
+    (3, "Bob", 40, 1),
+    (4, "Alice", 30, 3),
+    (5, "Eve", 25, 1),
+    (6, "Mallory", 30, 2),
+    (7, "Trent", 40, 3),
+]
+ACCOUNTS = [(1, "Acme", "Main"), (2, "Globex", None), (3, "Initech", "Other")]
+
+
+def _create_rows():
+    with connection.schema_editor() as editor:
+        editor.create_model(Account)
+        editor.create_model(User)
+    for account_id, name, description in ACCOUNTS:
+        Account.objects.create(
+            id=account_id,
+            name=name,
+            description=description,
+            status=AccountStatus.ACTIVE,
+            balance=0,
+            created_at=datetime(2025, 1, 1, tzinfo=UTC),
+        )
+    for user_id, name, age, account_id in USERS:
+        User.objects.create(
+            id=user_id,
+            name=name,
+            age=age,
+            role=UserRole.USER,
+            is_active=True,
+            birth_date=date(2000, 1, 1),
+            account_id=account_id,
+        )
+
+
+def _drop_rows():
+    with connection.schema_editor() as editor:
+        editor.delete_model(User)
+        editor.delete_model(Account)
+
+
+@pytest.fixture
+def rows():
+    _create_rows()
+    yield
+    _drop_rows()
+
+
+def test_build_page_query():
+    builder = DjangoQueryBuilder(User)
+
+    page_query = builder.build_page_query("eq(is_active,true)&order_by(account.name,-age)", 10)
+
+    expected = (
+        User.objects.filter(is_active=True)
+        .order_by("account__name", "-age", "-id")
+        .annotate(
+            _requela_key_0=F("account__name"), _requela_key_1=F("age"), _requela_key_2=F("id")
+        )[:11]
+    )
+    assert_statements_equal(page_query.query, expected)
+
+
+def test_build_page_query_after_cursor():
+    builder = DjangoQueryBuilder(User)
+    query = "order_by(account.description,-age)"
+    keyset = builder.build_page_query(query, 10).keyset
+
+    page_query = builder.build_page_query(query, 10, encode_cursor(keyset, ("Main", 30, 5)))
+
+    expected = (
+        User.objects.order_by(F("account__description").asc(nulls_last=True), "-age", "-id")
+        .filter(
+            Q(account__description__gt="Main")
+            | Q(account__description__isnull=True)
+            | Q(account__description__exact="Main", age__lt=30)
+            | Q(account__description__exact="Main", age__exact=30, id__lt=5)
+        )
+        .annotate(
+            _requela_key_0=F("account__description"),
+            _requela_key_1=F("age"),
+            _requela_key_2=F("id"),
+        )[:11]
+    )
+    assert_statements_equal(page_query.query, expected)
+
+
+@pytest.mark.parametrize(
+    ("query", "page_size", "expected"),
+    [
+        ("order_by(name)", 3, [[4, 3, 5], [2, 1, 6], [7]]),
+        ("order_by(-age)", 3, [[7, 3, 6], [4, 1, 5], [2]]),
+        ("order_by(age,-account.name)", 2, [[2, 5], [4, 6], [1, 7], [3]]),
+        ("order_by(-account.description,name)", 2, [[4, 7], [3, 5], [1, 2], [6]]),
+        ("gt(age,25)&order_by(account.name,-age)", 4, [[3, 1, 6, 7], [4]]),
+        ("eq(name,Nobody)", 5, [[]]),
+    ],
+)
+def test_paginate(rows, query, page_size, expected):
+    builder = DjangoQueryBuilder(User)
+    pages = []
+    cursor = None
+    while True:
+        page = builder.paginate(query, page_size, cursor=cursor)
+        pages.append([user.id for user in page.items])
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    assert pages == expected
+
+
+def test_paginate_cursor_of_other_order(rows):
+    builder = DjangoQueryBuilder(User)
+    page = builder.paginate("order_by(name)", 2)
+
+    with pytest.raises(InvalidCursorError):
+        builder.paginate("order_by(-name)", 2, cursor=page.next_cursor)
+
+
+async def test_apaginate():
+    # Django runs the queries of its async interface in a dedicated thread, so the tables
+    # are created from it as well
+    await sync_to_async(_create_rows)()
+    rules = UserRules()
+    try:
+        first = await rules.apaginate("order_by(account.name,name)", 4)
+        second = await rules.apaginate("order_by(account.name,name)", 4, cursor=first.next_cursor)
+    finally:
+        await sync_to_async(_drop_rows)()
+
+    assert [user.id for user in first.items] == [3, 5, 1, 2]
+    assert [user.id for user in second.items] == [6, 4, 7]
+    assert second.next_cursor is None
@@ -0,0 +1,99 @@
+import pytest
+
+from requela.builders.django import DjangoQueryBuilder
+from requela.exceptions import RequelaError
+from requela.rules import FieldRule, ModelRQLRules, RelationshipRule
+from tests.django.models import Account, User
+from tests.django.rules import AccountRules
+from tests.django.test_pagination import _create_rows, _drop_rows
+from tests.django.utils import assert_statements_equal
+
+
+class ProjectedUserRules(ModelRQLRules):
+    __model__ = User
+
+    name = FieldRule()
+    email = FieldRule(deferred=True)
+    birth_date = FieldRule(alias="events.born.at", deferred=True)
+    account = RelationshipRule(rules=AccountRules())
+
+
+@pytest.fixture
+def rows():
+    _create_rows()
+    yield
+    _drop_rows()
+
+
+def test_exclude_fields():
+    builder = DjangoQueryBuilder(User)
+    stmt = builder.build_query("eq(age,30)&select(-email,-birth_date)")
+    expected = User.objects.filter(age=30).defer("email", "birth_date")
+    assert_statements_equal(stmt, expected)
+
+
+def test_include_related_fields():
+    builder = DjangoQueryBuilder(User)
+    stmt = builder.build_query("select(+name,+account.name,-account.balance)")
+    expected = User.objects.select_related("account").defer(
+        "account__description",
+        "account__status",
+        "account__balance",
+        "account__created_at",
+    )
+    assert_statements_equal(stmt, expected)
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        ("select(+account)", User.objects.select_related("account")),
+        (
+            "select(+account,-account.description)",
+            User.objects.select_related("account").defer("account__description"),
+        ),
+    ],
+)
+def test_include_relationship(query, expected):
+    builder = DjangoQueryBuilder(User)
+    assert_statements_equal(builder.build_query(query), expected)
+
+
+@pytest.mark.parametrize(
+    ("query", "message"),
+    [
+        ("select(+name,-name)", "Field 'name' cannot be both included and excluded."),
+        ("select(-account)", "Relationship 'account' cannot be excluded, only its fields."),
+        ("select(+account.users.name)", "Relationship 'account.users' has many rows"),
+        ("select(-account.users.name)", "Relationship 'account.users' has many rows"),
+    ],
+)
+def test_invalid_projection(query, message):
+    with pytest.raises(ValueError, match=message):
+        DjangoQueryBuilder(User).build_query(query)
+
+
+def test_deferred_fields():
+    builder = DjangoQueryBuilder(User, deferred_fields=["email", "birth_date"])
+
+    assert_statements_equal(
+        builder.build_query("eq(age,30)"),
+        User.objects.filter(age=30).defer("email", "birth_date"),
+    )
+    assert_statements_equal(builder.build_query("select(+email)"), User.objects.defer("birth_date"))
+
+
+def test_rules_projection():
+    rules = ProjectedUserRules()
+
+    with pytest.raises(RequelaError, match="Relation with alias 'age' not found"):
+        rules.build_query("select(-age)")
+
+
+def test_deferred_fields_are_not_loaded(rows):
+    user = ProjectedUserRules().build_query("eq(name,John)&select(+account.name)").get()
+
+    assert user.get_deferred_fields() == {"email", "birth_date"}
+    assert user.account.get_deferred_fields() == {"description", "status", "balance", "created_at"}
+    assert user.account.name == "Acme"
+    assert isinstance(user.account, Account)
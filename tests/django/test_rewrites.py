@@ -0,0 +1,162 @@
+from datetime import date, datetime
+
+import pytest
+from django.db.models import Q
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from requela.builders.django import DjangoQueryBuilder
+from requela.rules import FieldRule, ModelRQLRules
+from tests.django.models import Account, Product, User, UserRole
+from tests.django.test_pagination import _create_rows, _drop_rows
+from tests.django.utils import assert_statements_equal
+
+DAY = timezone.make_aware(datetime(2025, 1, 1))
+NEXT_DAY = timezone.make_aware(datetime(2025, 1, 2))
+
+
+class ProductRules(ModelRQLRules):
+    __model__ = Product
+
+    code = FieldRule()
+
+
+class SargableProductRules(ProductRules):
+    __sargable_rewrites__ = True
+
+
+@pytest.fixture
+def rows():
+    _create_rows()
+    yield
+    _drop_rows()
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        (
+            "like(code,John*)",
+            Product.objects.filter(code__gte="John", code__lt="Joho", code__startswith="John"),
+        ),
+        (
+            "like(parent.code,Ac*)",
+            Product.objects.filter(
+                parent__code__gte="Ac", parent__code__lt="Ad", parent__code__startswith="Ac"
+            ),
+        ),
+        (
+            "like(code,J_hn*)",
+            Product.objects.filter(code__gte="J", code__lt="K", code__startswith="J_hn"),
+        ),
+        ("like(code,_ohn*)", Product.objects.filter(code__startswith="_ohn")),
+        ("like(code,*John*)", Product.objects.filter(code__contains="John")),
+        ("like(name,John*)", Product.objects.filter(name__startswith="John")),
+    ],
+)
+def test_rewrite_prefix(query, expected):
+    builder = DjangoQueryBuilder(Product, sargable_rewrites=True)
+
+    assert_statements_equal(builder.build_query(query), expected)
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        ("like(name,John*)", User.objects.filter(name__startswith="John")),
+        ("like(account.name,Ac*)", User.objects.filter(account__name__startswith="Ac")),
+        ("like(name,*John*)", User.objects.filter(name__contains="John")),
+        ("like(birth_date,x*)", User.objects.filter(birth_date__startswith="x")),
+        ("like(age,x*)", User.objects.filter(age__startswith="x")),
+        ("eq(birth_date,2025-01-01)", User.objects.filter(birth_date="2025-01-01")),
+        (
+            "eq(account.created_at,2025-01-01)",
+            User.objects.filter(account__created_at__gte=DAY, account__created_at__lt=NEXT_DAY),
+        ),
+        (
+            "ne(account.created_at,2025-01-01)",
+            User.objects.filter(
+                Q(account__created_at__lt=DAY) | Q(account__created_at__gte=NEXT_DAY)
+            ),
+        ),
+        (
+            "gt(account.created_at,2025-01-01)",
+            User.objects.filter(account__created_at__gte=NEXT_DAY),
+        ),
+        (
+            "lte(account.created_at,2025-01-01)",
+            User.objects.filter(account__created_at__lt=NEXT_DAY),
+        ),
+    ],
+)
+def test_rewrite(query, expected):
+    builder = DjangoQueryBuilder(User, sargable_rewrites=True)
+
+    assert_statements_equal(builder.build_query(query), expected)
+
+
+@override_settings(USE_TZ=False)
+def test_rewrite_without_time_zone_support():
+    builder = DjangoQueryBuilder(Account, sargable_rewrites=True)
+
+    assert_statements_equal(
+        builder.build_query("gt(created_at,2025-01-01)"),
+        Account.objects.filter(created_at__gte=datetime(2025, 1, 2)),
+    )
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        ("eq(created_at,2025-01-01)", 3),
+        ("gt(created_at,2024-12-31)", 3),
+        ("gt(created_at,2025-01-01)", 0),
+        ("lte(created_at,2025-01-01)", 3),
+        ("ne(created_at,2025-01-01)", 0),
+    ],
+)
+def test_rewrite_compares_whole_days(rows, query, expected):
+    Account.objects.filter(id__in=[1, 2, 3]).update(created_at=DAY)
+    Account.objects.filter(id=2).update(created_at=DAY.replace(hour=18, minute=30))
+    builder = DjangoQueryBuilder(Account, sargable_rewrites=True)
+
+    assert builder.build_query(query).count() == expected
+
+
+def test_prefix_like_keeps_matching_other_cases(rows):
+    # SQLite's LIKE is case-insensitive, which a range of the column cannot match
+    for user_id, name in [(10, "john"), (11, "JOHNNY")]:
+        User.objects.create(
+            id=user_id,
+            name=name,
+            age=30,
+            role=UserRole.USER,
+            is_active=True,
+            birth_date=date(2000, 1, 1),
+            account_id=1,
+        )
+    query = "like(name,john*)"
+
+    rewritten = DjangoQueryBuilder(User, sargable_rewrites=True).build_query(query)
+    original = DjangoQueryBuilder(User).build_query(query)
+
+    names = sorted(user.name for user in rewritten)
+
+    assert names == sorted(user.name for user in original)
+    assert names == ["JOHNNY", "John", "john"]
+
+
+def test_day_range_uses_index(rows):
+    query = "eq(name,Acme)&eq(created_at,2025-01-01)"
+
+    plan = DjangoQueryBuilder(Account, sargable_rewrites=True).build_query(query).explain()
+
+    assert "(name=? AND created_at>? AND created_at<?)" in plan
+
+
+def test_rules_rewrites():
+    assert_statements_equal(
+        SargableProductRules().build_query("like(code,Jo*)"),
+        Product.objects.filter(code__gte="Jo", code__lt="Jp", code__startswith="Jo"),
+    )
+    assert not ProductRules().builder.sargable_rewrites
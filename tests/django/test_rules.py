@@ -1,9 +1,10 @@
 from datetime import date, datetime
 
 import pytest
+from django.db.models import Q
 
-from requela.dataclasses import Operator
-from requela.exceptions import RequelaError
+from requela.dataclasses import IndexPolicy, Operator, QueryLimits
+from requela.exceptions import QueryCostError, RequelaError
 from requela.rules import FieldRule, ModelRQLRules
 from tests.django.models import User
 from tests.django.rules import UserRules
@@ -111,3 +112,57 @@ def test_filter_class_order_field_not_allowed():
 
     with pytest.raises(RequelaError, match="Order by 'name' is not allowed."):
         UserRules().build_query("order_by(name)")
+
+
+def test_query_limits():
+    class LimitedUserRules(ModelRQLRules):
+        __model__ = User
+        __limits__ = QueryLimits(max_depth=2)
+
+        name = FieldRule()
+
+    user_filter = LimitedUserRules()
+    stmt = user_filter.build_query("not(eq(name,John))")
+    assert_statements_equal(stmt, User.objects.filter(~Q(name="John")))
+    with pytest.raises(RequelaError, match="Query exceeds the maximum nesting depth of 2."):
+        user_filter.build_query("not(not(eq(name,John)))")
+
+
+def test_build_many():
+    user_filter = UserRules()
+    results = user_filter.build_many(["eq(name,John)", "eq(name,Jane)", "eq(email,x)"])
+
+    assert_statements_equal(results[1].query, User.objects.filter(name="Jane"))
+    assert [result.ok for result in results] == [True, True, False]
+    assert isinstance(results[2].error, RequelaError)
+
+
+def test_indexed_fields_inferred_from_model():
+    class IndexedUserRules(ModelRQLRules):
+        __model__ = User
+        __index_policy__ = IndexPolicy.REJECT
+
+        name = FieldRule()
+        age = FieldRule()
+
+    compiled = IndexedUserRules.compile()
+    assert compiled.resolve("name").indexed
+    assert not compiled.resolve("age").indexed
+    assert_statements_equal(
+        IndexedUserRules().build_query("eq(name,John)&order_by(-name)"),
+        User.objects.filter(name="John").order_by("-name"),
+    )
+    with pytest.raises(RequelaError, match="Filter 'gt' on 'age' cannot use an index."):
+        IndexedUserRules().build_query("gt(age,30)")
+
+
+def test_max_cost():
+    class BudgetedUserRules(UserRules):
+        __limits__ = QueryLimits(max_cost=20)
+
+    rules = BudgetedUserRules()
+    assert_statements_equal(
+        rules.build_query("eq(account.name,Acme)"), User.objects.filter(account__name="Acme")
+    )
+    with pytest.raises(QueryCostError, match="Query cost of 60 exceeds the maximum of 20."):
+        rules.build_query("like(account.name,*Acme)")
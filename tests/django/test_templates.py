@@ -0,0 +1,59 @@
+import pytest
+from django.db.models import Q
+
+from requela.builders.django import DjangoQueryBuilder
+from tests.django.models import Account, User
+from tests.django.utils import assert_statements_equal
+
+
+def test_queries_differing_in_literals_share_template():
+    builder = DjangoQueryBuilder(User)
+
+    builder.build_query("and(eq(name,John),not(in(age,(30,40))))&order_by(-name)")
+    stmt = builder.build_query("and(eq(name,Jane),not(in(age,(50))))&order_by(-name)")
+
+    expected = User.objects.filter(Q(name="Jane") & ~Q(age__in=(50,))).order_by("-name")
+    assert_statements_equal(stmt, expected)
+    stats = builder.templates.stats()
+    assert stats.hits == 1
+    assert stats.size == 1
+
+
+def test_template_of_any():
+    builder = DjangoQueryBuilder(Account)
+
+    builder.build_query("any(users,eq(users.name,John))")
+    stmt = builder.build_query("any(users,eq(users.name,Jane))")
+
+    expected = Account.objects.prefetch_related("users").filter(users__name="Jane")
+    assert_statements_equal(stmt, expected)
+    assert builder.templates.stats().hits == 1
+
+
+@pytest.mark.parametrize(
+    ("query", "other_query", "expected"),
+    [
+        ("like(name,*John*)", "like(name,*Jane*)", Q(name__contains="Jane")),
+        ("like(name,*John)", "like(name,*Jane)", Q(name__endswith="Jane")),
+        ("ilike(name,John*)", "ilike(name,Jane*)", Q(name__istartswith="Jane")),
+        ("ilike(name,John)", "ilike(name,Jane)", Q(name__icontains="Jane")),
+    ],
+)
+def test_template_binds_like_patterns(query, other_query, expected):
+    builder = DjangoQueryBuilder(User)
+
+    builder.build_query(query)
+    stmt = builder.build_query(other_query)
+
+    assert_statements_equal(stmt, User.objects.filter(expected))
+    assert builder.templates.stats().hits == 1
+
+
+def test_like_patterns_get_their_own_template():
+    builder = DjangoQueryBuilder(User)
+
+    builder.build_query("like(name,*John)")
+    stmt = builder.build_query("like(name,Jane*)")
+
+    assert_statements_equal(stmt, User.objects.filter(name__startswith="Jane"))
+    assert builder.templates.stats().size == 2
@@ -3,7 +3,18 @@ from datetime import date, datetime
 from decimal import Decimal
 
 import sqlalchemy as sa
-from sqlalchemy import Boolean, Date, DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    Float,
+    ForeignKey,
+    ForeignKeyConstraint,
+    Integer,
+    String,
+    Table,
+)
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from sqlalchemy.types import Enum as SQLEnum
 
@@ -39,8 +50,25 @@ class Actor(Base):
     name: Mapped[str] = mapped_column(String)
 
 
+user_groups = Table(
+    "user_groups",
+    Base.metadata,
+    Column("user_id", ForeignKey("users.id"), primary_key=True),
+    Column("group_id", ForeignKey("groups.id"), primary_key=True),
+)
+
+
+class Group(Base):
+    __tablename__ = "groups"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str] = mapped_column(String)
+    users: Mapped[list["User"]] = relationship(secondary=user_groups, back_populates="groups")
+
+
 class Account(Base):
     __tablename__ = "accounts"
+    __table_args__ = (sa.Index("ix_accounts_name_created_at", "name", "created_at"),)
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String)
@@ -54,13 +82,14 @@ class Account(Base):
     tenant: Mapped[Tenant] = relationship("Tenant", back_populates="accounts")
     users: Mapped[list["User"]] = relationship("User", back_populates="account")
     datasource_id: Mapped[str] = mapped_column(String(255), nullable=False)
+    contracts: Mapped[list["Contract"]] = relationship("Contract", back_populates="account")
 
 
 class User(Base):
     __tablename__ = "users"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    name: Mapped[str] = mapped_column(String)
+    name: Mapped[str] = mapped_column(String, index=True)
     age: Mapped[int] = mapped_column(Integer)
     email: Mapped[str] = mapped_column(String, nullable=True)
     role: Mapped[UserRole] = mapped_column(SQLEnum(UserRole))
@@ -68,6 +97,31 @@ class User(Base):
     birth_date: Mapped[date] = mapped_column(Date)
     account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id"))
     account: Mapped[Account] = relationship("Account", back_populates="users")
+    groups: Mapped[list[Group]] = relationship(secondary=user_groups, back_populates="users")
+
+
+class Contract(Base):
+    __tablename__ = "contracts"
+
+    account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id"), primary_key=True)
+    number: Mapped[str] = mapped_column(String, primary_key=True)
+    account: Mapped[Account] = relationship(Account, back_populates="contracts")
+    amendments: Mapped[list["Amendment"]] = relationship(back_populates="contract")
+
+
+class Amendment(Base):
+    __tablename__ = "amendments"
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["account_id", "contract_number"], ["contracts.account_id", "contracts.number"]
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    account_id: Mapped[int] = mapped_column(Integer)
+    contract_number: Mapped[str] = mapped_column(String)
+    description: Mapped[str] = mapped_column(String)
+    contract: Mapped[Contract] = relationship(back_populates="amendments")
 
 
 class ChargesFile(Base):
@@ -75,3 +129,17 @@ class ChargesFile(Base):
     id: Mapped[int] = mapped_column(primary_key=True)
     currency: Mapped[str] = mapped_column(String(3), nullable=False)
     amount: Mapped[Decimal | None] = mapped_column(sa.Numeric(18, 4), nullable=True)
+
+
+class PostgreSQLBase(DeclarativeBase):
+    """Base class for the models only PostgreSQL can create"""
+
+
+class Product(PostgreSQLBase):
+    __tablename__ = "products"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    code: Mapped[str] = mapped_column(String(collation="C"), index=True)
+    name: Mapped[str] = mapped_column(String)
+    parent_id: Mapped[int | None] = mapped_column(ForeignKey("products.id"), nullable=True)
+    parent: Mapped["Product"] = relationship(remote_side=[id])
@@ -54,3 +54,18 @@ class UserRules(ModelRQLRules):
     account = RelationshipRule(
         rules=AccountRules(),
     )
+
+
+class LazyAccountRules(ModelRQLRules):
+    __model__ = Account
+
+    name = FieldRule()
+    users = RelationshipRule(rules="LazyUserRules")
+    tenant = RelationshipRule(rules="tests.sqlalchemy.rules.TenantRules")
+
+
+class LazyUserRules(ModelRQLRules):
+    __model__ = User
+
+    name = FieldRule()
+    account = RelationshipRule(rules=LazyAccountRules)
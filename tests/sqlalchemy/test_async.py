@@ -0,0 +1,132 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from requela.builders.sqlalchemy import SQLAlchemyQueryBuilder
+from requela.exceptions import QueryCostError, RequelaError
+from tests.sqlalchemy.models import Base, User, UserRole
+from tests.sqlalchemy.rules import UserRules
+from tests.sqlalchemy.utils import assert_statements_equal
+
+
+@pytest.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine) as session:
+        session.add_all(
+            [
+                User(
+                    id=user_id,
+                    name=name,
+                    age=age,
+                    role=UserRole.USER,
+                    is_active=True,
+                    birth_date=date(2000, 1, 1),
+                    account_id=1,
+                )
+                for user_id, name, age in [(1, "John", 30), (2, "Jane", 25), (3, "Bob", 40)]
+            ]
+        )
+        await session.commit()
+        yield session
+    await engine.dispose()
+
+
+class RecordingExecutor(ThreadPoolExecutor):
+    def __init__(self):
+        super().__init__(max_workers=1)
+        self.submitted = []
+
+    def submit(self, fn, /, *args, **kwargs):
+        self.submitted.append(args)
+        return super().submit(fn, *args, **kwargs)
+
+
+@pytest.mark.parametrize("async_threshold", [0, 4096])
+async def test_abuild_query(async_threshold):
+    builder = SQLAlchemyQueryBuilder(User, async_threshold=async_threshold)
+
+    query = await builder.abuild_query("eq(name,John)")
+
+    assert_statements_equal(query, select(User).filter(User.name == "John"))
+
+
+async def test_abuild_query_inline_below_threshold():
+    builder = SQLAlchemyQueryBuilder(User, async_threshold=13)
+
+    with RecordingExecutor() as executor:
+        await builder.abuild_query("eq(name,John)", executor=executor)
+
+    assert executor.submitted == []
+
+
+async def test_abuild_query_offloads_above_threshold():
+    builder = SQLAlchemyQueryBuilder(User, async_threshold=12)
+
+    with RecordingExecutor() as executor:
+        query = await builder.abuild_query("eq(name,John)", executor=executor)
+
+    assert executor.submitted == [("eq(name,John)", None, None)]
+    assert_statements_equal(query, select(User).filter(User.name == "John"))
+
+
+async def test_abuild_query_offloaded_error():
+    builder = SQLAlchemyQueryBuilder(User, async_threshold=0)
+
+    with pytest.raises(ValueError, match="Invalid RQL query"):
+        await builder.abuild_query("eq(name,John")
+
+
+async def test_aexecute(session):
+    builder = SQLAlchemyQueryBuilder(User)
+    query = await builder.abuild_query("gt(age,26)&order_by(-age)")
+
+    users = await builder.aexecute(query, session=session)
+
+    assert [user.name for user in users] == ["Bob", "John"]
+
+
+async def test_aexecute_stream(session):
+    builder = SQLAlchemyQueryBuilder(User)
+    query = await builder.abuild_query("gt(age,26)&order_by(age)")
+
+    users = await builder.aexecute(query, session=session, stream=True)
+
+    assert [user.name async for user in users] == ["John", "Bob"]
+
+
+async def test_aexecute_without_session():
+    builder = SQLAlchemyQueryBuilder(User)
+
+    with pytest.raises(ValueError, match="An AsyncSession is required"):
+        await builder.aexecute(select(User))
+
+
+async def test_rules_aexecute(session):
+    users = await UserRules().aexecute("eq(name,Jane)", session=session)
+
+    assert [user.name for user in users] == ["Jane"]
+
+
+async def test_rules_abuild_query_error():
+    with pytest.raises(RequelaError, match="Invalid RQL query"):
+        await UserRules().abuild_query("eq(name,John")
+
+
+async def test_rules_abuild_query_max_cost():
+    with pytest.raises(QueryCostError, match="Query cost of 10 exceeds the maximum of 0."):
+        await UserRules().abuild_query("eq(account.name,Acme)", max_cost=0)
+
+
+def test_rules_async_threshold():
+    class SmallQueryRules(UserRules):
+        __async_threshold__ = 10
+
+    assert SmallQueryRules().builder.async_threshold == 10
+    assert UserRules().builder.async_threshold == 4096
@@ -0,0 +1,67 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+import pytest
+from sqlalchemy import select
+
+from requela.builders.sqlalchemy import SQLAlchemyQueryBuilder
+from requela.dataclasses import QueryLimits
+from requela.parser import QueryLimitError
+from tests.sqlalchemy.models import User
+from tests.sqlalchemy.utils import assert_statements_equal
+
+LIMITS = QueryLimits(max_tuple_size=2)
+QUERIES = [
+    "eq(name,John)",
+    "eq(name,John",
+    "gt(age,30)",
+    "eq(name,John)",
+    "eq(age,thirty)",
+    "in(age,(1,2,3))",
+]
+
+
+def _assert_results(results):
+    assert [result.rql_query for result in results] == QUERIES
+    assert [result.ok for result in results] == [True, False, True, True, False, False]
+    assert_statements_equal(results[0].query, select(User).filter(User.name == "John"))
+    assert_statements_equal(results[2].query, select(User).filter(User.age > 30))
+    assert results[3] is results[0]
+    assert str(results[1].error).startswith("Invalid RQL query: Unexpected token")
+    assert str(results[4].error).startswith("Cannot cast value thirty")
+    assert isinstance(results[5].error, QueryLimitError)
+    assert all(result.query is None for result in results if not result.ok)
+
+
+def test_build_many():
+    builder = SQLAlchemyQueryBuilder(User, limits=LIMITS)
+    _assert_results(builder.build_many(QUERIES))
+
+
+@pytest.mark.parametrize(
+    "executor_class",
+    [
+        ThreadPoolExecutor,
+        # Other tests leave threads behind, which makes forking the workers unsafe
+        partial(ProcessPoolExecutor, mp_context=multiprocessing.get_context("spawn")),
+    ],
+)
+def test_build_many_with_executor(executor_class):
+    builder = SQLAlchemyQueryBuilder(User, limits=LIMITS)
+    with executor_class(max_workers=2) as executor:
+        _assert_results(builder.build_many(QUERIES, executor=executor, chunksize=2))
+
+
+def test_build_many_with_initial_query():
+    builder = SQLAlchemyQueryBuilder(User)
+    initial_query = select(User).where(User.is_active.is_(True))
+
+    results = builder.build_many(["eq(name,John)", "eq(name,Jane)"], initial_query=initial_query)
+
+    assert_statements_equal(results[1].query, initial_query.filter(User.name == "Jane"))
+    assert builder.templates.stats().hits == 1
+
+
+def test_build_many_without_queries():
+    assert SQLAlchemyQueryBuilder(User).build_many([]) == []
@@ -1,10 +1,12 @@
 from datetime import date, datetime
+from decimal import Decimal
 
 import pytest
-from sqlalchemy import select
+from sqlalchemy import literal_column, select
+from sqlalchemy.dialects import postgresql
 
 from requela.builders.sqlalchemy import SQLAlchemyQueryBuilder
-from tests.sqlalchemy.models import Account, ChargesFile, User
+from tests.sqlalchemy.models import Account, ChargesFile, User, UserRole
 from tests.sqlalchemy.utils import assert_statements_equal
 
 
@@ -260,6 +262,46 @@ def test_comparison_out(model, field, values, expected):
     assert_statements_equal(stmt, expected)
 
 
+def test_comparison_in_deduplicates_values():
+    builder = SQLAlchemyQueryBuilder(User)
+    stmt = builder.build_query("in(age,(30,25,30,25))")
+    assert_statements_equal(stmt, select(User).filter(User.age.in_([30, 25])))
+
+
+@pytest.mark.parametrize(
+    ("query", "condition"),
+    [
+        ("in(age,(25,30,25))", "users.age = ANY (%(age_1)s::INTEGER[])"),
+        ("out(age,(25,30,25))", "users.age != ALL (%(age_1)s::INTEGER[])"),
+        ("not(in(age,(25,30,25)))", "users.age != ALL (%(age_1)s::INTEGER[])"),
+        ("not(out(age,(25,30,25)))", "users.age = ANY (%(age_1)s::INTEGER[])"),
+    ],
+)
+def test_comparison_in_postgresql(query, condition):
+    stmt = SQLAlchemyQueryBuilder(User).build_query(query)
+
+    compiled = stmt.compile(dialect=postgresql.dialect())
+
+    assert compiled.string.endswith(f"WHERE {condition}")
+    assert compiled.params == {"age_1": [25, 30]}
+
+
+def test_comparison_in_postgresql_is_the_same_for_any_number_of_values():
+    builder = SQLAlchemyQueryBuilder(User)
+    few = builder.build_query("in(role,(admin,user))")
+    many = builder.build_query(f"in(role,({','.join(['guest', 'admin'] * 400)}))")
+    few_key, many_key = few._generate_cache_key(), many._generate_cache_key()
+
+    # Compiled once, like SQLAlchemy does for the statements sharing a cache key
+    compiled = few.compile(dialect=postgresql.dialect(), cache_key=few_key)
+
+    assert few_key == many_key
+    assert compiled.string.endswith("WHERE users.role = ANY (%(role_1)s::userrole[])")
+    assert compiled.construct_params(extracted_parameters=many_key.bindparams) == {
+        "role_1": [UserRole.GUEST, UserRole.ADMIN]
+    }
+
+
 # Like tests
 @pytest.mark.parametrize(
     ("model", "field", "pattern", "expected"),
@@ -304,32 +346,53 @@ def test_decimal_field():
     builder = SQLAlchemyQueryBuilder(ChargesFile)
     query_string = "eq(amount,100.40)"
     stmt = builder.build_query(query_string)
-    assert_statements_equal(stmt, select(ChargesFile).filter(ChargesFile.amount == 100.40))
+    assert_statements_equal(
+        stmt, select(ChargesFile).filter(ChargesFile.amount == Decimal("100.40"))
+    )
 
 
 def test_decimal_gt_field():
     builder = SQLAlchemyQueryBuilder(ChargesFile)
     query_string = "gt(amount,100.40)"
     stmt = builder.build_query(query_string)
-    assert_statements_equal(stmt, select(ChargesFile).filter(ChargesFile.amount > 100.40))
+    assert_statements_equal(
+        stmt, select(ChargesFile).filter(ChargesFile.amount > Decimal("100.40"))
+    )
 
 
 def test_decimal_gte_field():
     builder = SQLAlchemyQueryBuilder(ChargesFile)
     query_string = "gte(amount,100.40)"
     stmt = builder.build_query(query_string)
-    assert_statements_equal(stmt, select(ChargesFile).filter(ChargesFile.amount >= 100.40))
+    assert_statements_equal(
+        stmt, select(ChargesFile).filter(ChargesFile.amount >= Decimal("100.40"))
+    )
 
 
 def test_decimal_lte_field():
     builder = SQLAlchemyQueryBuilder(ChargesFile)
     query_string = "lte(amount,100.40)"
     stmt = builder.build_query(query_string)
-    assert_statements_equal(stmt, select(ChargesFile).filter(ChargesFile.amount <= 100.40))
+    assert_statements_equal(
+        stmt, select(ChargesFile).filter(ChargesFile.amount <= Decimal("100.40"))
+    )
 
 
 def test_decimal_lt_field():
     builder = SQLAlchemyQueryBuilder(ChargesFile)
     query_string = "lt(amount,100.40)"
     stmt = builder.build_query(query_string)
-    assert_statements_equal(stmt, select(ChargesFile).filter(ChargesFile.amount < 100.40))
+    assert_statements_equal(
+        stmt, select(ChargesFile).filter(ChargesFile.amount < Decimal("100.40"))
+    )
+
+
+@pytest.mark.parametrize("literal", ["2024-01-01", "1.50", "007"])
+def test_string_field_keeps_literal_as_written(literal):
+    builder = SQLAlchemyQueryBuilder(User)
+    stmt = builder.build_query(f"in(name,({literal},John))")
+    assert_statements_equal(stmt, select(User).filter(User.name.in_([literal, "John"])))
+
+
+def test_python_type_of_untyped_column():
+    assert SQLAlchemyQueryBuilder.get_python_type(literal_column("name")) is object
@@ -0,0 +1,97 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+
+import pytest
+
+from requela.builders.sqlalchemy import SQLAlchemyQueryBuilder
+from tests.sqlalchemy.models import User
+from tests.sqlalchemy.rules import UserRules
+
+THREADS = 8
+ROUNDS = 10
+
+# Queries of different shapes, joins and number of literals
+QUERIES = [
+    "eq(name,John)",
+    "and(eq(account.name,Acme),gt(account.balance,{n}))&order_by(-account.name)",
+    "or(eq(account.tenant.name,Tenant {n}),like(name,J*))",
+    "in(name,({n},{n}1,{n}2))&order_by(name)",
+    "and(ne(account.description,null()),lt(account.balance,{n}))",
+    "not(ilike(account.tenant.name,*{n}))",
+]
+
+
+def _compile(stmt):
+    compiled = stmt.compile()
+    return compiled.string, compiled.params
+
+
+def _queries(worker):
+    return [
+        query.format(n=worker * ROUNDS + round_) for round_ in range(ROUNDS) for query in QUERIES
+    ]
+
+
+@pytest.fixture(scope="module")
+def expected():
+    # The statements built one at a time
+    builder = SQLAlchemyQueryBuilder(User)
+    return {
+        query: _compile(builder.build_query(query))
+        for worker in range(THREADS)
+        for query in _queries(worker)
+    }
+
+
+def test_shared_rules_from_threads(expected):
+    rules = UserRules()
+    barrier = Barrier(THREADS)
+
+    def work(worker):
+        barrier.wait()
+        return [(query, _compile(rules.build_query(query))) for query in _queries(worker)]
+
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        results = [item for items in executor.map(work, range(THREADS)) for item in items]
+
+    assert len(results) == THREADS * ROUNDS * len(QUERIES)
+    for query, statement in results:
+        assert statement == expected[query], query
+
+
+def test_shared_builder_templates_from_threads(expected):
+    builder = SQLAlchemyQueryBuilder(User, template_cache_size=2)
+    barrier = Barrier(THREADS)
+
+    def work(worker):
+        # A tiny cache keeps evicting templates, so threads keep compiling them at once
+        barrier.wait()
+        return [(query, _compile(builder.build_query(query))) for query in _queries(worker)]
+
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        results = [item for items in executor.map(work, range(THREADS)) for item in items]
+
+    for query, statement in results:
+        assert statement == expected[query], query
+
+
+async def test_shared_rules_from_tasks(expected):
+    class OffloadedUserRules(UserRules):
+        __async_threshold__ = 40
+
+    rules = OffloadedUserRules()
+    queries = [query for worker in range(THREADS) for query in _queries(worker)]
+
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        statements = await asyncio.gather(
+            *(rules.abuild_query(query, executor=executor) for query in queries)
+        )
+
+    for query, statement in zip(queries, statements, strict=True):
+        assert _compile(statement) == expected[query], query
+
+
+def test_build_context_outside_of_a_build():
+    with pytest.raises(LookupError):
+        _ = SQLAlchemyQueryBuilder(User).context
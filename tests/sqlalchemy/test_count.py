@@ -0,0 +1,295 @@
+import json
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.pool import StaticPool
+
+from requela.builders.sqlalchemy import Explain, SQLAlchemyQueryBuilder
+from requela.cache import TTLCache
+from requela.exceptions import QueryCostError, RequelaError
+from tests.sqlalchemy.models import Account, Base, User, UserRole
+from tests.sqlalchemy.rules import UserRules
+from tests.sqlalchemy.test_pagination import _add_rows
+from tests.sqlalchemy.utils import assert_statements_equal
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        _add_rows(session)
+        yield session
+
+
+class PlannerSession:
+    """A session of a PostgreSQL database whose planner estimates `plan_rows` rows"""
+
+    def __init__(self, plan_rows, total):
+        self.plan_rows = plan_rows
+        self.total = total
+        self.statements = []
+
+    def get_bind(self):
+        return SimpleNamespace(dialect=postgresql.dialect())
+
+    def scalar(self, statement):
+        self.statements.append(statement)
+        if isinstance(statement, Explain):
+            return json.dumps([{"Plan": {"Plan Rows": self.plan_rows}}])
+        return self.total
+
+
+class AsyncPlannerSession(PlannerSession):
+    async def scalar(self, statement):
+        self.statements.append(statement)
+        if isinstance(statement, Explain):
+            # Depending on the driver, the plan comes as text or already decoded
+            return [{"Plan": {"Plan Rows": self.plan_rows}}]
+        return self.total
+
+
+def _add_user(session, user_id, name):
+    session.add(
+        User(
+            id=user_id,
+            name=name,
+            age=30,
+            role=UserRole.USER,
+            is_active=True,
+            birth_date=date(2000, 1, 1),
+            account_id=1,
+        )
+    )
+    session.commit()
+
+
+def test_build_count_query():
+    builder = SQLAlchemyQueryBuilder(User)
+
+    count_query = builder.build_count_query(
+        "eq(account.name,Acme)&gt(age,20)&order_by(account.tenant.name,-age)&limit(10)"
+    )
+
+    account = aliased(Account)
+    expected = (
+        select(func.count())
+        .select_from(User)
+        .join(account, User.account)
+        .filter(account.name == "Acme")
+        .filter(User.age > 20)
+    )
+    assert_statements_equal(count_query, expected)
+
+
+def test_build_count_query_without_sort_only_joins():
+    builder = SQLAlchemyQueryBuilder(User)
+
+    count_query = builder.build_count_query("eq(name,John)&order_by(account.name)&select(account)")
+
+    assert_statements_equal(
+        count_query, select(func.count()).select_from(User).filter(User.name == "John")
+    )
+
+
+def test_build_query_and_count():
+    builder = SQLAlchemyQueryBuilder(User)
+
+    query, count_query = builder.build_query_and_count("eq(name,John)&order_by(account.name)")
+
+    account = aliased(Account)
+    assert_statements_equal(
+        query,
+        select(User).join(account, User.account).filter(User.name == "John").order_by(account.name),
+    )
+    assert_statements_equal(
+        count_query, select(func.count()).select_from(User).filter(User.name == "John")
+    )
+
+
+def test_count_templates_are_shared():
+    builder = SQLAlchemyQueryBuilder(User)
+
+    builder.build_count_query("eq(name,John)&order_by(name)")
+    builder.build_count_query("eq(name,Jane)&order_by(-account.name)&limit(5)")
+    builder.build_count_query("eq(name,Bob)")
+
+    assert builder.templates.stats().misses == 1
+
+
+def test_count_with_initial_query():
+    builder = SQLAlchemyQueryBuilder(User)
+
+    count_query = builder.build_count_query(
+        "eq(name,John)&order_by(age)", initial_query=select(User).filter(User.is_active.is_(True))
+    )
+
+    expected = (
+        select(func.count())
+        .select_from(User)
+        .filter(User.is_active.is_(True))
+        .filter(User.name == "John")
+    )
+    assert_statements_equal(count_query, expected)
+
+
+def test_count_over_budget():
+    builder = SQLAlchemyQueryBuilder(User)
+
+    with pytest.raises(QueryCostError):
+        builder.build_count_query("eq(account.name,Acme)", max_cost=5)
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        ("ne(name,Nobody)", 7),
+        ("eq(account.name,Acme)&order_by(-name)", 3),
+        ("eq(account.name,Acme)&limit(1)", 3),
+        ("gt(age,25)&select(account)", 5),
+        ("eq(name,Nobody)", 0),
+    ],
+)
+def test_count(session, query, expected):
+    assert SQLAlchemyQueryBuilder(User).count(query, session=session) == expected
+
+
+def test_count_totals_are_cached(session):
+    builder = SQLAlchemyQueryBuilder(User, totals=TTLCache(ttl=60))
+    assert builder.count("eq(account.name,Acme)", session=session) == 3
+
+    _add_user(session, 8, "Oscar")
+
+    assert builder.count("eq(account.name,Acme)&order_by(name)&limit(2)", session=session) == 3
+    assert builder.count("eq(account.name,Acme)", session=session, approximate=True) == 4
+    assert builder.count("eq(account.id,1)", session=session) == 4
+
+
+def test_count_totals_of_initial_queries_are_cached_by_scope(session):
+    builder = SQLAlchemyQueryBuilder(User, totals=TTLCache(ttl=60))
+    initial_query = select(User).filter(User.account_id == 1)
+    builder.count("gt(age,25)", session=session, initial_query=initial_query)
+    builder.count("gt(age,25)", session=session, initial_query=initial_query, scope=1)
+
+    _add_user(session, 8, "Oscar")
+
+    assert builder.count("gt(age,25)", session=session, initial_query=initial_query) == 3
+    assert builder.count("gt(age,25)", session=session, initial_query=initial_query, scope=1) == 2
+    assert builder.count("gt(age,25)", session=session) == 6
+
+
+def test_count_totals_are_not_cached_without_cache(session):
+    builder = SQLAlchemyQueryBuilder(User)
+    builder.count("gt(age,25)", session=session)
+
+    _add_user(session, 8, "Oscar")
+
+    assert builder.count("gt(age,25)", session=session) == 6
+
+
+def test_count_approximate_without_estimate(session):
+    builder = SQLAlchemyQueryBuilder(User, approximate_count_threshold=1)
+
+    assert builder.count("gt(age,25)", session=session, approximate=True) == 5
+
+
+@pytest.mark.parametrize(("plan_rows", "expected"), [(250_000, 250_000), (50, 7)])
+def test_count_approximate(plan_rows, expected):
+    session = PlannerSession(plan_rows, total=7)
+
+    total = SQLAlchemyQueryBuilder(User).count("gt(age,25)", session=session, approximate=True)
+
+    assert total == expected
+    explain = session.statements[0].compile(dialect=postgresql.dialect())
+    assert str(explain).startswith("EXPLAIN (FORMAT JSON) SELECT users.id")
+    assert len(session.statements) == (1 if expected == plan_rows else 2)
+
+
+@pytest.mark.parametrize(("plan_rows", "expected"), [(250_000, 250_000), (50, 7)])
+async def test_acount_approximate(plan_rows, expected):
+    session = AsyncPlannerSession(plan_rows, total=7)
+
+    total = await UserRules().acount("eq(name,John)", session=session, approximate=True)
+
+    assert total == expected
+
+
+async def test_acount():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine) as session:
+        await session.run_sync(_add_rows)
+        builder = SQLAlchemyQueryBuilder(User, totals=TTLCache(ttl=60))
+
+        total = await builder.acount("eq(account.name,Acme)", session=session, approximate=True)
+        await session.run_sync(_add_user, 8, "Oscar")
+        cached = await builder.acount("eq(account.name,Acme)", session=session, approximate=True)
+
+    await engine.dispose()
+    assert total == cached == 3
+
+
+@pytest.mark.parametrize("approximate", [False, True])
+def test_count_without_session(approximate):
+    with pytest.raises(ValueError, match="A Session is required"):
+        SQLAlchemyQueryBuilder(User).count("eq(name,John)", approximate=approximate)
+
+
+@pytest.mark.parametrize("approximate", [False, True])
+async def test_acount_without_session(approximate):
+    with pytest.raises(RequelaError, match="An AsyncSession is required"):
+        await UserRules().acount("eq(name,John)", approximate=approximate)
+
+
+def test_rules_count(session):
+    rules = UserRules()
+
+    assert rules.count("eq(account.name,Acme)&order_by(name)", session=session) == 3
+    assert_statements_equal(
+        rules.build_count_query("eq(name,John)"),
+        select(func.count()).select_from(User).filter(User.name == "John"),
+    )
+    query, count_query = rules.build_query_and_count("eq(name,John)&limit(5)")
+    assert_statements_equal(query, select(User).filter(User.name == "John").limit(5))
+    assert_statements_equal(count_query, rules.build_count_query("eq(name,John)"))
+
+
+@pytest.mark.parametrize(
+    "count",
+    [
+        lambda rules: rules.count("eq(age,30)"),
+        lambda rules: rules.build_count_query("eq(age,30)"),
+        lambda rules: rules.build_query_and_count("eq(age,30)"),
+    ],
+)
+def test_rules_count_invalid_field(count):
+    with pytest.raises(RequelaError, match="Relation with alias 'age' not found"):
+        count(UserRules())
+
+
+def test_rules_count_errors_are_not_wrapped_twice():
+    with pytest.raises(QueryCostError):
+        UserRules().build_count_query("eq(account.name,Acme)", max_cost=0)
+    with pytest.raises(QueryCostError):
+        UserRules().build_query_and_count("eq(account.name,Acme)", max_cost=0)
+    with pytest.raises(QueryCostError):
+        UserRules().count("eq(account.name,Acme)", max_cost=0)
+
+
+def test_rules_count_ttl():
+    class CachedUserRules(UserRules):
+        __count_ttl__ = 30
+
+    assert UserRules().builder.totals is None
+    assert CachedUserRules().builder.totals.ttl == 30
+
+
+async def test_rules_acount_over_budget():
+    with pytest.raises(QueryCostError):
+        await UserRules().acount("eq(account.name,Acme)", max_cost=0)
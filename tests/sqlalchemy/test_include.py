@@ -0,0 +1,168 @@
+import pytest
+from sqlalchemy import create_engine, event, inspect, select
+from sqlalchemy.orm import Session, aliased, contains_eager, joinedload, selectinload
+from sqlalchemy.pool import StaticPool
+
+from requela.builders.sqlalchemy import SQLAlchemyQueryBuilder
+from requela.exceptions import RequelaError
+from requela.rules import FieldRule, ModelRQLRules, RelationshipRule
+from tests.sqlalchemy.models import Account, Base, Tenant, User
+from tests.sqlalchemy.rules import AccountRules, UserRules
+from tests.sqlalchemy.test_pagination import _add_rows
+from tests.sqlalchemy.utils import assert_statements_equal
+
+
+class EagerUserRules(UserRules):
+    __eager_joins__ = True
+
+
+class RestrictedUserRules(ModelRQLRules):
+    __model__ = User
+
+    name = FieldRule()
+    account = RelationshipRule(rules=AccountRules(), allow_include=False)
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        _add_rows(session)
+        session.expunge_all()
+        yield session
+
+
+def _count_statements(session):
+    statements = []
+    event.listen(
+        session.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2])
+    )
+    return statements
+
+
+def test_include():
+    builder = SQLAlchemyQueryBuilder(User)
+    stmt = builder.build_query("eq(name,John)&include(account,groups,account.tenant)")
+    expected = (
+        select(User)
+        .filter(User.name == "John")
+        .options(
+            joinedload(User.account),
+            selectinload(User.groups),
+            joinedload(User.account).joinedload(Account.tenant),
+        )
+    )
+    assert_statements_equal(stmt, expected)
+
+
+def test_include_many_rows_through_relationship():
+    builder = SQLAlchemyQueryBuilder(User)
+    stmt = builder.build_query("include(account.contracts,account.contracts)")
+    expected = select(User).options(joinedload(User.account).selectinload(Account.contracts))
+    assert_statements_equal(stmt, expected)
+
+
+def test_include_field():
+    with pytest.raises(ValueError, match="Only relationships can be included, not 'name'."):
+        SQLAlchemyQueryBuilder(User).build_query("include(account,name)")
+
+
+def test_eager_joins():
+    builder = SQLAlchemyQueryBuilder(User, eager_joins=True)
+    stmt = builder.build_query("eq(account.name,Acme)&order_by(account.tenant.name)")
+
+    account, tenant = aliased(Account), aliased(Tenant)
+    expected = (
+        select(User)
+        .join(account, User.account)
+        .outerjoin(tenant, account.tenant)
+        .filter(account.name == "Acme")
+        .order_by(tenant.name)
+        .options(
+            contains_eager(User.account.of_type(account)),
+            contains_eager(User.account.of_type(account)).contains_eager(
+                account.tenant.of_type(tenant)
+            ),
+        )
+    )
+    assert_statements_equal(stmt, expected)
+
+
+def test_eager_joins_are_shared_with_projection():
+    builder = SQLAlchemyQueryBuilder(User, eager_joins=True)
+    stmt = builder.build_query(
+        "eq(account.name,Acme)&select(+account.description)&include(account.tenant)"
+    )
+
+    account = aliased(Account)
+    expected = (
+        select(User)
+        .join(account, User.account)
+        .filter(account.name == "Acme")
+        .options(
+            contains_eager(User.account.of_type(account)),
+            contains_eager(User.account.of_type(account)).load_only(account.description),
+            contains_eager(User.account.of_type(account)).joinedload(account.tenant),
+        )
+    )
+    assert_statements_equal(stmt, expected)
+
+
+def test_eager_joins_without_joins():
+    builder = SQLAlchemyQueryBuilder(User, eager_joins=True)
+
+    assert_statements_equal(
+        builder.build_query("eq(name,John)"), select(User).filter(User.name == "John")
+    )
+
+
+def test_include_loads_related_rows(session):
+    statements = _count_statements(session)
+    query = SQLAlchemyQueryBuilder(User).build_query("gt(age,25)&include(account.contracts,groups)")
+
+    users = session.scalars(query).all()
+
+    assert len(users) == 5
+    assert all(inspect(user).unloaded == set() for user in users)
+    assert {len(user.account.contracts) for user in users} == {0, 2}
+    # The users with their accounts, then their groups and the contracts of their accounts
+    assert len(statements) == 3
+
+
+def test_eager_joins_load_related_rows(session):
+    statements = _count_statements(session)
+    builder = SQLAlchemyQueryBuilder(User, eager_joins=True)
+
+    users = session.scalars(builder.build_query("eq(account.name,Acme)")).all()
+    page = builder.paginate("order_by(account.name,name)", 2, session=session)
+
+    assert [user.account.name for user in users] == ["Acme"] * 3
+    assert [(user.name, user.account.name) for user in page.items] == [
+        ("Bob", "Acme"),
+        ("Eve", "Acme"),
+    ]
+    assert len(statements) == 2
+    assert builder.count("eq(account.name,Acme)", session=session) == 3
+
+
+def test_rules_include():
+    assert_statements_equal(
+        UserRules().build_query("include(account.events.created.by)"),
+        select(User).options(joinedload(User.account).joinedload(Account.created_by)),
+    )
+    assert EagerUserRules().builder.eager_joins
+    assert not UserRules().builder.eager_joins
+
+
+@pytest.mark.parametrize(
+    ("rules", "query", "message"),
+    [
+        (UserRules(), "include(name)", "Include 'name' is not allowed."),
+        (RestrictedUserRules(), "include(account)", "Include 'account' is not allowed."),
+        (UserRules(), "include(groups)", "Relation with alias 'groups' not found"),
+    ],
+)
+def test_rules_invalid_include(rules, query, message):
+    with pytest.raises(RequelaError, match=message):
+        rules.build_query(query)
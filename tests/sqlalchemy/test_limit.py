@@ -0,0 +1,72 @@
+import pytest
+from sqlalchemy import select
+
+from requela.builders.sqlalchemy import SQLAlchemyQueryBuilder
+from requela.dataclasses import QueryLimits
+from requela.parser import QueryLimitError
+from tests.sqlalchemy.models import User
+from tests.sqlalchemy.utils import assert_statements_equal
+
+
+def test_limit():
+    builder = SQLAlchemyQueryBuilder(User)
+    stmt = builder.build_query("eq(age,30)&order_by(name)&limit(10)")
+    expected = select(User).filter(User.age == 30).order_by(User.name).limit(10)
+    assert_statements_equal(stmt, expected)
+
+
+def test_limit_with_offset():
+    builder = SQLAlchemyQueryBuilder(User)
+    stmt = builder.build_query("limit(10,20)&order_by(name)")
+    expected = select(User).order_by(User.name).limit(10).offset(20)
+    assert_statements_equal(stmt, expected)
+
+
+def test_limits_share_template():
+    builder = SQLAlchemyQueryBuilder(User)
+    builder.build_query("eq(age,30)&limit(10)")
+    stmt = builder.build_query("eq(age,40)&limit(5,5)")
+
+    assert_statements_equal(stmt, select(User).filter(User.age == 40).limit(5).offset(5))
+    assert builder.templates.stats().misses == 1
+
+
+@pytest.mark.parametrize(
+    ("limits", "expected"),
+    [
+        (QueryLimits(default_limit=50), 50),
+        (QueryLimits(max_limit=100), 100),
+        (QueryLimits(default_limit=50, max_limit=100), 50),
+        (QueryLimits(default_limit=500, max_limit=100), 100),
+    ],
+)
+def test_default_limit(limits, expected):
+    builder = SQLAlchemyQueryBuilder(User, limits=limits)
+    stmt = builder.build_query("eq(age,30)")
+    assert_statements_equal(stmt, select(User).filter(User.age == 30).limit(expected))
+
+
+def test_limit_overrides_default_limit():
+    builder = SQLAlchemyQueryBuilder(User, limits=QueryLimits(default_limit=50, max_limit=100))
+    stmt = builder.build_query("eq(age,30)&limit(80)")
+    assert_statements_equal(stmt, select(User).filter(User.age == 30).limit(80))
+
+
+def test_limit_over_max_limit():
+    builder = SQLAlchemyQueryBuilder(User, limits=QueryLimits(max_limit=100))
+    with pytest.raises(QueryLimitError, match="Query exceeds the maximum limit of 100."):
+        builder.build_query("eq(age,30)&limit(101)")
+
+
+@pytest.mark.parametrize(
+    ("limits", "query", "unbounded"),
+    [
+        (QueryLimits(), "order_by(name)", True),
+        (QueryLimits(), "order_by(name)&limit(10)", False),
+        (QueryLimits(default_limit=50), "order_by(name)", False),
+        (QueryLimits(max_limit=100), "order_by(name)", False),
+    ],
+)
+def test_limited_queries_are_bounded(limits, query, unbounded):
+    builder = SQLAlchemyQueryBuilder(User, limits=limits)
+    assert builder.estimate_cost(query).unbounded is unbounded
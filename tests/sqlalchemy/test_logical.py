@@ -2,6 +2,7 @@ import pytest
 from sqlalchemy import and_, or_, select
 
 from requela.builders.sqlalchemy import SQLAlchemyQueryBuilder
+from requela.dataclasses import NO_QUERY_LIMITS
 from tests.sqlalchemy.models import User
 from tests.sqlalchemy.utils import assert_statements_equal
 
@@ -76,3 +77,18 @@ def test_nested_logical_with_not():
             )
         ),
     )
+
+
+def test_deeply_nested_query():
+    builder = SQLAlchemyQueryBuilder(User, limits=NO_QUERY_LIMITS)
+    stmt = builder.build_query("and(eq(name,John)," * 1000 + "eq(age,30)" + ")" * 1000)
+    conditions = stmt.whereclause.clauses
+    assert len(conditions) == 1001
+    assert str(conditions[0].compile()) == str((User.name == "John").compile())
+    assert str(conditions[-1].compile()) == str((User.age == 30).compile())
+
+
+def test_deeply_nested_query_optimized():
+    builder = SQLAlchemyQueryBuilder(User, limits=NO_QUERY_LIMITS, optimize_filters=True)
+    stmt = builder.build_query("and(eq(name,John)," * 1000 + "eq(age,30)" + ")" * 1000)
+    assert_statements_equal(stmt, select(User).filter(and_(User.name == "John", User.age == 30)))
@@ -0,0 +1,173 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import and_, create_engine, false, or_, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from requela.builders.sqlalchemy import SQLAlchemyQueryBuilder
+from requela.dataclasses import Operator, Page
+from requela.rules import FieldRule
+from tests.sqlalchemy.models import Account, Base, User
+from tests.sqlalchemy.rules import UserRules
+from tests.sqlalchemy.test_pagination import _add_rows
+from tests.sqlalchemy.utils import assert_statements_equal
+
+CONTRADICTION = "and(eq(age,30),eq(age,40))"
+
+
+class OptimizedUserRules(UserRules):
+    __optimize_filters__ = True
+
+
+class EqualNameUserRules(OptimizedUserRules):
+    name = FieldRule(allowed_operators=[Operator.EQ])
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        _add_rows(session)
+        yield session
+
+
+@pytest.mark.parametrize(
+    ("query", "condition"),
+    [
+        ("or(eq(name,John),eq(name,Jane))", User.name.in_(["John", "Jane"])),
+        ("not(not(eq(name,John)))&eq(name,John)", User.name == "John"),
+        ("not(or(eq(name,John),gt(age,30)))", ~(User.name == "John") & ~(User.age > 30)),
+        (CONTRADICTION, false()),
+    ],
+)
+def test_build_optimized_query(query, condition):
+    builder = SQLAlchemyQueryBuilder(User, optimize_filters=True)
+
+    assert_statements_equal(builder.build_query(query), select(User).filter(condition))
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        ("or(eq(name,John),and(eq(name,Bob),eq(name,Bob)),eq(name,Eve))", ["Bob", "Eve", "John"]),
+        ("and(eq(name,John),or(eq(name,John),eq(is_active,true)))", ["John"]),
+        ("eq(name,John)&or(eq(name,John),eq(is_active,true))", ["John"]),
+    ],
+)
+def test_optimized_query_selects_the_same_rows(session, query, expected):
+    optimized = SQLAlchemyQueryBuilder(User, optimize_filters=True).build_query(query)
+    original = SQLAlchemyQueryBuilder(User).build_query(query)
+
+    names = sorted(user.name for user in session.scalars(optimized))
+
+    assert names == sorted(user.name for user in session.scalars(original))
+    assert names == expected
+
+
+@pytest.mark.parametrize(
+    "query", ["not(and(eq(email,a),ne(email,a)))", "not(and(eq(email,null()),eq(email,a)))"]
+)
+def test_negated_contradiction_selects_the_same_rows(session, query):
+    # The users whose email is null satisfy neither the contradiction nor its negation
+    session.get(User, 2).email = "b"
+    session.commit()
+
+    optimized = SQLAlchemyQueryBuilder(User, optimize_filters=True).build_query(query)
+    original = SQLAlchemyQueryBuilder(User).build_query(query)
+
+    ids = sorted(user.id for user in session.scalars(optimized))
+
+    assert ids == sorted(user.id for user in session.scalars(original))
+    assert ids == [2]
+
+
+def test_contradiction_selects_no_row(session):
+    builder = SQLAlchemyQueryBuilder(User, optimize_filters=True)
+
+    assert session.scalars(builder.build_query(CONTRADICTION)).all() == []
+    assert session.scalar(builder.build_count_query(CONTRADICTION)) == 0
+
+
+async def test_contradiction_is_not_run():
+    # Without a session, running any query would fail
+    builder = SQLAlchemyQueryBuilder(User, optimize_filters=True)
+
+    assert builder.count(CONTRADICTION) == 0
+    assert await builder.acount(CONTRADICTION) == 0
+    assert builder.paginate(f"{CONTRADICTION}&order_by(name)", 5) == Page(items=[])
+    assert await builder.apaginate(CONTRADICTION, 5) == Page(items=[])
+
+
+def test_contradiction_cost():
+    builder = SQLAlchemyQueryBuilder(User, optimize_filters=True)
+
+    cost = builder.estimate_cost(f"and(eq(account.name,Acme),{CONTRADICTION})")
+
+    assert cost.joins == 0
+    assert not cost.unbounded
+
+
+def test_build_many_optimized():
+    builder = SQLAlchemyQueryBuilder(User, optimize_filters=True)
+
+    (result,) = builder.build_many(["or(eq(name,John),eq(name,Jane))"])
+
+    assert_statements_equal(result.query, select(User).filter(User.name.in_(["John", "Jane"])))
+
+
+def test_optimization_is_opt_in():
+    query = "or(eq(name,John),eq(name,Jane))"
+    expected = select(User).filter(or_(User.name == "John", User.name == "Jane"))
+
+    assert_statements_equal(SQLAlchemyQueryBuilder(User).build_query(query), expected)
+    assert_statements_equal(UserRules().build_query(query), expected)
+    assert not UserRules().builder.optimize_filters
+    assert OptimizedUserRules().builder.optimize_filters
+
+
+def test_rules_fold_allowed_in():
+    query = "or(eq(name,John),eq(name,Jane))"
+
+    assert_statements_equal(
+        OptimizedUserRules().build_query(query),
+        select(User).filter(User.name.in_(["John", "Jane"])),
+    )
+    assert_statements_equal(
+        EqualNameUserRules().build_query(query),
+        select(User).filter(or_(User.name == "John", User.name == "Jane")),
+    )
+
+
+def test_days_are_not_folded_with_sargable_rewrites():
+    builder = SQLAlchemyQueryBuilder(Account, optimize_filters=True, sargable_rewrites=True)
+
+    stmt = builder.build_query("or(eq(created_at,2024-01-01),eq(created_at,2024-01-02))")
+
+    days = [datetime(2024, 1, day) for day in (1, 2, 3)]
+    assert_statements_equal(
+        stmt,
+        select(Account).filter(
+            or_(
+                and_(Account.created_at >= days[0], Account.created_at < days[1]),
+                and_(Account.created_at >= days[1], Account.created_at < days[2]),
+            )
+        ),
+    )
+
+
+def test_days_select_the_same_rows_with_sargable_rewrites(session):
+    session.get(Account, 2).created_at = datetime(2024, 1, 2, 10)
+    session.commit()
+    query = "or(eq(created_at,2024-01-01),eq(created_at,2024-01-02))"
+
+    optimized = SQLAlchemyQueryBuilder(
+        Account, optimize_filters=True, sargable_rewrites=True
+    ).build_query(query)
+    original = SQLAlchemyQueryBuilder(Account, sargable_rewrites=True).build_query(query)
+
+    ids = sorted(account.id for account in session.scalars(optimized))
+
+    assert ids == sorted(account.id for account in session.scalars(original))
+    assert ids == [1, 2, 3]
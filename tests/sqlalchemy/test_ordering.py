@@ -1,6 +1,7 @@
 from sqlalchemy import select
 
 from requela.builders.sqlalchemy import SQLAlchemyQueryBuilder
+from requela.dataclasses import OrderByExpression, OrderField
 from tests.sqlalchemy.models import User
 from tests.sqlalchemy.utils import assert_statements_equal
 
@@ -43,3 +44,13 @@ def test_order_by_with_filter():
     stmt = builder.build_query(query_string)
     expected = select(User).filter(User.age == 30).order_by(User.name)
     assert_statements_equal(stmt, expected)
+
+
+def test_apply_order_by():
+    builder = SQLAlchemyQueryBuilder(User)
+    stmt = builder.apply_order_by(
+        select(User),
+        OrderByExpression(fields=[OrderField(direction="-", field_path="age")]),
+    )
+    expected = select(User).order_by(User.age.desc())
+    assert_statements_equal(stmt, expected)
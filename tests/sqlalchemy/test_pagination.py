@@ -0,0 +1,307 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import bindparam, create_engine, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.pool import StaticPool
+
+from requela.builders.sqlalchemy import SQLAlchemyQueryBuilder
+from requela.dataclasses import QueryLimits
+from requela.exceptions import InvalidCursorError, QueryCostError, RequelaError
+from requela.pagination import encode_cursor
+from requela.parser import QueryLimitError
+from tests.sqlalchemy.models import Account, AccountStatus, Base, Contract, User, UserRole
+from tests.sqlalchemy.rules import UserRules
+from tests.sqlalchemy.utils import assert_statements_equal
+
+USERS = [
+    # id, name, age, account id
+    (1, "John", 30, 1),
+    (2, "Jane", 25, 2),
+    (3, "Bob", 40, 1),
+    (4, "Alice", 30, 3),
+    (5, "Eve", 25, 1),
+    (6, "Mallory", 30, 2),
+    (7, "Trent", 40, 3),
+]
+ACCOUNTS = [(1, "Acme", "Main"), (2, "Globex", None), (3, "Initech", "Other")]
+
+
+def _add_rows(session):
+    session.add_all(
+        [
+            Account(
+                id=account_id,
+                name=name,
+                description=description,
+                status=AccountStatus.ACTIVE,
+                balance=0,
+                created_at=datetime(2024, 1, 1),
+                created_by_id=1,
+                datasource_id=name,
+            )
+            for account_id, name, description in ACCOUNTS
+        ]
+        + [
+            User(
+                id=user_id,
+                name=name,
+                age=age,
+                role=UserRole.USER,
+                is_active=True,
+                birth_date=date(2000, 1, 1),
+                account_id=account_id,
+            )
+            for user_id, name, age, account_id in USERS
+        ]
+        + [
+            Contract(account_id=account_id, number=f"C-{number}")
+            for account_id, number in [(1, 2), (2, 1), (1, 1), (2, 2)]
+        ]
+    )
+    session.commit()
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        _add_rows(session)
+        yield session
+
+
+def _all_pages(builder, session, query, page_size):
+    pages = []
+    cursor = None
+    while True:
+        page = builder.paginate(query, page_size, cursor=cursor, session=session)
+        pages.append([user.id for user in page.items])
+        cursor = page.next_cursor
+        if cursor is None:
+            return pages
+
+
+def test_build_page_query():
+    builder = SQLAlchemyQueryBuilder(User)
+
+    page_query = builder.build_page_query("eq(is_active,true)&order_by(account.name,age)", 10)
+
+    account = aliased(Account)
+    expected = (
+        select(User, account.name, User.age, User.id)
+        .join(account, User.account)
+        .filter(User.is_active.is_(True))
+        .order_by(account.name.asc(), User.age.asc(), User.id.asc())
+        .limit(11)
+    )
+    assert_statements_equal(page_query.query, expected)
+    assert page_query.page_size == 10
+
+
+def test_build_page_query_after_cursor_compares_row_values():
+    builder = SQLAlchemyQueryBuilder(User)
+    query = "eq(is_active,true)&order_by(-account.name,-age)"
+    keyset = builder.build_page_query(query, 10).keyset
+
+    page_query = builder.build_page_query(query, 10, encode_cursor(keyset, ("Acme", 30, 5)))
+
+    account = aliased(Account)
+    expected = (
+        select(User, account.name, User.age, User.id)
+        .join(account, User.account)
+        .filter(User.is_active.is_(True))
+        .order_by(account.name.desc(), User.age.desc(), User.id.desc())
+        .filter(
+            tuple_(account.name, User.age, User.id)
+            < tuple_(bindparam("name_2", "Acme"), bindparam("age_1", 30), bindparam("id_1", 5))
+        )
+        .limit(11)
+    )
+    assert_statements_equal(page_query.query, expected)
+
+
+def test_build_page_query_after_cursor_with_mixed_directions():
+    builder = SQLAlchemyQueryBuilder(User)
+    keyset = builder.build_page_query("order_by(-age,id)", 10).keyset
+
+    page_query = builder.build_page_query("order_by(-age,id)", 10, encode_cursor(keyset, (30, 5)))
+
+    age = bindparam("age_1", 30)
+    expected = (
+        select(User, User.age, User.id)
+        .order_by(User.age.desc(), User.id.asc())
+        .filter((User.age < age) | ((User.age == age) & (User.id > 5)))
+        .limit(11)
+    )
+    assert_statements_equal(page_query.query, expected)
+
+
+@pytest.mark.parametrize(
+    ("cursor_keys", "condition"),
+    [
+        (
+            ("Main", 5),
+            lambda account: (
+                (account.description > bindparam("description_1", "Main"))
+                | account.description.is_(None)
+                | ((account.description == bindparam("description_1", "Main")) & (User.id > 5))
+            ),
+        ),
+        (
+            (None, 5),
+            lambda account: account.description.is_(None) & (User.id > 5),
+        ),
+    ],
+)
+def test_build_page_query_after_cursor_with_nullable_key(cursor_keys, condition):
+    builder = SQLAlchemyQueryBuilder(User)
+    keyset = builder.build_page_query("order_by(account.description)", 10).keyset
+
+    page_query = builder.build_page_query(
+        "order_by(account.description)", 10, encode_cursor(keyset, cursor_keys)
+    )
+
+    account = aliased(Account)
+    expected = (
+        select(User, account.description, User.id)
+        .join(account, User.account)
+        .order_by(account.description.asc().nulls_last(), User.id.asc())
+        .filter(condition(account))
+        .limit(11)
+    )
+    assert_statements_equal(page_query.query, expected)
+
+
+def test_page_templates_are_cached():
+    builder = SQLAlchemyQueryBuilder(User)
+    keyset = builder.build_page_query("eq(name,John)&order_by(age)", 10).keyset
+    for name, age, user_id in [("John", 30, 1), ("Jane", 25, 2)]:
+        builder.build_page_query(
+            f"eq(name,{name})&order_by(age)", 10, encode_cursor(keyset, (age, user_id))
+        )
+    builder.build_query("eq(name,John)&order_by(age)")
+
+    assert builder.templates.stats().misses == 3
+    assert builder.templates.stats().size == 3
+
+
+@pytest.mark.parametrize(
+    ("query", "page_size", "expected"),
+    [
+        ("order_by(name)", 3, [[4, 3, 5], [2, 1, 6], [7]]),
+        ("order_by(-age)", 3, [[7, 3, 6], [4, 1, 5], [2]]),
+        ("order_by(age,-account.name)", 2, [[2, 5], [4, 6], [1, 7], [3]]),
+        ("order_by(-account.description,name)", 2, [[4, 7], [3, 5], [1, 2], [6]]),
+        ("gt(age,25)&order_by(account.name,-age)", 4, [[3, 1, 6, 7], [4]]),
+        ("eq(name,Nobody)", 5, [[]]),
+        ("eq(account.name,Acme)", 3, [[1, 3, 5]]),
+    ],
+)
+def test_paginate(session, query, page_size, expected):
+    builder = SQLAlchemyQueryBuilder(User)
+
+    assert _all_pages(builder, session, query, page_size) == expected
+
+
+def test_paginate_composite_primary_key(session):
+    builder = SQLAlchemyQueryBuilder(Contract)
+
+    first = builder.paginate("order_by(-number)", 3, session=session)
+    second = builder.paginate("order_by(-number)", 3, cursor=first.next_cursor, session=session)
+
+    assert [(contract.number, contract.account_id) for contract in first.items] == [
+        ("C-2", 2),
+        ("C-2", 1),
+        ("C-1", 2),
+    ]
+    assert [(contract.number, contract.account_id) for contract in second.items] == [("C-1", 1)]
+    assert second.next_cursor is None
+
+
+def test_paginate_cursor_of_other_order(session):
+    builder = SQLAlchemyQueryBuilder(User)
+    page = builder.paginate("order_by(name)", 2, session=session)
+
+    with pytest.raises(InvalidCursorError):
+        builder.paginate("order_by(-name)", 2, cursor=page.next_cursor, session=session)
+
+
+def test_paginate_invalid_page_size():
+    with pytest.raises(ValueError, match="The page size must be greater than zero."):
+        SQLAlchemyQueryBuilder(User).build_page_query("order_by(name)", 0)
+
+
+def test_paginate_without_session():
+    with pytest.raises(ValueError, match="A Session is required"):
+        SQLAlchemyQueryBuilder(User).paginate("order_by(name)", 2)
+
+
+def test_paginate_over_budget():
+    builder = SQLAlchemyQueryBuilder(User)
+
+    with pytest.raises(QueryCostError):
+        builder.build_page_query("eq(account.name,Acme)", 2, max_cost=5)
+
+
+def test_rules_paginate(session):
+    rules = UserRules()
+
+    page = rules.paginate("order_by(-events.born.at,name)", 4, session=session)
+
+    assert [user.name for user in page.items] == ["Alice", "Bob", "Eve", "Jane"]
+    with pytest.raises(RequelaError, match="Invalid pagination cursor."):
+        rules.paginate("order_by(name)", 4, cursor=page.next_cursor, session=session)
+    with pytest.raises(RequelaError, match="Relation with alias 'age' not found"):
+        rules.paginate("order_by(age)", 4, session=session)
+
+
+async def test_apaginate():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine) as session:
+        await session.run_sync(_add_rows)
+        rules = UserRules()
+
+        first = await rules.apaginate("order_by(account.name,name)", 4, session=session)
+        second = await rules.apaginate(
+            "order_by(account.name,name)", 4, cursor=first.next_cursor, session=session
+        )
+
+    await engine.dispose()
+    assert [user.id for user in first.items] == [3, 5, 1, 2]
+    assert [user.id for user in second.items] == [6, 4, 7]
+    assert second.next_cursor is None
+
+
+async def test_apaginate_without_session():
+    with pytest.raises(RequelaError, match="An AsyncSession is required"):
+        await UserRules().apaginate("order_by(name)", 2)
+
+
+async def test_apaginate_invalid_cursor():
+    with pytest.raises(InvalidCursorError):
+        await UserRules().apaginate("order_by(name)", 2, cursor="not a cursor")
+
+
+def test_paginate_with_limit():
+    with pytest.raises(ValueError, match="Paginated queries cannot have a limit()"):
+        SQLAlchemyQueryBuilder(User).build_page_query("order_by(name)&limit(5)", 2)
+
+
+def test_paginate_page_size_over_max_limit():
+    builder = SQLAlchemyQueryBuilder(User, limits=QueryLimits(max_limit=10))
+
+    with pytest.raises(QueryLimitError, match="The page size exceeds the maximum limit of 10."):
+        builder.build_page_query("order_by(name)", 11)
+    assert builder.build_page_query("order_by(name)", 10).page_size == 10
+
+
+def test_page_queries_are_bounded():
+    builder = SQLAlchemyQueryBuilder(User)
+
+    with pytest.raises(QueryCostError):
+        builder.build_query("order_by(name)", max_cost=0)
+    assert builder.build_page_query("order_by(name)", 2, max_cost=0).page_size == 2
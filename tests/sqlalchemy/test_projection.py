@@ -0,0 +1,130 @@
+import pytest
+from sqlalchemy import create_engine, inspect, select
+from sqlalchemy.orm import Session, defaultload, defer, joinedload
+from sqlalchemy.pool import StaticPool
+
+from requela.builders.sqlalchemy import SQLAlchemyQueryBuilder
+from requela.dataclasses import Projection
+from requela.exceptions import RequelaError
+from requela.parser import parse
+from requela.rules import FieldRule, ModelRQLRules, RelationshipRule
+from tests.sqlalchemy.models import Account, Base, Tenant, User
+from tests.sqlalchemy.rules import AccountRules
+from tests.sqlalchemy.test_pagination import _add_rows
+from tests.sqlalchemy.utils import assert_statements_equal
+
+
+class ProjectedUserRules(ModelRQLRules):
+    __model__ = User
+
+    name = FieldRule()
+    email = FieldRule(deferred=True)
+    birth_date = FieldRule(alias="events.born.at", deferred=True)
+    account = RelationshipRule(rules=AccountRules())
+
+
+def test_exclude_fields():
+    builder = SQLAlchemyQueryBuilder(User)
+    stmt = builder.build_query("eq(age,30)&select(-email,-birth_date)")
+    expected = (
+        select(User).filter(User.age == 30).options(defer(User.email), defer(User.birth_date))
+    )
+    assert_statements_equal(stmt, expected)
+
+
+def test_include_related_fields():
+    builder = SQLAlchemyQueryBuilder(User)
+    stmt = builder.build_query("select(+name,+account.name,+account.tenant.name)")
+    expected = select(User).options(
+        joinedload(User.account).load_only(Account.name),
+        joinedload(User.account).joinedload(Account.tenant).load_only(Tenant.name),
+    )
+    assert_statements_equal(stmt, expected)
+
+
+def test_include_relationship():
+    builder = SQLAlchemyQueryBuilder(User)
+    stmt = builder.build_query("select(+account.tenant,-account.description)")
+    expected = select(User).options(
+        joinedload(User.account).load_only(Account.id),
+        joinedload(User.account).joinedload(Account.tenant),
+        defaultload(User.account).defer(Account.description),
+    )
+    assert_statements_equal(stmt, expected)
+
+
+@pytest.mark.parametrize(
+    ("query", "message"),
+    [
+        ("select(+name,-name)", "Field 'name' cannot be both included and excluded."),
+        ("select(-account)", "Relationship 'account' cannot be excluded, only its fields."),
+        ("select(+groups.name)", "Relationship 'groups' has many rows"),
+        ("select(-account.contracts.number)", "Relationship 'account.contracts' has many rows"),
+    ],
+)
+def test_invalid_projection(query, message):
+    with pytest.raises(ValueError, match=message):
+        SQLAlchemyQueryBuilder(User).build_query(query)
+
+
+def test_get_projection():
+    builder = SQLAlchemyQueryBuilder(User, deferred_fields=["email", "birth_date"])
+    projection = builder.get_projection(
+        parse(
+            "select(+account.tenant.name,+account.name,+account.tenant,+account.tenant.id"
+            ",+email,-age)"
+        )
+    )
+
+    assert projection == Projection(
+        relationships={"account": ("name",), "account.tenant": None}, deferred=("age", "birth_date")
+    )
+
+
+def test_deferred_fields():
+    builder = SQLAlchemyQueryBuilder(User, deferred_fields=["email", "birth_date"])
+
+    assert_statements_equal(
+        builder.build_query("eq(age,30)"),
+        select(User).filter(User.age == 30).options(defer(User.email), defer(User.birth_date)),
+    )
+    assert_statements_equal(
+        builder.build_query("select(+email)"), select(User).options(defer(User.birth_date))
+    )
+
+
+def test_projection_templates_are_cached():
+    builder = SQLAlchemyQueryBuilder(User)
+    builder.build_query("eq(age,30)&select(-email)")
+    builder.build_query("eq(age,40)&select(-email)")
+    builder.build_query("eq(age,40)&select(-name)")
+
+    assert builder.templates.stats().misses == 2
+
+
+def test_rules_projection():
+    rules = ProjectedUserRules()
+
+    assert_statements_equal(
+        rules.build_query("select(+events.born.at,+account.events.created.at)"),
+        select(User).options(
+            joinedload(User.account).load_only(Account.created_at), defer(User.email)
+        ),
+    )
+    with pytest.raises(RequelaError, match="Relation with alias 'age' not found"):
+        rules.build_query("select(-age)")
+
+
+def test_deferred_fields_are_not_loaded():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        _add_rows(session)
+        session.expunge_all()
+        query = ProjectedUserRules().build_query("eq(name,John)&select(+account.name)")
+
+        user = session.scalars(query).one()
+
+        assert inspect(user).unloaded == {"email", "birth_date", "groups"}
+        assert inspect(user.account).unloaded >= {"description", "balance", "tenant"}
+        assert user.account.name == "Acme"
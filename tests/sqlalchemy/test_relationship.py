@@ -1,8 +1,25 @@
-from sqlalchemy import exists, select
-from sqlalchemy.orm import aliased
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import and_, create_engine, exists, inspect, select
+from sqlalchemy.orm import Session, aliased, join
+from sqlalchemy.pool import StaticPool
 
 from requela.builders.sqlalchemy import SQLAlchemyQueryBuilder
-from tests.sqlalchemy.models import Account, User
+from requela.parser import parse
+from tests.sqlalchemy.models import (
+    Account,
+    AccountStatus,
+    Actor,
+    Amendment,
+    Base,
+    Contract,
+    Group,
+    Tenant,
+    User,
+    UserRole,
+    user_groups,
+)
 from tests.sqlalchemy.utils import assert_statements_equal
 
 
@@ -12,8 +29,8 @@ def test_comparison_eq_many_to_one():
     stmt = builder.build_query(query_string)
     alias = aliased(Account)
     expected = select(User).join(alias).filter(alias.name == "My Account")
-    assert len(builder.joins) == 1
     assert_statements_equal(stmt, expected)
+    assert len(builder.get_template(parse(query_string))[0].joins) == 1
 
 
 def test_comparison_any_one_to_many():
@@ -22,7 +39,7 @@ def test_comparison_any_one_to_many():
     stmt = builder.build_query(query_string)
     alias = aliased(User)
     expected = select(Account).filter(
-        exists(alias).where(alias.account_id == Account.id, alias.name == "John")
+        exists().select_from(alias).where(alias.account_id == Account.id, alias.name == "John")
     )
     assert_statements_equal(stmt, expected)
 
@@ -34,7 +51,9 @@ def test_comparison_any_one_to_many_complex_filter():
     alias = aliased(User)
 
     expected = select(Account).filter(
-        exists(alias).where(
+        exists()
+        .select_from(alias)
+        .where(
             alias.account_id == Account.id,
             alias.name == "John",
             alias.age > 30,
@@ -50,6 +69,274 @@ def test_number_of_joins():
     alias = aliased(Account)
     expected = select(User).join(alias).filter(alias.name == "My Account")
     assert_statements_equal(stmt, expected)
-    assert len(builder.joins) == 1
-    builder.build_query(query_string)
-    assert len(builder.joins) == 1
+    assert_statements_equal(builder.build_query(query_string), expected)
+
+
+@pytest.mark.parametrize(
+    ("query", "condition"),
+    [
+        ("gt(account.balance,10)", lambda account: account.balance > 10),
+        ("lte(account.balance,10)", lambda account: account.balance <= 10),
+        ("in(account.name,(a,b,c))", lambda account: account.name.in_(["a", "b", "c"])),
+        ("out(account.name,(a,b))", lambda account: account.name.not_in(["a", "b"])),
+        (
+            "and(eq(account.name,a),eq(account.status,1),ne(account.description,null()))",
+            lambda account: and_(
+                account.name == "a",
+                account.status == AccountStatus.ACTIVE,
+                account.description.isnot(None),
+            ),
+        ),
+    ],
+)
+def test_relationship_joined_once(query, condition):
+    builder = SQLAlchemyQueryBuilder(User)
+    stmt = builder.build_query(query)
+
+    account = aliased(Account)
+    assert_statements_equal(stmt, select(User).join(account).filter(condition(account)))
+    assert len(builder.get_template(parse(query))[0].joins) == 1
+
+
+def test_nested_relationships_share_joins():
+    builder = SQLAlchemyQueryBuilder(User)
+    query = "and(eq(account.name,a),eq(account.tenant.name,b))&order_by(account.tenant.name)"
+    stmt = builder.build_query(query)
+
+    account = aliased(Account)
+    tenant = aliased(Tenant)
+    expected = (
+        select(User)
+        .join(account)
+        .join(tenant, account.tenant, isouter=True)
+        .filter(account.name == "a", tenant.name == "b")
+        .order_by(tenant.name)
+    )
+    assert_statements_equal(stmt, expected)
+    template, _ = builder.get_template(parse(query))
+    assert [join.is_outer for join in template.joins] == [False, True]
+
+
+def test_any_many_to_many():
+    builder = SQLAlchemyQueryBuilder(User)
+    stmt = builder.build_query("any(groups,eq(groups.name,Admins))")
+
+    secondary = user_groups.alias()
+    group = aliased(Group)
+    expected = select(User).filter(
+        exists()
+        .select_from(secondary.join(group, group.id == secondary.c.group_id))
+        .where(secondary.c.user_id == User.id, group.name == "Admins")
+    )
+    assert_statements_equal(stmt, expected)
+
+
+def test_any_nested():
+    builder = SQLAlchemyQueryBuilder(Account)
+    stmt = builder.build_query("any(users,and(any(users.groups,eq(users.groups.name,Admins))))")
+
+    user = aliased(User)
+    secondary = user_groups.alias()
+    group = aliased(Group)
+    expected = select(Account).filter(
+        exists()
+        .select_from(user)
+        .where(
+            user.account_id == Account.id,
+            exists()
+            .select_from(secondary.join(group, group.id == secondary.c.group_id))
+            .where(secondary.c.user_id == user.id, group.name == "Admins"),
+        )
+    )
+    assert_statements_equal(stmt, expected)
+
+
+def test_any_directly_nested():
+    builder = SQLAlchemyQueryBuilder(Account)
+    stmt = builder.build_query("any(users,any(users.groups,eq(users.groups.name,Admins)))")
+
+    expected = builder.build_query("any(users,and(any(users.groups,eq(users.groups.name,Admins))))")
+    assert_statements_equal(stmt, expected)
+
+
+def test_any_composite_foreign_key():
+    builder = SQLAlchemyQueryBuilder(Contract)
+    stmt = builder.build_query("any(amendments,like(amendments.description,*renewal*))")
+
+    amendment = aliased(Amendment)
+    expected = select(Contract).filter(
+        exists()
+        .select_from(amendment)
+        .where(
+            amendment.account_id == Contract.account_id,
+            amendment.contract_number == Contract.number,
+            amendment.description.like("%renewal%"),
+        )
+    )
+    assert_statements_equal(stmt, expected)
+
+
+def test_any_with_like_in_and_not():
+    builder = SQLAlchemyQueryBuilder(Account)
+    stmt = builder.build_query(
+        "any(users,and(like(users.name,J*),in(users.age,(30,40)),not(eq(users.role,guest))))"
+    )
+
+    user = aliased(User)
+    expected = select(Account).filter(
+        exists()
+        .select_from(user)
+        .where(
+            user.account_id == Account.id,
+            user.name.like("J%"),
+            user.age.in_([30, 40]),
+            ~(user.role == UserRole.GUEST),
+        )
+    )
+    assert_statements_equal(stmt, expected)
+
+
+def test_any_joins_within_subquery():
+    builder = SQLAlchemyQueryBuilder(Tenant)
+    query = "any(accounts,and(eq(accounts.created_by.name,Bob),ne(accounts.created_by.id,1)))"
+    stmt = builder.build_query(query)
+
+    account = aliased(Account)
+    actor = aliased(Actor)
+    expected = select(Tenant).filter(
+        exists()
+        .select_from(join(account, actor, account.created_by))
+        .where(account.tenant_id == Tenant.id, actor.name == "Bob", actor.id != 1)
+    )
+    assert_statements_equal(stmt, expected)
+    assert builder.get_template(parse(query))[0].joins == ()
+
+
+def test_any_under_relationship():
+    builder = SQLAlchemyQueryBuilder(User)
+    stmt = builder.build_query(
+        "and(eq(account.name,Acme),any(account.users,eq(account.users.name,John)))"
+    )
+
+    account = aliased(Account)
+    user = aliased(User)
+    expected = (
+        select(User)
+        .join(account)
+        .filter(
+            account.name == "Acme",
+            exists().select_from(user).where(user.account_id == account.id, user.name == "John"),
+        )
+    )
+    assert_statements_equal(stmt, expected)
+
+
+def test_any_refers_to_the_enclosing_query():
+    builder = SQLAlchemyQueryBuilder(Account)
+    stmt = builder.build_query("any(users,and(eq(name,Acme),eq(users.account,null())))")
+
+    user = aliased(User)
+    expected = select(Account).filter(
+        exists()
+        .select_from(user)
+        .where(user.account_id == Account.id, Account.name == "Acme", user.account_id.is_(None))
+    )
+    assert_statements_equal(stmt, expected)
+
+
+def test_any_template_rebinds_literals():
+    builder = SQLAlchemyQueryBuilder(Account)
+    query = "any(users,and(any(users.groups,eq(users.groups.name,{})),gt(users.age,{})))"
+    builder.build_query(query.format("Admins", 30))
+
+    stmt = builder.build_query(query.format("Staff", 40))
+
+    assert stmt.compile().params == {"name_1": "Staff", "age_1": 40}
+
+
+@pytest.mark.parametrize(
+    ("model", "query", "message"),
+    [
+        (User, "eq(groups.name,Admins)", "Relationship 'groups' has many rows"),
+        (Account, "any(name,eq(name,Acme))", "can be applied to relationships only, not 'name'"),
+    ],
+)
+def test_any_invalid(model, query, message):
+    with pytest.raises(ValueError, match=message):
+        SQLAlchemyQueryBuilder(model).build_query(query)
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        admins, staff = Group(id=1, name="Admins"), Group(id=2, name="Staff")
+        session.add_all(
+            [
+                Actor(id=1, name="Bob"),
+                Tenant(id=1, name="Tenant"),
+                *(
+                    Account(
+                        id=account_id,
+                        name=name,
+                        status=AccountStatus.ACTIVE,
+                        balance=0,
+                        created_at=datetime(2024, 1, 1),
+                        created_by_id=1,
+                        tenant_id=1,
+                        datasource_id=name,
+                    )
+                    for account_id, name in [(1, "Acme"), (2, "Globex")]
+                ),
+                *(
+                    User(
+                        id=user_id,
+                        name=name,
+                        age=30,
+                        role=UserRole.USER,
+                        is_active=True,
+                        birth_date=date(2000, 1, 1),
+                        account_id=account_id,
+                        groups=groups,
+                    )
+                    for user_id, name, account_id, groups in [
+                        (1, "John", 1, [admins]),
+                        (2, "Jane", 2, [staff]),
+                        (3, "Bob", 2, []),
+                    ]
+                ),
+                Contract(account_id=1, number="C-1"),
+                Contract(account_id=2, number="C-1"),
+                Amendment(id=1, account_id=2, contract_number="C-1", description="Renewal"),
+            ]
+        )
+        session.commit()
+        yield session
+
+
+@pytest.mark.parametrize(
+    ("model", "query", "expected"),
+    [
+        (Account, "any(users,and(any(users.groups,eq(users.groups.name,Admins))))", [(1,)]),
+        (Account, "any(users,and(any(users.groups,eq(users.groups.name,Staff))))", [(2,)]),
+        (Account, "any(users,any(users.groups,eq(users.groups.name,Admins)))", [(1,)]),
+        (Account, "any(users,and(any(users.groups,eq(users.name,Jane))))", [(2,)]),
+        (User, "any(groups,in(groups.name,(Admins,Staff)))", [(1,), (2,)]),
+        (
+            Account,
+            "any(contracts,and(any(contracts.amendments,like(contracts.amendments.description,R*))))",
+            [(2,)],
+        ),
+        (Contract, "any(amendments,eq(amendments.id,1))", [(2, "C-1")]),
+        (Account, "any(users,not(eq(users.name,John)))", [(2,)]),
+        (User, "any(account.users,eq(account.users.name,Bob))", [(2,), (3,)]),
+        (Tenant, "any(accounts,eq(accounts.created_by.name,Bob))", [(1,)]),
+    ],
+)
+def test_any_results(session, model, query, expected):
+    stmt = SQLAlchemyQueryBuilder(model).build_query(query)
+
+    rows = session.scalars(stmt).all()
+
+    assert sorted(inspect(row).identity for row in rows) == expected
@@ -0,0 +1,258 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import and_, create_engine, or_, select
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.pool import StaticPool
+
+from requela.builders.sqlalchemy import SQLAlchemyQueryBuilder
+from requela.rules import FieldRule, ModelRQLRules
+from tests.sqlalchemy.models import Account, Base, Product, User, UserRole
+from tests.sqlalchemy.test_pagination import _add_rows
+from tests.sqlalchemy.utils import assert_statements_equal
+
+DAY = datetime(2024, 1, 1)
+NEXT_DAY = datetime(2024, 1, 2)
+
+
+class ProductRules(ModelRQLRules):
+    __model__ = Product
+
+    code = FieldRule()
+
+
+class SargableProductRules(ProductRules):
+    __sargable_rewrites__ = True
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        _add_rows(session)
+        yield session
+
+
+def _get_plan(session, statement):
+    sql = statement.compile(session.get_bind(), compile_kwargs={"literal_binds": True})
+    rows = session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").all()
+    return [row[-1] for row in rows]
+
+
+@pytest.mark.parametrize(
+    ("query", "condition"),
+    [
+        (
+            "like(code,John*)",
+            and_(Product.code >= "John", Product.code < "Joho", Product.code.like("John%")),
+        ),
+        (
+            "like(code,Jo*n*)",
+            and_(Product.code >= "Jo", Product.code < "Jp", Product.code.like("Jo%n%")),
+        ),
+        (
+            "like(code,J_hn*)",
+            and_(Product.code >= "J", Product.code < "K", Product.code.like("J_hn%")),
+        ),
+        ("like(code,_ohn*)", Product.code.like("_ohn%")),
+        ("like(code,*John*)", Product.code.like("%John%")),
+        ("ilike(code,John*)", Product.code.ilike("John%")),
+        ("like(name,John*)", Product.name.like("John%")),
+    ],
+)
+def test_rewrite_prefix(query, condition):
+    builder = SQLAlchemyQueryBuilder(Product, sargable_rewrites=True)
+
+    assert_statements_equal(builder.build_query(query), select(Product).filter(condition))
+
+
+@pytest.mark.parametrize(
+    ("query", "condition"),
+    [
+        ("like(name,John*)", User.name.like("John%")),
+        ("like(name,*John*)", User.name.like("%John%")),
+        ("ilike(name,John*)", User.name.ilike("John%")),
+        ("like(birth_date,x*)", User.birth_date.like("x%")),
+        ("eq(birth_date,2024-01-01)", User.birth_date == datetime(2024, 1, 1).date()),
+    ],
+)
+def test_rewrite_user(query, condition):
+    builder = SQLAlchemyQueryBuilder(User, sargable_rewrites=True)
+
+    assert_statements_equal(builder.build_query(query), select(User).filter(condition))
+
+
+@pytest.mark.parametrize(
+    ("query", "condition"),
+    [
+        (
+            "eq(created_at,2024-01-01)",
+            and_(Account.created_at >= DAY, Account.created_at < NEXT_DAY),
+        ),
+        (
+            "ne(created_at,2024-01-01)",
+            or_(Account.created_at < DAY, Account.created_at >= NEXT_DAY),
+        ),
+        ("gt(created_at,2024-01-01)", Account.created_at >= NEXT_DAY),
+        ("lte(created_at,2024-01-01)", Account.created_at < NEXT_DAY),
+        ("gte(created_at,2024-01-01)", Account.created_at >= DAY),
+        ("lt(created_at,2024-01-01)", Account.created_at < DAY),
+        (
+            "eq(created_at,2024-01-01T10:30:00+00:00)",
+            Account.created_at == datetime.fromisoformat("2024-01-01T10:30:00+00:00"),
+        ),
+    ],
+)
+def test_rewrite_datetime(query, condition):
+    builder = SQLAlchemyQueryBuilder(Account, sargable_rewrites=True)
+
+    assert_statements_equal(builder.build_query(query), select(Account).filter(condition))
+
+
+def test_rewrite_through_relationship():
+    builder = SQLAlchemyQueryBuilder(Product, sargable_rewrites=True)
+
+    stmt = builder.build_query("like(parent.code,Ac*)")
+
+    parent = aliased(Product)
+    expected = (
+        select(Product)
+        .outerjoin(parent, Product.parent)
+        .filter(and_(parent.code >= "Ac", parent.code < "Ad", parent.code.like("Ac%")))
+    )
+    assert_statements_equal(stmt, expected)
+
+
+def test_rewrite_of_relationship():
+    builder = SQLAlchemyQueryBuilder(User, sargable_rewrites=True)
+
+    with pytest.raises(ValueError, match="`eq` can be applied to relationship only"):
+        builder.build_query("eq(account,2024-01-01)")
+
+
+def test_rewrites_are_optional():
+    builder = SQLAlchemyQueryBuilder(Account)
+
+    assert_statements_equal(
+        builder.build_query("like(name,Ac*)&gt(created_at,2024-01-01)"),
+        select(Account).filter(Account.name.like("Ac%")).filter(Account.created_at > DAY),
+    )
+
+
+def test_rewrites_are_bound_to_the_literals_of_the_template():
+    builder = SQLAlchemyQueryBuilder(Product, sargable_rewrites=True)
+    builder.build_query("like(code,John*)")
+
+    stmt = builder.build_query("like(code,Ma*)")
+
+    assert builder.templates.stats().misses == 1
+    assert_statements_equal(
+        stmt,
+        select(Product).filter(
+            and_(Product.code >= "Ma", Product.code < "Mb", Product.code.like("Ma%"))
+        ),
+    )
+
+
+def test_patterns_starting_with_a_wildcard_have_their_own_template():
+    builder = SQLAlchemyQueryBuilder(Product, sargable_rewrites=True)
+    builder.build_query("like(code,John*)")
+
+    stmt = builder.build_query("like(code,_ohn*)")
+
+    assert builder.templates.stats().misses == 2
+    assert_statements_equal(stmt, select(Product).filter(Product.code.like("_ohn%")))
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        ("like(name,J*)", ["Jane", "John"]),
+        ("like(name,Jo*)", ["John"]),
+        ("like(account.name,Acme*)", ["Bob", "Eve", "John"]),
+    ],
+)
+def test_rewrite_selects_the_same_rows(session, query, expected):
+    rewritten = SQLAlchemyQueryBuilder(User, sargable_rewrites=True).build_query(query)
+    original = SQLAlchemyQueryBuilder(User).build_query(query)
+
+    names = sorted(user.name for user in session.scalars(rewritten))
+
+    assert names == sorted(user.name for user in session.scalars(original)) == expected
+
+
+def test_prefix_like_keeps_matching_other_cases(session):
+    # SQLite's LIKE is case-insensitive, which a range of the column cannot match
+    session.add_all(
+        [
+            User(
+                id=user_id,
+                name=name,
+                age=30,
+                role=UserRole.USER,
+                is_active=True,
+                birth_date=date(2000, 1, 1),
+                account_id=1,
+            )
+            for user_id, name in [(10, "john"), (11, "JOHNNY")]
+        ]
+    )
+    session.commit()
+    query = "like(name,john*)"
+
+    rewritten = SQLAlchemyQueryBuilder(User, sargable_rewrites=True).build_query(query)
+    original = SQLAlchemyQueryBuilder(User).build_query(query)
+
+    names = sorted(user.name for user in session.scalars(rewritten))
+
+    assert names == sorted(user.name for user in session.scalars(original))
+    assert names == ["JOHNNY", "John", "john"]
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        ("eq(created_at,2024-01-01)", 3),
+        ("gt(created_at,2023-12-31)", 3),
+        ("gt(created_at,2024-01-01)", 0),
+        ("lte(created_at,2024-01-01)", 3),
+        ("ne(created_at,2024-01-01)", 0),
+    ],
+)
+def test_rewrite_compares_whole_days(session, query, expected):
+    session.get(Account, 2).created_at = datetime(2024, 1, 1, 18, 30)
+    session.commit()
+    builder = SQLAlchemyQueryBuilder(Account, sargable_rewrites=True)
+
+    assert len(session.scalars(builder.build_query(query)).all()) == expected
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        (
+            "eq(name,Acme)&eq(created_at,2024-01-01)",
+            "SEARCH accounts USING INDEX ix_accounts_name_created_at "
+            "(name=? AND created_at>? AND created_at<?)",
+        ),
+        (
+            "eq(name,Acme)&gt(created_at,2024-01-01)",
+            "SEARCH accounts USING INDEX ix_accounts_name_created_at (name=? AND created_at>?)",
+        ),
+    ],
+)
+def test_day_ranges_use_index(session, query, expected):
+    builder = SQLAlchemyQueryBuilder(Account, sargable_rewrites=True)
+
+    assert _get_plan(session, builder.build_query(query)) == [expected]
+
+
+def test_rules_rewrites():
+    assert_statements_equal(
+        SargableProductRules().build_query("like(code,John*)"),
+        select(Product).filter(
+            and_(Product.code >= "John", Product.code < "Joho", Product.code.like("John%"))
+        ),
+    )
+    assert not ProductRules().builder.sargable_rewrites
@@ -1,14 +1,22 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime
 
 import pytest
 from sqlalchemy import select
 from sqlalchemy.orm import aliased
 
-from requela.dataclasses import Operator
-from requela.exceptions import RequelaError
-from requela.rules import FieldRule, ModelRQLRules
-from tests.sqlalchemy.models import Account, Actor, User
-from tests.sqlalchemy.rules import AccountRules, UserRules
+from requela.builders.sqlalchemy import SQLAlchemyQueryBuilder
+from requela.dataclasses import CostModel, IndexPolicy, Operator, QueryCost, QueryLimits
+from requela.exceptions import QueryCostError, RequelaError
+from requela.rules import FieldRule, ModelRQLRules, RelationshipRule
+from tests.sqlalchemy.models import Account, Actor, Tenant, User
+from tests.sqlalchemy.rules import (
+    AccountRules,
+    ActorRules,
+    LazyUserRules,
+    TenantRules,
+    UserRules,
+)
 from tests.sqlalchemy.utils import assert_statements_equal
 
 
@@ -83,6 +91,165 @@ def test_valid_aliased_relationship():
     assert_statements_equal(stmt, expected)
 
 
+def test_resolve_alias_path():
+    resolved = UserRules.compile().resolve("account.events.created.by.name")
+
+    assert resolved.path == "account.created_by.name"
+    assert resolved.rule is ActorRules.name
+    assert resolved.allowed_operators == ActorRules.compile().fields["name"].allowed_operators
+    assert resolved.allow_ordering is True
+    assert UserRules.compile().resolve("account.events.created.by.name") is resolved
+
+
+def test_resolve_relation():
+    resolved = UserRules.compile().resolve("account.tenant")
+
+    assert resolved.path == "account.tenant"
+    assert resolved.allowed_operators == {Operator.EQ, Operator.NE}
+    assert resolved.allow_ordering is False
+
+
+def test_resolve_field_by_name_and_alias():
+    user_rules = UserRules()
+
+    assert user_rules.compiled.resolve("events.born.at").path == "birth_date"
+    assert user_rules.compiled.resolve("birth_date").path == "birth_date"
+
+
+@pytest.mark.parametrize(
+    ("alias", "error"),
+    [
+        ("accountx.name", "Relation with alias 'accountx.name' not found"),
+        ("account.banana", "Relation with alias 'banana' not found"),
+    ],
+)
+def test_resolve_matches_whole_path_segments(alias, error):
+    with pytest.raises(ValueError, match=error):
+        UserRules.compile().resolve(alias)
+
+
+def test_resolve_ambiguous_relation():
+    class OwnerRules(ModelRQLRules):
+        __model__ = Account
+
+        tenant = RelationshipRule(rules=TenantRules(), alias="owner")
+        created_by = RelationshipRule(rules=ActorRules(), alias="owner.name")
+
+    with pytest.raises(RequelaError, match="Multiple relations found for alias 'owner.name.name'"):
+        OwnerRules().build_query("eq(owner.name.name,John)")
+
+
+def test_order_by_relation_not_allowed():
+    with pytest.raises(RequelaError, match="Order by 'account' is not allowed."):
+        UserRules().build_query("order_by(account)")
+
+
+def test_rules_compiled_once_per_class():
+    first, second = UserRules(), UserRules()
+
+    assert first.compiled is second.compiled is UserRules.compile()
+    assert first.builder is second.builder is UserRules.compile().builder
+    assert AccountRules.compile() is not UserRules.compile()
+
+
+def test_compile_does_not_mutate_field_rules():
+    class NameRules(ModelRQLRules):
+        __model__ = User
+
+        name = FieldRule()
+
+    compiled = NameRules.compile()
+
+    assert NameRules.name.allowed_operators is None
+    assert compiled.fields["name"].allowed_operators == {
+        Operator.EQ,
+        Operator.NE,
+        Operator.IN,
+        Operator.OUT,
+        Operator.LIKE,
+        Operator.ILIKE,
+    }
+
+
+def test_compile_from_threads():
+    class NameRules(ModelRQLRules):
+        __model__ = User
+
+        name = FieldRule()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        compiled = list(executor.map(lambda _: NameRules.compile(), range(32)))
+
+    assert all(rules is compiled[0] for rules in compiled)
+
+
+def test_templates_shared_between_instances():
+    class NameRules(ModelRQLRules):
+        __model__ = User
+
+        name = FieldRule()
+
+    NameRules().build_query("eq(name,John)")
+    NameRules().build_query("eq(name,Jane)")
+
+    assert NameRules.compile().templates.stats().hits == 1
+
+
+def test_invalid_rules_are_not_compiled():
+    class BananaRules(ModelRQLRules):
+        __model__ = User
+
+        banana = FieldRule()
+
+    for _ in range(2):
+        with pytest.raises(ExceptionGroup, match="Model validation failed for 'User'"):
+            BananaRules()
+
+
+def test_lazy_relationship_rules():
+    rules = LazyUserRules()
+    stmt = rules.build_query("eq(account.name,Acme)")
+
+    account = aliased(Account)
+    assert_statements_equal(stmt, select(User).join(account).filter(account.name == "Acme"))
+    assert rules.compiled.resolve("account.tenant.name").path == "account.tenant.name"
+
+
+def test_lazy_relationship_rules_cycle():
+    compiled = LazyUserRules.compile()
+
+    assert compiled.resolve("account.users.account.name").path == "account.users.account.name"
+    assert LazyUserRules().get_documentation().split("\n")[2:] == [
+        "|account.name|eq, ilike, in, like, ne, out|yes|yes|",
+        "|account.tenant.name|eq, ilike, in, like, ne, out|yes|no|",
+        "|account.tenant|eq, ne|no|no|",
+        "|account.users|eq, ne|no|no|",
+        "|account|eq, ne|no|no|",
+        "|name|eq, ilike, in, like, ne, out|yes|yes|",
+    ]
+
+
+def test_lazy_relationship_rules_resolved_on_first_use():
+    class MissingRules(ModelRQLRules):
+        __model__ = User
+
+        account = RelationshipRule(rules="MissingAccountRules")
+
+    rules = MissingRules()
+    with pytest.raises(RequelaError, match="has no attribute 'MissingAccountRules'"):
+        rules.build_query("eq(account.name,Acme)")
+
+
+def test_relationship_rules_not_rules_class():
+    class InvalidRules(ModelRQLRules):
+        __model__ = User
+
+        account = RelationshipRule(rules="tests.sqlalchemy.models.Account")
+
+    with pytest.raises(RequelaError, match="Relation rules must be a ModelRQLRules class"):
+        InvalidRules().build_query("eq(account.name,Acme)")
+
+
 def test_filter_class_validation_no_model():
     with pytest.raises(TypeError, match="UserRules must define __model__"):
 
@@ -143,23 +310,23 @@ def test_filter_class_order_field_not_allowed():
 def test_get_documentation():
     docs = UserRules().get_documentation()
     assert docs.split("\n") == [
-        "| Field | Operators | Order By |",
-        "|-------|-----------|----------|",
-        "|account.balance|eq, gt, gte, in, lt, lte, ne, out|yes|",
-        "|account.datasource_id|eq, ilike, in, like, ne, out|yes|",
-        "|account.description|eq, ilike, in, like, ne, out|yes|",
-        "|account.events.created.at|eq, gt, gte, lt, lte, ne|yes|",
-        "|account.events.created.by.name|eq, ilike, in, like, ne, out|yes|",
-        "|account.events.created.by|eq, ne|no|",
-        "|account.name|eq, ilike, in, like, ne, out|yes|",
-        "|account.status|eq, in, ne, out|yes|",
-        "|account.tenant.name|eq, ilike, in, like, ne, out|yes|",
-        "|account.tenant|eq, ne|no|",
-        "|account|eq, ne|no|",
-        "|events.born.at|eq, gt, gte, lt, lte, ne|yes|",
-        "|is_active|eq, ne|yes|",
-        "|name|eq, ilike, in, like, ne, out|yes|",
-        "|role|in, out|yes|",
+        "| Field | Operators | Order By | Indexed |",
+        "|-------|-----------|----------|---------|",
+        "|account.balance|eq, gt, gte, in, lt, lte, ne, out|yes|no|",
+        "|account.datasource_id|eq, ilike, in, like, ne, out|yes|no|",
+        "|account.description|eq, ilike, in, like, ne, out|yes|no|",
+        "|account.events.created.at|eq, gt, gte, lt, lte, ne|yes|no|",
+        "|account.events.created.by.name|eq, ilike, in, like, ne, out|yes|no|",
+        "|account.events.created.by|eq, ne|no|no|",
+        "|account.name|eq, ilike, in, like, ne, out|yes|yes|",
+        "|account.status|eq, in, ne, out|yes|no|",
+        "|account.tenant.name|eq, ilike, in, like, ne, out|yes|no|",
+        "|account.tenant|eq, ne|no|no|",
+        "|account|eq, ne|no|no|",
+        "|events.born.at|eq, gt, gte, lt, lte, ne|yes|no|",
+        "|is_active|eq, ne|yes|no|",
+        "|name|eq, ilike, in, like, ne, out|yes|yes|",
+        "|role|in, out|yes|no|",
     ]
 
 
@@ -189,3 +356,201 @@ def test_tenant_relationship_ne_invalid_value():
         RequelaError, match="`ne` can be applied to relationship only to test for null."
     ):
         account_rules.build_query("ne(tenant,pip)")
+
+
+def test_default_query_limits():
+    user_filter = UserRules()
+    with pytest.raises(RequelaError, match="Query exceeds the maximum length of 10000."):
+        user_filter.build_query(f"eq(name,{'x' * 10_000})")
+
+
+def test_query_limits():
+    class LimitedUserRules(ModelRQLRules):
+        __model__ = User
+        __limits__ = QueryLimits(max_tuple_size=2)
+
+        age = FieldRule()
+
+    user_filter = LimitedUserRules()
+    stmt = user_filter.build_query("in(age,(30,40))")
+    assert_statements_equal(stmt, select(User).filter(User.age.in_([30, 40])))
+    with pytest.raises(
+        RequelaError, match="Query exceeds the maximum number of values in a tuple of 2."
+    ):
+        user_filter.build_query("in(age,(30,40,50))")
+
+
+def test_limits_of_rows():
+    class LimitedUserRules(ModelRQLRules):
+        __model__ = User
+        __limits__ = QueryLimits(default_limit=50, max_limit=500)
+
+        age = FieldRule()
+
+    user_filter = LimitedUserRules()
+    stmt = user_filter.build_query("eq(age,30)")
+    assert_statements_equal(stmt, select(User).filter(User.age == 30).limit(50))
+    stmt = user_filter.build_query("eq(age,30)&limit(500,10)")
+    assert_statements_equal(stmt, select(User).filter(User.age == 30).limit(500).offset(10))
+    with pytest.raises(RequelaError, match="Query exceeds the maximum limit of 500."):
+        user_filter.build_query("eq(age,30)&limit(501)")
+
+
+def test_build_many():
+    user_filter = UserRules()
+    results = user_filter.build_many(["eq(name,John)", "eq(email,fail@example.com)"])
+
+    assert_statements_equal(results[0].query, select(User).filter(User.name == "John"))
+    assert isinstance(results[1].error, RequelaError)
+    assert isinstance(results[1].error.__cause__, ValueError)
+    assert str(results[1].error) == str(results[1].error.__cause__)
+
+
+def test_indexed_fields_inferred_from_model():
+    compiled = UserRules.compile()
+
+    assert compiled.resolve("name").indexed
+    assert compiled.resolve("account.name").indexed
+    assert not compiled.resolve("account.description").indexed
+    assert not compiled.resolve("is_active").indexed
+    assert SQLAlchemyQueryBuilder(User).is_field_indexed("id")
+
+
+def test_index_policy_ignored_by_default():
+    stmt = UserRules().build_query("like(account.description,*foo*)&order_by(is_active)")
+
+    assert stmt is not None
+
+
+@pytest.mark.parametrize(
+    ("query", "message"),
+    [
+        (
+            "eq(account.description,foo)",
+            "Filter 'eq' on 'account.description' cannot use an index.",
+        ),
+        ("ilike(name,foo*)", "Filter 'ilike' on 'name' cannot use an index."),
+        ("like(name,*foo)", "Filter 'like' on 'name' cannot use an index."),
+        ("ne(name,foo)", "Filter 'ne' on 'name' cannot use an index."),
+        ("order_by(is_active)", "Order by 'is_active' cannot use an index."),
+    ],
+)
+def test_index_policy_reject(query, message):
+    class IndexedUserRules(UserRules):
+        __index_policy__ = IndexPolicy.REJECT
+
+    with pytest.raises(RequelaError, match=message):
+        IndexedUserRules().build_query(query)
+
+
+def test_index_policy_reject_allows_indexed_filters():
+    class IndexedUserRules(UserRules):
+        __index_policy__ = IndexPolicy.REJECT
+
+    stmt = IndexedUserRules().build_query(
+        "and(like(name,foo*),eq(account.name,a),ne(account,null()))&order_by(-name)"
+    )
+
+    account = aliased(Account)
+    assert_statements_equal(
+        stmt,
+        select(User)
+        .join(account)
+        .filter(User.name.like("foo%"), account.name == "a", User.account_id.is_not(None))
+        .order_by(User.name.desc()),
+    )
+
+
+def test_index_policy_warn(caplog):
+    class IndexedUserRules(UserRules):
+        __index_policy__ = IndexPolicy.WARN
+
+    IndexedUserRules().build_query("eq(is_active,true)")
+
+    assert caplog.messages == ["IndexedUserRules: Filter 'eq' on 'is_active' cannot use an index."]
+
+
+def test_index_metadata_override():
+    class IndexedUserRules(ModelRQLRules):
+        __model__ = User
+        __index_policy__ = IndexPolicy.REJECT
+
+        email = FieldRule(indexed=True, index_operators={Operator.EQ})
+        name = FieldRule(indexed=False)
+
+    rules = IndexedUserRules()
+    rules.build_query("eq(email,a@example.com)")
+    with pytest.raises(RequelaError, match="Filter 'in' on 'email' cannot use an index."):
+        rules.build_query("in(email,(a@example.com))")
+    with pytest.raises(RequelaError, match="Filter 'eq' on 'name' cannot use an index."):
+        rules.build_query("eq(name,John)")
+    assert rules.get_documentation().split("\n")[2:] == [
+        "|email|eq, ilike, in, like, ne, out|yes|yes|",
+        "|name|eq, ilike, in, like, ne, out|yes|no|",
+    ]
+
+
+def test_estimate_cost_invalid_query():
+    with pytest.raises(RequelaError, match="Relation with alias 'banana' not found"):
+        UserRules().estimate_cost("eq(banana,1)")
+
+
+def test_estimate_cost():
+    cost = UserRules().estimate_cost(
+        "and(eq(account.name,Acme),ilike(account.tenant.name,*Acme),out(role,(admin)))"
+    )
+
+    assert cost == QueryCost(joins=2, leading_wildcards=1, negations=1)
+
+
+def test_max_cost():
+    class BudgetedUserRules(UserRules):
+        __limits__ = QueryLimits(max_cost=20)
+
+    rules = BudgetedUserRules()
+    stmt = rules.build_query("eq(account.tenant.name,Acme)")
+
+    account = aliased(Account)
+    tenant = aliased(Tenant)
+    assert_statements_equal(
+        stmt,
+        select(User)
+        .join(account)
+        .join(tenant, account.tenant, isouter=True)
+        .filter(tenant.name == "Acme"),
+    )
+    with pytest.raises(QueryCostError, match="Query cost of 60 exceeds the maximum of 20.") as exc:
+        rules.build_query("like(account.name,*Acme)")
+    assert exc.value.cost == QueryCost(joins=1, leading_wildcards=1)
+    assert (exc.value.score, exc.value.max_cost) == (60, 20)
+
+
+def test_max_cost_per_call():
+    rules = UserRules()
+    query = "order_by(name)"
+
+    rules.build_query(query)
+    with pytest.raises(QueryCostError, match="Query cost of 20 exceeds the maximum of 10."):
+        rules.build_query(query, max_cost=10)
+
+
+def test_max_cost_large_in():
+    class BudgetedUserRules(UserRules):
+        __limits__ = QueryLimits(max_cost=10)
+        __cost_model__ = CostModel(large_in_size=3)
+
+    rules = BudgetedUserRules()
+    rules.build_query("in(role,(admin,user))")
+    with pytest.raises(QueryCostError, match="Query cost of 20 exceeds the maximum of 10."):
+        rules.build_query("in(role,(admin,user,guest))")
+    assert rules.estimate_cost("in(role,(admin,user,guest))") == QueryCost(large_ins=1)
+
+
+def test_max_cost_build_many():
+    class BudgetedUserRules(UserRules):
+        __limits__ = QueryLimits(max_cost=0)
+
+    results = BudgetedUserRules().build_many(["eq(name,John)", "ne(name,John)"])
+
+    assert results[0].ok
+    assert isinstance(results[1].error, QueryCostError)
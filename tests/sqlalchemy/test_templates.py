@@ -0,0 +1,106 @@
+import pytest
+from sqlalchemy import exists, select
+from sqlalchemy.orm import aliased
+
+from requela.builders.sqlalchemy import SQLAlchemyQueryBuilder
+from requela.parser import parse
+from tests.sqlalchemy.models import Account, User, UserRole
+from tests.sqlalchemy.utils import assert_statements_equal
+
+
+def test_queries_differing_in_literals_share_template():
+    builder = SQLAlchemyQueryBuilder(User)
+
+    builder.build_query("and(eq(name,John),gt(age,30),like(email,*@example.com))")
+    stmt = builder.build_query("and(eq(name,Jane),gt(age,40),like(email,*@example.org))")
+
+    assert_statements_equal(
+        stmt,
+        select(User).filter(User.name == "Jane", User.age > 40, User.email.like("%@example.org")),
+    )
+    stats = builder.templates.stats()
+    assert stats.hits == 1
+    assert stats.size == 1
+
+
+def test_template_binds_tuples():
+    builder = SQLAlchemyQueryBuilder(User)
+
+    builder.build_query("out(role,(admin,user))")
+    stmt = builder.build_query("out(role,(guest))")
+
+    assert_statements_equal(stmt, select(User).filter(User.role.not_in([UserRole.GUEST])))
+    assert builder.templates.stats().hits == 1
+
+
+def test_template_keeps_joins():
+    builder = SQLAlchemyQueryBuilder(User)
+
+    builder.build_query("eq(account.name,Acme)&order_by(account.name)")
+    stmt = builder.build_query("eq(account.name,Globex)&order_by(account.name)")
+
+    alias = aliased(Account)
+    expected = select(User).filter(alias.name == "Globex").order_by(alias.name).join(alias)
+    assert_statements_equal(stmt, expected)
+    template, _ = builder.get_template(parse("eq(account.name,Acme)&order_by(account.name)"))
+    assert len(template.joins) == 1
+
+
+def test_template_of_any():
+    builder = SQLAlchemyQueryBuilder(Account)
+
+    builder.build_query("any(users,and(eq(users.name,John),gt(users.age,30)))")
+    stmt = builder.build_query("any(users,and(eq(users.name,Jane),gt(users.age,40)))")
+
+    alias = aliased(User)
+    expected = select(Account).filter(
+        exists()
+        .select_from(alias)
+        .where(alias.account_id == Account.id, alias.name == "Jane", alias.age > 40)
+    )
+    assert_statements_equal(stmt, expected)
+    assert builder.templates.stats().hits == 1
+
+
+def test_template_is_applied_to_initial_query():
+    builder = SQLAlchemyQueryBuilder(User)
+
+    builder.build_query("eq(name,John)")
+    stmt = builder.build_query("eq(name,Jane)", initial_query=select(User).where(User.age > 18))
+
+    assert_statements_equal(stmt, select(User).where(User.age > 18).filter(User.name == "Jane"))
+
+
+@pytest.mark.parametrize(
+    ("query", "other_query", "expected"),
+    [
+        (
+            "eq(email,test@example.com)",
+            "eq(email,null())",
+            select(User).filter(User.email.is_(None)),
+        ),
+        (
+            "eq(is_active,true)",
+            "eq(is_active,false)",
+            select(User).filter(User.is_active.is_(False)),
+        ),
+    ],
+)
+def test_literals_changing_condition_get_their_own_template(query, other_query, expected):
+    builder = SQLAlchemyQueryBuilder(User)
+
+    builder.build_query(query)
+    stmt = builder.build_query(other_query)
+
+    assert_statements_equal(stmt, expected)
+    assert builder.templates.stats().size == 2
+
+
+def test_template_literals_are_cast():
+    builder = SQLAlchemyQueryBuilder(User)
+    stmt = builder.build_query("eq(age,'30')")
+    assert_statements_equal(stmt, select(User).filter(User.age == 30))
+
+    with pytest.raises(ValueError, match="Cannot cast value thirty"):
+        builder.build_query("eq(age,'thirty')")
+    assert builder.templates.stats().hits == 1
@@ -0,0 +1,196 @@
+import pytest
+
+from requela.cache import FrequencySketch, ParseCache, TTLCache
+
+
+def test_frequency_sketch_estimate():
+    sketch = FrequencySketch(64)
+    for _ in range(5):
+        sketch.increment("hot")
+    sketch.increment("cold")
+
+    assert sketch.estimate("hot") == 5
+    assert sketch.estimate("cold") == 1
+    assert sketch.estimate("unknown") == 0
+
+
+def test_frequency_sketch_counters_saturate():
+    sketch = FrequencySketch(64)
+    for _ in range(100):
+        sketch.increment("hot")
+
+    assert sketch.estimate("hot") == 15
+
+
+def test_frequency_sketch_aging():
+    sketch = FrequencySketch(16)
+    for _ in range(8):
+        sketch.increment(1)
+    for _ in range(64 * 10 - 8):
+        sketch.increment(2)
+
+    assert sketch.estimate(1) == 4
+    assert sketch.estimate(2) == 7
+
+
+def test_cache_get_and_put():
+    cache = ParseCache(maxsize=2)
+    assert cache.get("a") is None
+    cache.put("a", 1)
+    assert cache.get("a") == 1
+    assert "a" in cache
+    assert len(cache) == 1
+
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.size, stats.maxsize) == (1, 1, 1, 2)
+
+
+def test_cache_put_existing_key_updates_value():
+    cache = ParseCache(maxsize=1)
+    cache.put("a", 1)
+    cache.put("a", 2)
+    assert cache.get("a") == 2
+
+
+def test_cache_admits_frequent_keys_only_when_full():
+    cache = ParseCache(maxsize=2)
+    for key in ("hot1", "hot2"):
+        for _ in range(10):
+            cache.get(key)
+        cache.put(key, key)
+
+    for index in range(50):
+        key = f"one-off-{index}"
+        cache.get(key)
+        cache.put(key, key)
+
+    assert "hot1" in cache
+    assert "hot2" in cache
+    stats = cache.stats()
+    assert stats.rejections == 50
+    assert stats.evictions == 0
+
+
+def test_cache_evicts_least_recently_used_for_more_frequent_key():
+    cache = ParseCache(maxsize=2)
+    for key in ("a", "b"):
+        cache.get(key)
+        cache.put(key, key)
+
+    for _ in range(3):
+        cache.get("c")
+    cache.put("c", "c")
+
+    assert "a" not in cache
+    assert "b" in cache
+    assert "c" in cache
+    assert cache.stats().evictions == 1
+
+
+def test_cache_with_zero_size_rejects_everything():
+    cache = ParseCache(maxsize=0, negative_maxsize=0)
+    cache.put("a", 1)
+    cache.put_error("b", "boom")
+
+    assert cache.get("a") is None
+    assert cache.get_error("b") is None
+    assert cache.stats().rejections == 1
+
+
+def test_cache_errors():
+    cache = ParseCache(negative_maxsize=1)
+    cache.put_error("a", "invalid a")
+    assert cache.get_error("a") == "invalid a"
+
+    cache.put_error("b", "invalid b")
+    assert cache.get_error("a") is None
+    assert cache.get_error("b") == "invalid b"
+    assert cache.stats().negative_hits == 2
+
+
+def test_cache_clear():
+    cache = ParseCache()
+    cache.put("a", 1)
+    cache.put_error("b", "boom")
+    cache.get("a")
+    cache.clear()
+
+    assert len(cache) == 0
+    assert cache.get_error("b") is None
+    assert cache.stats().hits == 0
+
+
+def test_cache_invalid_size():
+    with pytest.raises(ValueError, match="Cache sizes must be greater than or equal to zero."):
+        ParseCache(maxsize=-1)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache_entries_expire():
+    clock = Clock()
+    cache = TTLCache(ttl=10, clock=clock)
+    cache.put("a", 1)
+
+    clock.now = 9.9
+    assert cache.get("a") == 1
+    clock.now = 10
+    assert cache.get("a") is None
+    assert "a" not in cache
+
+
+def test_ttl_cache_put_existing_key_renews_entry():
+    clock = Clock()
+    cache = TTLCache(ttl=10, clock=clock)
+    cache.put("a", 1)
+
+    clock.now = 5
+    cache.put("a", 2)
+    clock.now = 12
+
+    assert cache.get("a") == 2
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(ttl=10, maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_with_zero_size_keeps_nothing():
+    cache = TTLCache(ttl=10, maxsize=0)
+    cache.put("a", 1)
+
+    assert len(cache) == 0
+
+
+def test_ttl_cache_clear():
+    cache = TTLCache(ttl=10)
+    cache.put("a", 1)
+    cache.clear()
+
+    assert len(cache) == 0
+
+
+@pytest.mark.parametrize(
+    ("ttl", "maxsize", "message"),
+    [
+        (0, 10, "The time to live must be greater than zero."),
+        (10, -1, "Cache sizes must be greater than or equal to zero."),
+    ],
+)
+def test_ttl_cache_invalid_arguments(ttl, maxsize, message):
+    with pytest.raises(ValueError, match=message):
+        TTLCache(ttl=ttl, maxsize=maxsize)
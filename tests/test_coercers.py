@@ -0,0 +1,73 @@
+from datetime import UTC, date, datetime
+from decimal import Decimal
+from uuid import UUID
+
+import pytest
+
+from requela.coercers import get_coercer, get_tuple_coercer
+from tests.sqlalchemy.models import AccountStatus, UserRole
+
+USER_ID = "90575008-bdde-4a40-ab07-82be547674e6"
+
+
+@pytest.mark.parametrize(
+    ("python_type", "raw", "expected"),
+    [
+        (str, "John", "John"),
+        (str, "2024-01-01", "2024-01-01"),
+        (str, "1.50", "1.50"),
+        (str, True, "True"),
+        (int, "030", 30),
+        (float, "1.50", 1.5),
+        (Decimal, "100.40", Decimal("100.40")),
+        (bool, "1", True),
+        (bool, False, False),
+        (date, "2024-01-01", date(2024, 1, 1)),
+        (date, date(2024, 1, 1), date(2024, 1, 1)),
+        (datetime, "2024-01-01T10:00:00Z", datetime(2024, 1, 1, 10, tzinfo=UTC)),
+        (datetime, "2024-01-01", datetime(2024, 1, 1)),
+        (UUID, USER_ID, UUID(USER_ID)),
+        (UserRole, "admin", UserRole.ADMIN),
+        (AccountStatus, "1", AccountStatus.ACTIVE),
+        (AccountStatus, 2, AccountStatus.PENDING),
+        (dict, "anything", "anything"),
+    ],
+)
+def test_coercer(python_type, raw, expected):
+    value = get_coercer(python_type)(raw)
+
+    assert value == expected
+    assert type(value) is type(expected)
+
+
+@pytest.mark.parametrize(
+    ("python_type", "raw"),
+    [
+        (int, "1.5"),
+        (bool, "yes"),
+        (date, "2024-01-01T10:00:00Z"),
+        (UserRole, "superuser"),
+        (UUID, "not-a-uuid"),
+    ],
+)
+def test_coercer_invalid_value(python_type, raw):
+    with pytest.raises(ValueError, match=f"Cannot cast value {raw} to {python_type}"):
+        get_coercer(python_type)(raw)
+
+
+def test_coercers_are_built_once_per_type():
+    assert get_coercer(int) is get_coercer(int)
+    assert get_tuple_coercer(UserRole) is get_tuple_coercer(UserRole)
+
+
+def test_tuple_coercer():
+    assert get_tuple_coercer(UserRole)(("admin", "user")) == [UserRole.ADMIN, UserRole.USER]
+
+
+def test_tuple_coercer_deduplicates_values():
+    assert get_tuple_coercer(int)(("30", "25", "30", "025")) == [30, 25]
+
+
+def test_tuple_coercer_invalid_value():
+    with pytest.raises(ValueError, match="Cannot cast value thirty to <class 'int'>"):
+        get_tuple_coercer(int)(("30", "thirty", "40"))
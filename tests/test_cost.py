@@ -0,0 +1,90 @@
+import pytest
+
+from requela.cost import estimate_cost
+from requela.dataclasses import CostModel, QueryCost
+from requela.optimizer import optimize
+from requela.parser import parse
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        ("eq(name,John)", QueryCost()),
+        ("eq(account.name,Acme)", QueryCost(joins=1)),
+        ("and(eq(account.name,Acme),eq(account.tenant.name,Acme))", QueryCost(joins=2)),
+        ("eq(name,John)&order_by(account.created_at)", QueryCost(joins=1)),
+        ("any(users,eq(name,John))", QueryCost(subqueries=1)),
+        ("any(users,eq(account.name,Acme))", QueryCost(joins=1, subqueries=1)),
+        ("and(eq(account.name,x),any(users,eq(account.name,y)))", QueryCost(joins=1, subqueries=1)),
+        ("any(users,eq(users.account.name,x))", QueryCost(joins=1, subqueries=1)),
+        ("any(account.users,eq(account.users.name,x))", QueryCost(joins=1, subqueries=1)),
+        (
+            "and(any(users,eq(users.account.name,x)),any(users,eq(users.account.name,y)))",
+            QueryCost(joins=2, subqueries=2),
+        ),
+        (
+            "any(users,and(any(users.groups,eq(users.groups.name,x))))",
+            QueryCost(subqueries=2),
+        ),
+        ("like(name,*John)", QueryCost(leading_wildcards=1)),
+        ("ilike(name,*John*)", QueryCost(leading_wildcards=1)),
+        ("like(name,John*)", QueryCost()),
+        ("eq(name,*John)", QueryCost()),
+        ("and(ne(name,John),out(age,(1,2)),not(eq(age,3)))", QueryCost(negations=3)),
+        ("not(and(eq(name,John),ne(age,3)))", QueryCost(negations=3)),
+        ("not(not(eq(name,John)))", QueryCost()),
+        ("not(any(users,not(eq(users.name,x))))", QueryCost(subqueries=1, negations=2)),
+        ("order_by(name)", QueryCost(unbounded=True)),
+        ("order_by(name)&limit(10)", QueryCost()),
+        ("eq(name,John)&select(+account.name,-tenant.name)", QueryCost(joins=1)),
+        ("eq(account.name,John)&include(account.tenant,groups)", QueryCost(joins=3)),
+    ],
+)
+def test_estimate_cost(query, expected):
+    assert estimate_cost(parse(query)) == expected
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "not(and(eq(name,John),gt(age,30)))",
+        "not(or(eq(name,John),not(and(ne(age,30),any(users,not(eq(users.name,x)))))))",
+        "and(not(not(eq(name,John))),not(or(out(age,(1,2)),eq(age,3))))",
+    ],
+)
+def test_estimate_cost_of_optimized_query(query):
+    assert estimate_cost(optimize(parse(query))) == estimate_cost(parse(query))
+
+
+def test_estimate_cost_of_limited_query():
+    assert estimate_cost(parse("order_by(name)"), limited=True) == QueryCost()
+
+
+def test_estimate_cost_resolves_aliases():
+    aliases = {"events.born.at": "birth_date", "company": "account.name"}
+
+    cost = estimate_cost(
+        parse("and(eq(events.born.at,2020-01-01),eq(company,Acme))"),
+        lambda alias: aliases.get(alias, alias),
+    )
+
+    assert cost == QueryCost(joins=1)
+
+
+def test_score():
+    cost = QueryCost(
+        joins=2, subqueries=1, leading_wildcards=1, negations=3, large_ins=1, unbounded=True
+    )
+
+    assert cost.score(CostModel()) == 20 + 25 + 50 + 15 + 20 + 20
+    assert cost.score(CostModel(join=1, subquery=0, leading_wildcard=0)) == 2 + 15 + 20 + 20
+
+
+def test_with_large_ins():
+    model = CostModel(large_in_size=3)
+    cost = QueryCost(joins=1)
+
+    assert cost.with_large_ins(("a", (1, 2), (1, 2, 3), (1, 2, 3, 4)), model) == QueryCost(
+        joins=1, large_ins=2
+    )
+    assert cost.with_large_ins(("a", (1, 2)), model) is cost
@@ -0,0 +1,83 @@
+from datetime import date
+
+import pytest
+
+from requela import ir
+from requela.dataclasses import LogicalOperator, Operator
+from requela.parser import parse
+
+
+def test_walk():
+    node = parse("and(eq(name,John),any(users,not(gt(age,30))))")[0]
+
+    events = [
+        (type(current).__name__, getattr(current, "operator", None), leaving)
+        for current, leaving in ir.walk(node)
+    ]
+
+    assert events == [
+        ("Logical", LogicalOperator.AND, False),
+        ("Comparison", Operator.EQ, False),
+        ("Comparison", Operator.EQ, True),
+        ("Any", None, False),
+        ("Logical", LogicalOperator.NOT, False),
+        ("Comparison", Operator.GT, False),
+        ("Comparison", Operator.GT, True),
+        ("Logical", LogicalOperator.NOT, True),
+        ("Any", None, True),
+        ("Logical", LogicalOperator.AND, True),
+    ]
+
+
+def test_filters():
+    query = parse(
+        "eq(name,John)&order_by(-name)&select(-age)&include(account)&limit(5)&not(eq(age,30))"
+    )
+
+    assert ir.filters(query) == parse("eq(name,John)&not(eq(age,30))")
+
+
+def test_split_literals():
+    shape, literals = ir.split_literals(
+        parse("and(eq(name,John),in(age,(1,2)))&order_by(-name)&gt(birth_date,2024-01-01)")
+    )
+
+    assert literals == ("John", ("1", "2"), "2024-01-01")
+    assert (
+        shape
+        == ir.split_literals(
+            parse("and(eq(name,Jane),in(age,(3)))&order_by(-name)&gt(birth_date,2025-02-02)")
+        )[0]
+    )
+
+
+def test_split_literals_keeps_limits_out_of_literals():
+    shape, literals = ir.split_literals(parse("eq(name,John)&limit(10,20)"))
+
+    assert literals == ("John",)
+    assert shape == ir.split_literals(parse("eq(name,Jane)&limit(5)"))[0]
+
+
+def test_split_literals_without_raw_form():
+    query = (ir.Comparison(operator=Operator.GT, field="birth_date", value=date(2024, 1, 1)),)
+
+    assert ir.split_literals(query)[1] == (date(2024, 1, 1),)
+
+
+@pytest.mark.parametrize(
+    ("query", "other_query"),
+    [
+        ("eq(name,John)", "eq(name,null())"),
+        ("eq(is_active,true)", "eq(is_active,false)"),
+        ("eq(age,30)", "eq(age,thirty)"),
+        ("like(name,*John)", "like(name,John*)"),
+        ("and(eq(name,John),eq(age,30))", "and(eq(name,John))&eq(age,30)"),
+        ("not(eq(name,John))", "any(name,eq(name,John))"),
+        ("eq(name,John)&order_by(name)", "eq(name,John)&order_by(-name)"),
+        ("eq(name,John)&limit(10)", "eq(name,John)"),
+        ("eq(name,John)&select(name)", "eq(name,John)&select(-name)"),
+        ("eq(name,John)&include(account)", "eq(name,John)&include(groups)"),
+    ],
+)
+def test_split_literals_shape_depends_on_structure(query, other_query):
+    assert ir.split_literals(parse(query))[0] != ir.split_literals(parse(other_query))[0]
@@ -0,0 +1,172 @@
+import pytest
+
+from requela import ir
+from requela.dataclasses import LogicalOperator, Operator
+from requela.optimizer import is_empty, optimize
+from requela.parser import parse
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        ("not(not(eq(name,John)))", "eq(name,John)"),
+        (
+            "not(and(eq(name,John),gt(age,30)))",
+            "or(not(eq(name,John)),not(gt(age,30)))",
+        ),
+        (
+            "not(or(eq(name,John),any(accounts,not(eq(name,Acme)))))",
+            "and(not(eq(name,John)),not(any(accounts,not(eq(name,Acme)))))",
+        ),
+        (
+            "and(eq(name,John),and(gt(age,30),and(lt(age,40),ne(email,null()))))",
+            "and(eq(name,John),gt(age,30),lt(age,40),ne(email,null()))",
+        ),
+        ("and(eq(name,John),eq(name,John))", "eq(name,John)"),
+        ("or(eq(name,John),and(gt(age,30),gt(age,30)))", "or(eq(name,John),gt(age,30))"),
+        ("eq(name,John)&eq(name,John)&gt(age,30)", "eq(name,John)&gt(age,30)"),
+        ("and(eq(age,1),eq(age,01))", "and(eq(age,1),eq(age,01))"),
+        ("and(eq(name,John),eq(name,Jane))", "and(eq(name,John),eq(name,Jane))"),
+        ("and(eq(age,30),eq(age,30.0))", "and(eq(age,30),eq(age,30.0))"),
+        ("or(eq(age,30),eq(age,40))", "in(age,(30,40))"),
+        (
+            "or(eq(name,John),in(age,(30,40)),eq(age,50),eq(age,30))",
+            "or(eq(name,John),in(age,(30,40,50,30)))",
+        ),
+        ("or(eq(age,30),or(eq(name,John),eq(age,40)))", "or(in(age,(30,40)),eq(name,John))"),
+        ("or(eq(active,true),eq(active,false))", "or(eq(active,true),eq(active,false))"),
+        ("or(eq(age,null()),eq(age,30))", "or(eq(age,null()),eq(age,30))"),
+        ("or(eq(age,30),ne(age,40))", "or(eq(age,30),ne(age,40))"),
+        ("or(and(eq(age,30),eq(age,40)),eq(name,John))", "eq(name,John)"),
+        (
+            "and(eq(name,John),or(eq(name,John),eq(is_active,true)))",
+            "and(eq(name,John),or(eq(name,John),eq(is_active,true)))",
+        ),
+        (
+            "eq(name,John)&or(eq(name,John),eq(is_active,true))",
+            "eq(name,John)&or(eq(name,John),eq(is_active,true))",
+        ),
+        (
+            "any(accounts,or(eq(name,Acme),eq(name,Umbrella)))",
+            "any(accounts,in(name,(Acme,Umbrella)))",
+        ),
+        (
+            "any(accounts,not(and(eq(id,1),eq(id,2))))",
+            "any(accounts,or(not(eq(id,1)),not(eq(id,2))))",
+        ),
+        (
+            "order_by(name)&eq(name,John)&not(not(gt(age,30)))&limit(10)",
+            "order_by(name)&eq(name,John)&gt(age,30)&limit(10)",
+        ),
+    ],
+)
+def test_optimize(query, expected):
+    optimized = optimize(parse(query))
+
+    assert optimized == parse(expected)
+    assert not is_empty(optimized)
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "and(eq(age,30),eq(age,40))",
+        "and(eq(age,30),eq(age,null()))",
+        "and(eq(name,John),not(eq(name,John)))",
+        "and(eq(name,John),ne(name,John))",
+        "and(gt(age,30),or(eq(name,John),eq(email,x)),not(or(eq(name,John),eq(email,x))))",
+        "eq(age,30)&eq(age,40)",
+        "and(eq(name,John),eq(age,30))&not(eq(age,30))",
+        "any(accounts,and(eq(id,1),eq(id,2)))",
+        "and(eq(name,John),or(and(eq(age,30),eq(age,40)),and(eq(age,50),eq(age,60))))",
+        "not(or(eq(name,John),not(and(eq(age,30),eq(age,40)))))",
+    ],
+)
+def test_contradiction(query):
+    assert optimize(parse(query)) == (ir.Empty(),)
+
+
+def test_contradiction_keeps_other_expressions():
+    optimized = optimize(parse("select(name)&eq(age,30)&order_by(name)&eq(age,40)&limit(5)"))
+
+    assert optimized == (
+        *parse("select(name)"),
+        ir.Empty(),
+        *parse("order_by(name)&limit(5)"),
+    )
+    assert is_empty(optimized)
+
+
+def test_tautology():
+    # No related row satisfies the condition, so every row has none
+    assert optimize(parse("or(eq(name,John),not(any(accounts,and(eq(id,1),eq(id,2)))))")) == ()
+    assert optimize(parse("not(any(accounts,and(eq(id,1),eq(id,2))))&order_by(name)")) == parse(
+        "order_by(name)"
+    )
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        (
+            "not(and(eq(email,a),ne(email,a)))",
+            "or(not(eq(email,a)),not(ne(email,a)))",
+        ),
+        (
+            "not(and(eq(email,null()),eq(email,a)))",
+            "or(not(eq(email,null())),not(eq(email,a)))",
+        ),
+        (
+            "or(eq(name,John),not(and(eq(age,30),eq(age,40))))",
+            "or(eq(name,John),not(eq(age,30)),not(eq(age,40)))",
+        ),
+    ],
+)
+def test_negated_contradiction(query, expected):
+    # Rows whose fields are null satisfy neither the contradiction nor its negation
+    assert optimize(parse(query)) == parse(expected)
+
+
+def test_any_of_all_related_rows():
+    # any() needs a condition, so the one every related row satisfies is kept
+    query = parse("any(accounts,or(eq(name,Acme),not(and(eq(id,1),eq(id,2)))))")
+
+    assert optimize(query) == (
+        ir.Any(
+            relationship="accounts",
+            condition=parse("or(eq(name,Acme),not(eq(id,1)),not(eq(id,2)))")[0],
+        ),
+    )
+
+
+def test_any_of_related_rows_without_condition():
+    # Every account satisfies the condition, which any() still needs
+    query = parse("any(accounts,not(any(accounts.users,and(eq(id,1),eq(id,2)))))")
+
+    assert optimize(query) == query
+
+
+def test_empty_filter():
+    assert optimize((ir.Empty(),)) == (ir.Empty(),)
+    assert optimize((ir.Logical(LogicalOperator.NOT, (ir.Empty(),)),)) == ()
+
+
+def test_folded_literals_as_written():
+    (folded,) = optimize(parse("or(eq(age,030),eq(age,40))"))
+
+    assert folded == ir.Comparison(Operator.IN, "age", value=(30, 40))
+    assert folded.raw == ("030", "40")
+
+
+def test_fold_not_allowed():
+    query = parse("or(eq(age,30),eq(age,40),eq(name,John),eq(name,Jane))")
+
+    optimized = optimize(query, can_fold=lambda comparison: comparison.field == "name")
+
+    assert optimized == parse("or(eq(age,30),eq(age,40),in(name,(John,Jane)))")
+
+
+def test_deeply_nested_query():
+    query = parse("not(" * 1000 + "and(eq(name,John)," * 1000 + "eq(age,30)" + ")" * 2000)
+
+    assert optimize(query) == parse("and(eq(name,John),eq(age,30))")
@@ -0,0 +1,98 @@
+import base64
+from datetime import UTC, date, datetime
+from decimal import Decimal
+from enum import Enum
+from uuid import UUID
+
+import pytest
+
+from requela.dataclasses import OrderField
+from requela.exceptions import InvalidCursorError
+from requela.pagination import decode_cursor, encode_cursor, get_keyset
+from requela.parser import parse
+from tests.sqlalchemy.models import AccountStatus, UserRole
+
+KEYSET = (OrderField(direction="-", field_path="account.name"), OrderField("-", "id"))
+
+
+class Color(Enum):
+    RED = "red"
+
+
+@pytest.mark.parametrize(
+    ("query", "primary_key", "expected"),
+    [
+        ("eq(name,John)", ("id",), ((None, "id"),)),
+        ("order_by(-age,+name)", ("id",), (("-", "age"), (None, "name"), (None, "id"))),
+        ("order_by(name,-age)", ("id",), ((None, "name"), ("-", "age"), ("-", "id"))),
+        ("order_by(-id,name)", ("id",), (("-", "id"), (None, "name"))),
+        (
+            "order_by(name)&order_by(-name,age)",
+            ("id",),
+            ((None, "name"), (None, "age"), (None, "id")),
+        ),
+        ("order_by(number)", ("account_id", "number"), ((None, "number"), (None, "account_id"))),
+    ],
+)
+def test_get_keyset(query, primary_key, expected):
+    keyset = get_keyset(parse(query), primary_key)
+
+    assert keyset == tuple(OrderField(direction, path) for direction, path in expected)
+
+
+def test_get_keyset_resolves_aliases():
+    aliases = {"company": "account.name"}
+
+    keyset = get_keyset(parse("order_by(-company)"), ("id",), lambda path: aliases.get(path, path))
+
+    assert keyset == KEYSET
+
+
+@pytest.mark.parametrize(
+    "keys",
+    [
+        ("Acme", 1),
+        (None, 2),
+        (1.5, True),
+        (datetime(2024, 1, 1, 10, tzinfo=UTC).isoformat(), 3),
+    ],
+)
+def test_cursor_round_trip(keys):
+    assert decode_cursor(encode_cursor(KEYSET, keys), KEYSET) == keys
+
+
+@pytest.mark.parametrize(
+    ("key", "expected"),
+    [
+        (date(2024, 1, 1), "2024-01-01"),
+        (datetime(2024, 1, 1, 10, tzinfo=UTC), "2024-01-01T10:00:00+00:00"),
+        (Decimal("100.40"), "100.40"),
+        (UUID("90575008-bdde-4a40-ab07-82be547674e6"), "90575008-bdde-4a40-ab07-82be547674e6"),
+        (UserRole.ADMIN, "admin"),
+        (AccountStatus.PENDING, 2),
+        (Color.RED, "red"),
+    ],
+)
+def test_cursor_keys_are_encoded_as_written(key, expected):
+    assert decode_cursor(encode_cursor(KEYSET, (key, 1)), KEYSET) == (expected, 1)
+
+
+def test_cursor_is_url_safe_and_unpadded():
+    cursor = encode_cursor(KEYSET, ("a?b/c>", 1))
+
+    assert set(cursor) <= set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_")
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not a cursor",
+        "é",
+        base64.urlsafe_b64encode(b"{}").decode(),
+        encode_cursor(KEYSET, ("Acme",)),
+        encode_cursor((OrderField(None, "account.name"), OrderField("-", "id")), ("Acme", 1)),
+    ],
+)
+def test_decode_invalid_cursor(cursor):
+    with pytest.raises(InvalidCursorError, match="Invalid pagination cursor."):
+        decode_cursor(cursor, KEYSET)
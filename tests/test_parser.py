@@ -1,6 +1,37 @@
+import hashlib
+import pickle
+from datetime import date, datetime
+
+import lark
 import pytest
 
-from requela.parser import parse
+import requela.parser
+from requela import ir
+from requela.dataclasses import (
+    NO_QUERY_LIMITS,
+    LogicalOperator,
+    Operator,
+    OrderField,
+    QueryComplexity,
+    QueryLimits,
+)
+from requela.parser import (
+    GRAMMAR,
+    PARSE_CACHE,
+    PARSER_TABLES_PATH,
+    QueryLimitError,
+    QueryParser,
+    build_parser,
+    canonicalize,
+    configure_parse_cache,
+    get_parser,
+    measure_complexity,
+    parse,
+    parse_many,
+    save_parser_tables,
+)
+
+LIMITS = QueryLimits(max_tuple_size=2)
 
 
 def test_parser():
@@ -21,3 +52,448 @@ def test_parser_with_double_quoted_string():
 def test_parser_invalid():
     with pytest.raises(ValueError, match="Invalid RQL query: Unexpected token"):
         parse("eq(name,John")
+
+
+@pytest.fixture
+def parse_cache():
+    PARSE_CACHE.clear()
+    yield PARSE_CACHE
+    PARSE_CACHE.clear()
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        (" eq( name , John ) ", "eq(name,John )"),
+        (" and( eq(name,John) , gt(age,30) ) ", "and(eq(name,John),gt(age,30))"),
+        ("eq(name,John Doe)", "eq(name,John Doe)"),
+        ("eq(name,' John, (Doe) ')", "eq(name,' John, (Doe) ')"),
+        ('eq(name,"John & Doe")', 'eq(name,"John & Doe")'),
+        ("eq(name,A&B) & order_by( -name, +age)", "eq(name,A&B)&order_by(-name,+age)"),
+        ("in(age,( 30 , 20 ))", "in(age,(30 ,20 ))"),
+        ("eq(name,null( ))", "eq(name,null( ))"),
+        ("eq(name,null())", "eq(name,null())"),
+        ("and(eq(name,John),gt(age,30))", "and(eq(name,John),gt(age,30))"),
+        ("and(gt(age,30),eq(name,John))", "and(eq(name,John),gt(age,30))"),
+        ("or(eq(b,2),and(eq(z,1),eq(y,2)))", "or(and(eq(y,2),eq(z,1)),eq(b,2))"),
+        ("not(or(eq(b,2),eq(a,1)))", "not(or(eq(a,1),eq(b,2)))"),
+        (
+            "any(users,and(eq(users.b,2),eq(users.a,1)))",
+            "any(users,and(eq(users.a,1),eq(users.b,2)))",
+        ),
+        ("eq(name,John", "eq(name,John"),
+        ("eq(name,John))", "eq(name,John))"),
+        ("eq(name,'John)", "eq(name,'John)"),
+        ("eq(name,John)(age)", "eq(name,John)(age)"),
+        ("eq(name,John)x", "eq(name,John)x"),
+        ("eq(name,null()'x')", "eq(name,null()'x')"),
+        ("name,John", "name,John"),
+    ],
+)
+def test_canonicalize(query, expected):
+    assert canonicalize(query).text == expected
+
+
+@pytest.mark.parametrize("query", ["eq(name,John )", "in(name,( John , Jane ))", "like(name,J* )"])
+def test_parse_keeps_the_trailing_whitespace_of_values(parse_cache, query):
+    parse(query.replace(" ", ""))
+
+    assert parse(query) == get_parser().parse(query)
+
+
+def test_canonicalize_permutations():
+    assert canonicalize("and(eq(a,1),eq(b,2))").permutations is None
+    assert canonicalize("and(eq(b,2),eq(a,1))").permutations == ((1, 0),)
+    assert canonicalize("or(and(eq(z,1),eq(y,2)),eq(a,1))").permutations == ((0, 1), (1, 0))
+
+
+def test_parse_shares_cache_entry_between_equivalent_queries(parse_cache):
+    parse("and(eq(name,John),gt(age,30))")
+    parse(" and( gt(age,30) , eq(name,John) ) ")
+
+    stats = parse_cache.stats()
+    assert stats.hits == 1
+    assert stats.misses == 1
+    assert stats.size == 1
+
+
+def test_parse_keeps_original_argument_order(parse_cache):
+    sorted_tree = parse("and(eq(a,1),or(eq(d,4),eq(c,3)))")
+    reversed_tree = parse("and(or(eq(c,3),eq(d,4)),eq(a,1))")
+
+    assert sorted_tree == get_parser().parse("and(eq(a,1),or(eq(d,4),eq(c,3)))")
+    assert reversed_tree == get_parser().parse("and(or(eq(c,3),eq(d,4)),eq(a,1))")
+    assert parse_cache.stats().hits == 1
+
+
+def test_parse_invalid_query_is_negatively_cached(parse_cache):
+    for _ in range(3):
+        with pytest.raises(ValueError, match="Invalid RQL query: Unexpected token"):
+            parse("eq(name,John")
+
+    stats = parse_cache.stats()
+    assert stats.negative_hits == 2
+    assert stats.size == 0
+
+
+def test_configure_parse_cache(parse_cache):
+    parse("eq(name,John)")
+    configure_parse_cache(maxsize=10, negative_maxsize=5)
+    try:
+        stats = parse_cache.stats()
+        assert stats.maxsize == 10
+        assert stats.size == 0
+        assert parse_cache.negative_maxsize == 5
+    finally:
+        configure_parse_cache(maxsize=1000, negative_maxsize=256)
+
+
+def test_parse_produces_typed_ir():
+    assert parse(
+        "and(eq(name,'John'),gt(age,30),lt(balance,1.5),in(status,(1,2)))"
+        "&eq(birth_date,2024-01-01)&ne(created_at,2024-01-01T10:00:00+00:00)"
+        "&(eq(is_active,true))&eq(email,null())&eq(description,empty())&order_by(name,-age)"
+    ) == (
+        ir.Logical(
+            operator=LogicalOperator.AND,
+            arguments=(
+                ir.Comparison(operator=Operator.EQ, field="name", value="John"),
+                ir.Comparison(operator=Operator.GT, field="age", value=30),
+                ir.Comparison(operator=Operator.LT, field="balance", value=1.5),
+                ir.Comparison(operator=Operator.IN, field="status", value=(1, 2)),
+            ),
+        ),
+        ir.Comparison(operator=Operator.EQ, field="birth_date", value=date(2024, 1, 1)),
+        ir.Comparison(
+            operator=Operator.NE,
+            field="created_at",
+            value=datetime.fromisoformat("2024-01-01T10:00:00+00:00"),
+        ),
+        ir.Comparison(operator=Operator.EQ, field="is_active", value=True),
+        ir.Comparison(operator=Operator.EQ, field="email", value=None),
+        ir.Comparison(operator=Operator.EQ, field="description", value=""),
+        ir.OrderBy(
+            fields=(
+                OrderField(direction=None, field_path="name"),
+                OrderField(direction="-", field_path="age"),
+            )
+        ),
+    )
+
+
+def test_parse_keeps_raw_literals():
+    query = parse(
+        "and(eq(name,'2024'),gt(age,030),lt(balance,1.50),in(status,(1,two,null())))"
+        "&eq(birth_date,2024-01-01)&ne(created_at,2024-01-01T10:00:00Z)&eq(email,empty())"
+    )
+
+    comparisons = [
+        node for node, leaving in ir.walk(query[0]) if isinstance(node, ir.Comparison) and leaving
+    ]
+    assert [comparison.raw for comparison in comparisons] == [
+        "2024",
+        "030",
+        "1.50",
+        ("1", "two", None),
+    ]
+    assert [comparison.raw for comparison in query[1:]] == [
+        "2024-01-01",
+        "2024-01-01T10:00:00Z",
+        "",
+    ]
+
+
+def test_parse_any_keeps_original_argument_order(parse_cache):
+    parse("any(users,or(eq(users.name,John),eq(users.age,30)))")
+
+    assert parse("any(users,or(eq(users.name,John),eq(users.age,30)))") == (
+        ir.Any(
+            relationship="users",
+            condition=ir.Logical(
+                operator=LogicalOperator.OR,
+                arguments=(
+                    ir.Comparison(operator=Operator.EQ, field="users.name", value="John"),
+                    ir.Comparison(operator=Operator.EQ, field="users.age", value=30),
+                ),
+            ),
+        ),
+    )
+    assert parse_cache.stats().hits == 1
+
+
+def test_parse_directly_nested_any():
+    query = "any(orders,any(orders.items,eq(orders.items.sku,1)))"
+    expected = (
+        ir.Any(
+            relationship="orders",
+            condition=ir.Any(
+                relationship="orders.items",
+                condition=ir.Comparison(operator=Operator.EQ, field="orders.items.sku", value=1),
+            ),
+        ),
+    )
+
+    assert parse(query) == expected
+    assert get_parser().parse(query) == expected
+
+
+def test_parse_invalid_logical_argument():
+    with pytest.raises(ValueError, match="Invalid RQL query: Invalid argument 'name'"):
+        parse("and(name,eq(name,John))")
+
+
+def test_parse_select():
+    assert parse("select(+name,-account.description,age)") == (
+        ir.Select(
+            fields=(
+                OrderField(direction="+", field_path="name"),
+                OrderField(direction="-", field_path="account.description"),
+                OrderField(direction=None, field_path="age"),
+            )
+        ),
+    )
+
+
+def test_parse_include():
+    assert parse("include(account, account.tenant)&eq(name,John)") == (
+        ir.Include(relationships=("account", "account.tenant")),
+        ir.Comparison(operator=Operator.EQ, field="name", value="John", raw="John"),
+    )
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        ("limit(10)", ir.Limit(limit=10)),
+        ("limit( 10 , 20 )", ir.Limit(limit=10, offset=20)),
+    ],
+)
+def test_parse_limit(query, expected):
+    assert parse(f"eq(name,John)&{query}") == (
+        ir.Comparison(operator=Operator.EQ, field="name", value="John"),
+        expected,
+    )
+
+
+@pytest.mark.parametrize(
+    ("query", "message"),
+    [
+        ("limit(0)", "The limit must be greater than zero."),
+        ("limit(-5)", "The limit must be greater than zero."),
+        ("limit(5,-1)", "The offset cannot be negative."),
+        ("limit(5)&eq(name,John)&limit(10)", "A query can only have one limit"),
+    ],
+)
+def test_parse_invalid_limit(query, message):
+    with pytest.raises(ValueError, match=f"Invalid RQL query: {message}"):
+        parse(query)
+
+
+def test_parser_tables_are_up_to_date():
+    with open(PARSER_TABLES_PATH, "rb") as tables_file:
+        tables = pickle.load(tables_file)
+
+    assert tables["grammar_hash"] == hashlib.sha256(GRAMMAR.encode()).hexdigest(), (
+        "The grammar changed, regenerate the parser tables with "
+        '`python -c "from requela.parser import save_parser_tables; save_parser_tables()"`'
+    )
+
+
+def test_get_parser_is_loaded_once():
+    assert get_parser() is get_parser()
+
+
+@pytest.fixture
+def parser_builds(monkeypatch):
+    builds = []
+
+    def build():
+        builds.append(True)
+        return build_parser()
+
+    monkeypatch.setattr(requela.parser, "build_parser", build)
+    monkeypatch.setattr(requela.parser, "_parser", None)
+    return builds
+
+
+def test_load_parser_from_tables(parser_builds):
+    parser = get_parser()
+
+    assert parser_builds == []
+    assert parser.parse("eq(name,John)") == build_parser().parse("eq(name,John)")
+
+
+@pytest.mark.parametrize(
+    "tables",
+    [
+        {"grammar_hash": "outdated", "lark_version": lark.__version__},
+        {"grammar_hash": hashlib.sha256(GRAMMAR.encode()).hexdigest(), "lark_version": "0.0.1"},
+    ],
+)
+def test_load_parser_with_outdated_tables(monkeypatch, tmp_path, parser_builds, tables):
+    tables_path = tmp_path / "parser_tables.pickle"
+    with open(tables_path, "wb") as tables_file:
+        pickle.dump(tables, tables_file)
+    monkeypatch.setattr(requela.parser, "PARSER_TABLES_PATH", tables_path)
+
+    get_parser()
+
+    assert parser_builds == [True]
+
+
+@pytest.mark.parametrize(
+    "parser",
+    [
+        # A class that a later lark version moved
+        b"clark.lexer\nMissing\n.truncated",
+        pickle.dumps({"data": {}, "memo": {}}),
+    ],
+)
+def test_load_parser_with_unloadable_tables(monkeypatch, tmp_path, parser_builds, parser):
+    tables_path = tmp_path / "parser_tables.pickle"
+    with open(tables_path, "wb") as tables_file:
+        pickle.dump(
+            {
+                "grammar_hash": hashlib.sha256(GRAMMAR.encode()).hexdigest(),
+                "lark_version": lark.__version__,
+                "parser": parser,
+            },
+            tables_file,
+        )
+    monkeypatch.setattr(requela.parser, "PARSER_TABLES_PATH", tables_path)
+
+    get_parser()
+
+    assert parser_builds == [True]
+
+
+def test_load_parser_without_tables(monkeypatch, tmp_path, parser_builds):
+    monkeypatch.setattr(requela.parser, "PARSER_TABLES_PATH", tmp_path / "missing.pickle")
+
+    get_parser()
+
+    assert parser_builds == [True]
+
+
+def test_save_parser_tables(monkeypatch, tmp_path, parser_builds):
+    tables_path = tmp_path / "parser_tables.pickle"
+    save_parser_tables(tables_path)
+    monkeypatch.setattr(requela.parser, "PARSER_TABLES_PATH", tables_path)
+    parser_builds.clear()
+
+    assert get_parser().parse("eq(name,John)") == (
+        ir.Comparison(operator=Operator.EQ, field="name", value="John"),
+    )
+    assert parser_builds == []
+
+
+@pytest.mark.parametrize(
+    ("query", "limits", "message"),
+    [
+        ("eq(name,John)", QueryLimits(max_length=12), "length of 12"),
+        ("not(not(eq(name,John)))", QueryLimits(max_depth=2), "nesting depth of 2"),
+        (
+            "or(eq(name,A),eq(name,B),eq(name,C))",
+            QueryLimits(max_logical_arguments=2),
+            "number of arguments of a logical operator of 2",
+        ),
+        ("in(age,(1,2,3))", QueryLimits(max_tuple_size=2), "number of values in a tuple of 2"),
+        (
+            "any(accounts,and(any(users,eq(name,John))))",
+            QueryLimits(max_any_depth=1),
+            "any\\(\\) nesting depth of 1",
+        ),
+        (
+            "order_by(name,-age,+id)",
+            QueryLimits(max_order_by_fields=2),
+            "number of order_by fields of 2",
+        ),
+        (
+            "select(name,-age,+id)",
+            QueryLimits(max_select_fields=2),
+            "number of select fields of 2",
+        ),
+        (
+            "include(account,groups,tenant)",
+            QueryLimits(max_include_fields=2),
+            "number of include fields of 2",
+        ),
+        ("eq(name,John)&limit(101,5)", QueryLimits(max_limit=100), "limit of 100"),
+    ],
+)
+def test_parse_enforces_limits(parse_cache, query, limits, message):
+    with pytest.raises(QueryLimitError, match=f"Query exceeds the maximum {message}."):
+        parse(query, limits)
+
+    assert parse(query) is not None
+    with pytest.raises(QueryLimitError, match=f"Query exceeds the maximum {message}."):
+        parse(query, limits)
+
+
+def test_parse_within_limits():
+    query = "and(eq(name,John),in(age,(1,2)),any(accounts,eq(name,A)))&order_by(name,-age)"
+    limits = QueryLimits(
+        max_length=len(query),
+        max_depth=3,
+        max_logical_arguments=3,
+        max_tuple_size=2,
+        max_any_depth=1,
+        max_order_by_fields=2,
+        max_limit=100,
+    )
+
+    assert parse(query, limits) == parse(query)
+    assert parse("limit(100)", limits) == parse("limit(100)")
+
+
+def test_parse_limit_errors_are_not_negatively_cached(parse_cache):
+    with pytest.raises(QueryLimitError):
+        parse("in(age,(1,2,3))", QueryLimits(max_tuple_size=2))
+
+    assert parse("in(age,(1,2,3))") is not None
+    assert parse_cache.stats().negative_hits == 0
+
+
+def test_query_parser_checks_limits_while_consuming_query():
+    # The tuple is never closed, the limit is exceeded before the parser gets to the end
+    query = "in(age,(" + ",".join(str(value) for value in range(100_000))
+
+    with pytest.raises(QueryLimitError, match="number of values in a tuple of 10."):
+        QueryParser(query, QueryLimits(max_tuple_size=10)).parse()
+
+
+def test_query_parser_complexity():
+    parser = QueryParser(
+        "and(eq(name,John),any(accounts,in(id,(1,2,3))))&order_by(name,id)&select(-email)"
+        "&include(account,groups)&limit(20,40)"
+    )
+    query = parser.parse()
+
+    assert parser.complexity == QueryComplexity(
+        depth=3,
+        logical_arguments=2,
+        tuple_size=3,
+        any_depth=1,
+        order_by_fields=2,
+        select_fields=1,
+        include_fields=2,
+        limit=20,
+    )
+    assert measure_complexity(query) == parser.complexity
+
+
+def test_parse_deeply_nested_query_with_lalr_parser(parse_cache):
+    query = "not(" * 2000 + "eq(name,John)" + ")" * 2000
+
+    with pytest.raises(QueryLimitError, match="nesting depth of 1000."):
+        parse(query, QueryLimits(max_length=None, max_depth=1000))
+
+    assert len(parse(query, NO_QUERY_LIMITS)) == 1
+
+
+def test_parse_many():
+    parsed_queries = parse_many(["eq(name,John)", "eq(name,John", "in(age,(1,2,3))"], LIMITS)
+
+    assert parsed_queries[0] == parse("eq(name,John)")
+    assert str(parsed_queries[1]).startswith("Invalid RQL query: Unexpected token")
+    assert isinstance(parsed_queries[2], QueryLimitError)
@@ -0,0 +1,298 @@
+import random
+import string
+
+import pytest
+
+from requela import ir
+from requela.parser import (
+    QueryParser,
+    QueryRejectedError,
+    canonicalize,
+    get_parser,
+    measure_complexity,
+    parse,
+)
+
+CORPUS = [
+    "eq(name,John)",
+    "eq(name,John Doe)",
+    "eq(name,John )",
+    "in(name,(John ,Jane\t))",
+    "eq(age,30 )",
+    "eq(name,null() )",
+    "eq(name,'John' )",
+    "eq(name,'John, Doe')",
+    'eq(name,"John (Doe)")',
+    "eq(name,O'Brien)",
+    "eq(name,A&B)",
+    "eq(name,é)",
+    "eq(name,eq)",
+    "eq(in,1)",
+    "eq(account.events.created-by.name,1)",
+    "eq(age,30)",
+    "eq(age,-30)",
+    "eq(age,007)",
+    "eq(age,+5)",
+    "eq(age,-)",
+    "eq(balance,1.5)",
+    "eq(balance,-1.5)",
+    "eq(birth_date,2024-01-01)",
+    "eq(created_at,2024-01-01T10:00:00Z)",
+    "eq(created_at,2024-01-01T10:00:00.123+02:00)",
+    "eq(id,90575008-bdde-4a40-ab07-82be547674e6)",
+    "eq(id,90575008-BDDE-4A40-AB07-82BE547674E6)",
+    "eq(is_active,true)",
+    "eq(is_active,false)",
+    "eq(is_active,'true')",
+    "eq(is_active,true1)",
+    "eq(email,null())",
+    "eq(email,null)",
+    "eq(email,empty())",
+    "eq(name,*John*)",
+    "in(age,(1,2,3))",
+    "in(age,(1))",
+    "eq(age,(1))",
+    "in(name,('a,b',\"c\",d e,null(),2024-01-01))",
+    "and(eq(name,John),gt(age,30))",
+    "and(eq(name,John))",
+    "or(eq(name,John),and(eq(age,30),not(eq(name,Jane))))",
+    "not(eq(name,John),eq(age,30))",
+    "and((eq(name,John)),((gt(age,30))))",
+    "(eq(name,John))",
+    "any(users,eq(users.name,John))",
+    "any(users,and(eq(users.name,John),gt(users.age,30)))",
+    "any(users,any(users.groups,eq(users.groups.name,Admins)))",
+    "order_by(name)",
+    "order_by(+name,-age,account.name)",
+    "eq(name,John)&order_by(name)&gt(age,30)",
+    "order_by(name)&order_by(age)",
+    "order_by(+ name,-\tage)",
+    "select(name)",
+    "select(+name,-account.description,events.created.at)",
+    "eq(name,John)&select(-email)&order_by(name)&select(+account.name)",
+    "eq(select,1)",
+    "include(account)",
+    "include(account, account.tenant,groups)&eq(name,John)",
+    "eq(include,1)",
+    "limit(10)",
+    "limit(10,20)",
+    "limit(007,0)",
+    "eq(name,John)&limit(5)&order_by(name)",
+    "eq(limit,1)",
+    # invalid queries
+    "",
+    "eq(name,John",
+    "eq(name,John))",
+    "eq(name,)",
+    "eq(,John)",
+    "eq(name,123abc)",
+    "eq(name,30 years)",
+    "eq(name,1.)",
+    "eq(name,'ab'c)",
+    "eq(name,nullx())",
+    "eq(name,2024-01-01T10:00:00)",
+    "eq(created_at,2024-13-45)",
+    "eq(na me,John)",
+    "eq(é,John)",
+    "eq(name,John)&",
+    "&eq(name,John)",
+    "eq(name,())",
+    "in(name,(1,))",
+    "in(name,((1)))",
+    "and()",
+    "and(name,eq(name,John))",
+    "and(in,eq(name,John))",
+    "and(order_by(name))",
+    "any(users,(eq(users.name,John)))",
+    "any(users,John)",
+    "order_by()",
+    "order_by(-)",
+    "order_by(--name)",
+    "equal(name,John)",
+    "EQ(name,John)",
+    "eq(name,John)eq(age,30)",
+    "(order_by(name))",
+    "select()",
+    "select(--name)",
+    "and(select(name))",
+    "include()",
+    "include(+account)",
+    "include(account,)",
+    "limit()",
+    "limit(0)",
+    "limit(-1)",
+    "limit(+1)",
+    "limit(1,-1)",
+    "limit(1,2,3)",
+    "limit(a)",
+    "limit(1.5)",
+    "limit(1)&limit(2)",
+    "and(limit(1))",
+    "(limit(1))",
+]
+
+
+def _outcome(parse_function, text):
+    try:
+        return "parsed", parse_function(text)
+    except QueryRejectedError:
+        return "rejected", None
+    except ValueError as e:
+        return "invalid", str(e)
+    except Exception as e:
+        return "rejected", type(e).__name__
+
+
+def _assert_equivalent(query):
+    text = canonicalize(query).text
+    parser = QueryParser(text)
+    fast = _outcome(lambda text: parser.parse(), text)
+    reference = _outcome(get_parser().parse, text)
+    if fast[0] == "rejected":
+        assert reference[0] != "parsed", f"{query!r} was rejected but is valid"
+    else:
+        assert fast == reference, f"{query!r} was parsed differently"
+    if fast[0] == "parsed":
+        assert parser.complexity == measure_complexity(fast[1]), (
+            f"{query!r} was measured differently"
+        )
+        assert ir.split_literals(fast[1]) == ir.split_literals(reference[1]), (
+            f"{query!r} kept different raw literals"
+        )
+    return fast
+
+
+@pytest.mark.parametrize("query", CORPUS)
+def test_corpus(query):
+    _assert_equivalent(query)
+
+
+def test_rejected_query_is_reported_by_lalr_parser():
+    with pytest.raises(QueryRejectedError):
+        QueryParser("eq(name,John").parse()
+
+    with pytest.raises(ValueError, match="Invalid RQL query: Unexpected token"):
+        parse("eq(name,John")
+
+
+def test_deeply_nested_query_is_handed_over_to_lalr_parser():
+    query = "not(" * 2000 + "eq(name,John)" + ")" * 2000
+
+    with pytest.raises(QueryRejectedError):
+        QueryParser(query).parse()
+
+    expression = parse(query)[0]
+    for _ in range(2000):
+        expression = expression.arguments[0]
+    assert expression == QueryParser("eq(name,John)").parse()[0]
+
+
+class QueryGenerator:
+    """Generates random queries from the grammar"""
+
+    PROPERTIES = ["name", "age", "account.name", "events.created.at", "a_b-c", "in", "eq"]
+    COMPARISONS = ["eq", "ne", "gt", "gte", "lt", "lte", "like", "ilike"]
+
+    def __init__(self, seed):
+        self.random = random.Random(seed)
+
+    def literal(self):
+        choice = self.random.randrange(13)
+        match choice:
+            case 0:
+                return str(self.random.randint(-1000, 1000))
+            case 1:
+                return f"{self.random.uniform(-1000, 1000):.3f}"
+            case 2:
+                month, day = self.random.randint(1, 9), self.random.randint(10, 28)
+                return f"20{self.random.randint(10, 30)}-0{month}-{day}"
+            case 3:
+                offset = self.random.choice(["Z", "+02:00", ".5-01:00"])
+                return f"2024-01-0{self.random.randint(1, 9)}T10:00:00{offset}"
+            case 4:
+                return "90575008-bdde-4a40-ab07-82be547674e6"
+            case 5:
+                return f"'{self.text(',()&"')}'"
+            case 6:
+                return f'"{self.text(",()&")}"'
+            case 7:
+                return self.random.choice(["true", "false", "null()", "empty()"])
+            case _:
+                return self.text("&*'\" -.").strip() or "x"
+
+    def text(self, extra):
+        alphabet = string.ascii_letters + extra
+        return self.random.choice(string.ascii_letters) + "".join(
+            self.random.choice(alphabet) for _ in range(self.random.randint(0, 8))
+        )
+
+    def comparison(self):
+        if self.random.random() < 0.2:
+            values = ",".join(self.literal() for _ in range(self.random.randint(1, 5)))
+            operator = self.random.choice(["in", "out"])
+            return f"{operator}({self.random.choice(self.PROPERTIES)},({values}))"
+        operator = self.random.choice(self.COMPARISONS)
+        return f"{operator}({self.random.choice(self.PROPERTIES)},{self.literal()})"
+
+    def expression(self, depth=0):
+        choice = self.random.randrange(6) if depth < 4 else 0
+        match choice:
+            case 1 | 2:
+                operator = self.random.choice(["and", "or"])
+                arguments = ",".join(
+                    self.expression(depth + 1) for _ in range(self.random.randint(1, 4))
+                )
+                return f"{operator}({arguments})"
+            case 3:
+                return f"not({self.expression(depth + 1)})"
+            case 4:
+                condition = self.expression(depth + 1)
+                if condition.startswith("("):
+                    condition = self.comparison()
+                return f"any(users,{condition})"
+            case 5:
+                return f"({self.expression(depth + 1)})"
+        return self.comparison()
+
+    def order_by(self):
+        fields = ",".join(
+            self.random.choice(["", "+", "-"]) + self.random.choice(self.PROPERTIES)
+            for _ in range(self.random.randint(1, 3))
+        )
+        return f"order_by({fields})"
+
+    def limit(self):
+        offset = f",{self.random.randint(0, 100)}" if self.random.random() < 0.5 else ""
+        return f"limit({self.random.randint(1, 100)}{offset})"
+
+    def query(self):
+        expressions = [
+            self.order_by() if self.random.random() < 0.2 else self.expression()
+            for _ in range(self.random.randint(1, 3))
+        ]
+        if self.random.random() < 0.2:
+            expressions.append(self.order_by().replace("order_by", "select"))
+        if self.random.random() < 0.1:
+            expressions.append("include(account,account.tenant)")
+        if self.random.random() < 0.2:
+            expressions.insert(self.random.randrange(len(expressions) + 1), self.limit())
+        return "&".join(expressions)
+
+    def mutate(self, query):
+        position = self.random.randrange(len(query))
+        if self.random.random() < 0.5:
+            return query[:position] + query[position + 1 :]
+        return query[:position] + self.random.choice("(),&'\" a1-.+*") + query[position:]
+
+
+def test_generated_queries():
+    generator = QueryGenerator(seed=20241017)
+    for _ in range(500):
+        query = generator.query()
+        assert _assert_equivalent(query)[0] == "parsed", query
+
+
+def test_mutated_queries():
+    generator = QueryGenerator(seed=17)
+    for _ in range(1000):
+        _assert_equivalent(generator.mutate(generator.query()))
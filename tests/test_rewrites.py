@@ -0,0 +1,57 @@
+from datetime import date, datetime
+
+import pytest
+
+from requela.rewrites import (
+    MAX_CHARACTER,
+    get_day_end,
+    get_day_start,
+    get_prefix,
+    get_prefix_end,
+    is_prefix_pattern,
+)
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        ("John*", True),
+        ("Jo*n*", True),
+        ("J_hn*", True),
+        ("_ohn*", False),
+        ("%ohn*", False),
+        ("*John", False),
+        ("*John*", False),
+        ("John", False),
+        (30, False),
+    ],
+)
+def test_is_prefix_pattern(value, expected):
+    assert is_prefix_pattern(value) is expected
+
+
+@pytest.mark.parametrize(
+    ("pattern", "prefix", "end"),
+    [
+        ("John*", "John", "Joho"),
+        ("Jo*n*", "Jo", "Jp"),
+        ("J_hn*", "J", "K"),
+        ("Jo%n*", "Jo", "Jp"),
+        ("az*", "az", "a{"),
+        (f"a{MAX_CHARACTER}*", f"a{MAX_CHARACTER}", "b"),
+    ],
+)
+def test_prefix_bounds(pattern, prefix, end):
+    assert get_prefix(pattern) == prefix
+    assert get_prefix_end(pattern) == end
+
+
+def test_prefix_without_end():
+    with pytest.raises(ValueError, match="has no upper bound"):
+        get_prefix_end(f"{MAX_CHARACTER}*")
+
+
+@pytest.mark.parametrize("value", ["2024-02-29", date(2024, 2, 29)])
+def test_day_bounds(value):
+    assert get_day_start(value) == datetime(2024, 2, 29)
+    assert get_day_end(value) == datetime(2024, 3, 1)